@@ -17,10 +17,12 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
+import time
 from collections import deque
 from PyQt4 import QtCore
 from picard.const import ACOUSTID_KEY
 from picard.util import partial, call_next
+from picard.util.metrics import registry
 from picard.webservice import XmlNode
 
 
@@ -31,6 +33,8 @@ class AcoustIDClient(QtCore.QObject):
         self._queue = deque()
         self._running = 0
         self._max_processes = 2
+        # Start time of each running fingerprint calculator
+        self._started = {}
 
     def init(self):
         pass
@@ -132,6 +136,7 @@ class AcoustIDClient(QtCore.QObject):
         if finished:
             return
         process.setProperty('picard_finished', QtCore.QVariant(True))
+        self._count_run(process)
         result = None
         try:
             self._running -= 1
@@ -162,6 +167,7 @@ class AcoustIDClient(QtCore.QObject):
         if finished:
             return
         process.setProperty('picard_finished', QtCore.QVariant(True))
+        self._count_run(process)
         try:
             self._running -= 1
             self._run_next_task()
@@ -169,6 +175,11 @@ class AcoustIDClient(QtCore.QObject):
         finally:
             next(None)
 
+    def _count_run(self, process):
+        started = self._started.pop(process, None)
+        if started is not None:
+            registry.observe("fpcalc.run", time.time() - started)
+
     def _run_next_task(self):
         try:
             file, next = self._queue.popleft()
@@ -180,6 +191,7 @@ class AcoustIDClient(QtCore.QObject):
         process.setProperty('picard_finished', QtCore.QVariant(False))
         process.finished.connect(partial(self._on_fpcalc_finished, next, file))
         process.error.connect(partial(self._on_fpcalc_error, next, file))
+        self._started[process] = time.time()
         process.start(fpcalc, ["-length", "120", file.filename])
         self.log.debug("Starting fingerprint calculator %r %r", fpcalc, file.filename)
 
@@ -18,6 +18,7 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
+import time
 import traceback
 from collections import deque
 from PyQt4 import QtCore, QtNetwork
@@ -28,9 +29,30 @@ from picard.track import Track
 from picard.script import ScriptParser
 from picard.ui.item import Item
 from picard.util import format_time, partial, queue, mbid_validate, asciipunct
+from picard.util.assignment import best_assignment
+from picard.util.metrics import registry
 from picard.cluster import Cluster
 from picard.mbxml import release_to_metadata, medium_to_metadata, track_to_metadata, media_formats_from_node, label_info_from_node
 from picard.const import VARIOUS_ARTISTS_ID
+from picard.similarity import normalize
+
+
+# A track at the same position as a file is only taken without comparing
+# the file to the rest of the album if it is at least this similar
+CERTAIN_MATCH = 0.9
+
+
+def _track_position(metadata):
+    """Return (discnumber, tracknumber) of ``metadata`` as integers."""
+    try:
+        discnumber = int(metadata['discnumber'])
+    except ValueError:
+        discnumber = 1
+    try:
+        tracknumber = int(metadata['tracknumber'])
+    except ValueError:
+        tracknumber = 0
+    return (discnumber, tracknumber)
 
 
 class Album(DataObject, Item):
@@ -47,12 +69,16 @@ class Album(DataObject, Item):
         self.rgloaded = False
         self.rgid = None
         self._files = 0
+        self._linked_tracks = 0
+        self._complete_tracks = 0
+        self._unsaved_files = set()
         self._requests = 0
         self._tracks_loaded = False
         self._discid = discid
         self._after_load_callbacks = queue.Queue()
         self.other_versions = []
         self.unmatched_files = Cluster(_("Unmatched Files"), special=True, related_album=self, hide_if_empty=True)
+        self._build_match_index()
 
     def __repr__(self):
         return '<Album %s %r>' % (self.id, self.metadata[u"album"])
@@ -144,7 +170,9 @@ class Album(DataObject, Item):
         finally:
             self._requests -= 1
             if parsed or error:
+                started = time.time()
                 self._finalize_loading(error)
+                registry.observe("album.finalize", time.time() - started)
 
     def _parse_release_group(self, document):
         for node in document.metadata[0].release_list[0].release:
@@ -260,6 +288,7 @@ class Album(DataObject, Item):
             self.tracks = self._new_tracks
             del self._new_metadata
             del self._new_tracks
+            self._build_match_index()
             self.loaded = True
             self.match_files(self.unmatched_files.files)
             self.update()
@@ -319,14 +348,43 @@ class Album(DataObject, Item):
 
     def _add_file(self, track, file):
         self._files += 1
+        num = track.num_linked_files
+        if num == 1:
+            self._linked_tracks += 1
+            self._complete_tracks += 1
+        elif num == 2:
+            self._complete_tracks -= 1
+        self._file_state_changed(track, file)
         self.update(update_tracks=False)
 
     def _remove_file(self, track, file):
         self._files -= 1
+        num = track.num_linked_files
+        if num == 0:
+            self._linked_tracks -= 1
+            self._complete_tracks -= 1
+        elif num == 1:
+            self._complete_tracks += 1
+        self._unsaved_files.discard(file)
+        self.update(update_tracks=False)
+
+    def _file_state_changed(self, track, file):
+        """Keep the count of unsaved files up to date."""
+        if file not in track.linked_files:
+            return
+        unsaved = not file.is_saved()
+        if unsaved == (file in self._unsaved_files):
+            return
+        if unsaved:
+            self._unsaved_files.add(file)
+        else:
+            self._unsaved_files.discard(file)
+        # The album row shows the count, also when it is collapsed
         self.update(update_tracks=False)
 
     def match_files(self, files, use_trackid=True):
         """Match files to tracks on this album, based on metadata similarity or trackid."""
+        unidentified = []
         for file in list(files):
             if file.state == File.REMOVED:
                 continue
@@ -334,14 +392,75 @@ class Album(DataObject, Item):
             trackid = file.metadata['musicbrainz_trackid']
             if use_trackid and mbid_validate(trackid):
                 matches = self._get_trackid_matches(file, trackid)
-            if not matches:
-                for track in self.tracks:
-                    sim = track.metadata.compare(file.orig_metadata)
-                    if sim >= self.config.setting['track_matching_threshold']:
-                        matches.append((sim, track))
             if matches:
                 matches.sort(reverse=True)
                 file.move(matches[0][1])
+            else:
+                unidentified.append(file)
+        if unidentified:
+            self._match_files_by_similarity(unidentified)
+
+    def _build_match_index(self):
+        """Index the tracks by trackid, position and normalized title."""
+        self._trackid_index = {}
+        self._position_index = {}
+        self._title_index = {}
+        for i, track in enumerate(self.tracks):
+            tm = track.metadata
+            self._trackid_index.setdefault(tm['musicbrainz_trackid'], []).append(track)
+            self._position_index.setdefault(_track_position(tm), []).append(i)
+            if tm['title']:
+                self._title_index.setdefault(normalize(tm['title']), []).append(i)
+
+    def _get_candidate_tracks(self, metadata):
+        """Return indexes of tracks with the same title as ``metadata`` and
+        of tracks at the same position."""
+        titles = set()
+        if metadata['title']:
+            titles.update(self._title_index.get(normalize(metadata['title']), []))
+        positions = set(self._position_index.get(_track_position(metadata), []))
+        return titles, positions
+
+    def _match_files_by_similarity(self, files):
+        """Assign files to tracks so that the total similarity is the highest.
+
+        Each track gets at most one of the files, unless a file has no other
+        track above the threshold left, then it goes to its best track."""
+        threshold = self.config.snapshot()['track_matching_threshold']
+        scores = []
+        for file in files:
+            # Tracks with the same title or at the same position are compared
+            # first. The rest of the album is only skipped if one of them has
+            # the same title or is almost certainly the right track, a wrong
+            # track at the same position easily gets above the threshold.
+            row = [None] * len(self.tracks)
+            titles, positions = self._get_candidate_tracks(file.orig_metadata)
+            candidates = titles | positions
+            certain = False
+            for i in candidates:
+                sim = self.tracks[i].metadata.compare(file.orig_metadata)
+                if sim >= threshold:
+                    row[i] = sim
+                    if i in titles or sim >= CERTAIN_MATCH:
+                        certain = True
+            if not certain:
+                for i, track in enumerate(self.tracks):
+                    if i in candidates:
+                        continue
+                    sim = track.metadata.compare(file.orig_metadata)
+                    if sim >= threshold:
+                        row[i] = sim
+            scores.append(row)
+        assignment = best_assignment(
+            scores, row_keys=[file.filename for file in files])
+        for i, file in enumerate(files):
+            j = assignment.get(i)
+            if j is None:
+                matches = [(sim, j) for j, sim in enumerate(scores[i]) if sim is not None]
+                if matches:
+                    j = max(matches)[1]
+            if j is not None:
+                file.move(self.tracks[j])
             else:
                 file.move(self.unmatched_files)
 
@@ -361,17 +480,16 @@ class Album(DataObject, Item):
         matches = []
         tracknumber = file.metadata['tracknumber']
         discnumber = file.metadata['discnumber']
-        for track in self.tracks:
+        for track in self._trackid_index.get(trackid, []):
             tm = track.metadata
-            if trackid == tm['musicbrainz_trackid']:
-                if tracknumber == tm['tracknumber']:
-                    if discnumber == tm['discnumber']:
-                        matches.append((4.0, track))
-                        break
-                    else:
-                        matches.append((3.0, track))
+            if tracknumber == tm['tracknumber']:
+                if discnumber == tm['discnumber']:
+                    matches.append((4.0, track))
+                    break
                 else:
-                    matches.append((2.0, track))
+                    matches.append((3.0, track))
+            else:
+                matches.append((2.0, track))
         return matches
 
     def can_save(self):
@@ -393,40 +511,21 @@ class Album(DataObject, Item):
         return True
 
     def get_num_matched_tracks(self):
-        num = 0
-        for track in self.tracks:
-            if track.is_linked():
-                num += 1
-        return num
+        return self._linked_tracks
 
     def get_num_unmatched_files(self):
         return len(self.unmatched_files.files)
 
     def is_complete(self):
-        if not self.tracks:
-            return False
-        for track in self.tracks:
-            if track.num_linked_files != 1:
-                return False
-        else:
-            return True
+        return bool(self.tracks) and self._complete_tracks == len(self.tracks)
 
     def get_num_unsaved_files(self):
-        count = 0
-        for track in self.tracks:
-            for file in track.linked_files:
-                if not file.is_saved():
-                    count+=1
-        return count
+        return len(self._unsaved_files)
 
     def column(self, column):
         if column == 'title':
             if self.tracks:
-                linked_tracks = 0
-                for track in self.tracks:
-                    if track.is_linked():
-                        linked_tracks+=1
-                text = u'%s\u200E (%d/%d' % (self.metadata['album'], linked_tracks, len(self.tracks))
+                text = u'%s\u200E (%d/%d' % (self.metadata['album'], self._linked_tracks, len(self.tracks))
                 unmatched = self.get_num_unmatched_files()
                 if unmatched:
                     text += '; %d?' % (unmatched,)
@@ -471,6 +570,11 @@ class NatAlbum(Album):
         self.loaded = True
         self.update()
 
+    def add_track(self, track):
+        self.tracks.append(track)
+        self._build_match_index()
+        self.update(True)
+
     def update(self, update_tracks=True):
         self.metadata["album"] = self.config.setting["nat_name"]
         for track in self.tracks:
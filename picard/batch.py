@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""Unattended tagging without the GUI.
+
+The batch tagger loads the given files and directories, clusters the
+files, looks up the clusters and then the files left over, and saves the
+files matched to a track. Every decision is written to a report with one
+JSON object per line.
+"""
+
+import os
+import sys
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from PyQt4 import QtCore
+
+from picard.album import Album
+from picard.cluster import Cluster
+from picard.file import File
+from picard.tagger import BaseTagger
+from picard.track import Track
+from picard.util import decode_filename, encode_filename, partial
+from picard.util.metrics import registry
+
+
+# How often the tagger checks whether the current step has finished, in ms
+IDLE_CHECK_INTERVAL = 200
+
+
+def find_files(paths):
+    """Returns the files in ``paths``, descending into directories."""
+    files = []
+    for path in paths:
+        path = encode_filename(path)
+        if not os.path.isdir(path):
+            files.append(decode_filename(path))
+            continue
+        for root, dirs, filenames in os.walk(path):
+            dirs.sort()
+            for filename in sorted(filenames):
+                try:
+                    files.append(decode_filename(os.path.join(root, filename)))
+                except UnicodeDecodeError:
+                    pass
+    return files
+
+
+class Report(object):
+    """Writes one JSON object per line and counts the events."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.counts = {}
+
+    def write(self, event, **kwargs):
+        kwargs["event"] = event
+        self.counts[event] = self.counts.get(event, 0) + 1
+        self.stream.write(json.dumps(kwargs, sort_keys=True) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class StatusLog(object):
+    """Stands in for the main window, status messages go to the log."""
+
+    def __init__(self, log):
+        self.log = log
+
+    def set_statusbar_message(self, message, *args, **kwargs):
+        if message:
+            self.log.debug(message, *args)
+
+    def enable_cluster(self, enabled):
+        pass
+
+    def enable_submit(self, enabled):
+        pass
+
+
+class BatchTagger(BaseTagger, QtCore.QCoreApplication):
+
+    file_state_changed = QtCore.pyqtSignal(int)
+    cluster_added = QtCore.pyqtSignal(Cluster)
+    cluster_removed = QtCore.pyqtSignal(Cluster)
+    album_added = QtCore.pyqtSignal(Album)
+    album_removed = QtCore.pyqtSignal(Album)
+
+    # Steps of the batch, each one starts when the previous one is idle
+    SCANNING, LOADING, CLUSTER_LOOKUP, FILE_LOOKUP, SAVING = range(5)
+
+    def __init__(self, args, localedir, report=None, debug=False,
+                 profile_scripts=False):
+        QtCore.QCoreApplication.__init__(self, sys.argv[:1])
+        self._paths = args
+        self.setup(localedir, debug, profile_scripts)
+        self.window = StatusLog(self.log)
+        self.report = Report(report or sys.stdout)
+        self.step = self.SCANNING
+        self._idle_checks = 0
+        self._idle_timer = QtCore.QTimer(self)
+        self._idle_timer.timeout.connect(self._check_idle)
+
+    def run(self):
+        self.other_queue.put((
+            partial(find_files, self._paths),
+            self._files_found,
+            QtCore.Qt.LowEventPriority))
+        res = self.exec_()
+        self.exit()
+        return res
+
+    def _files_found(self, result=None, error=None):
+        if error is not None:
+            self.report.write("error", error=str(error))
+            self.report.close()
+            QtCore.QCoreApplication.exit(1)
+            return
+        self.log.info("Loading %d files", len(result))
+        self.add_files(result)
+        self.step = self.LOADING
+        self._idle_timer.start(IDLE_CHECK_INTERVAL)
+
+    def _busy(self):
+        if self.xmlws.num_pending_tasks():
+            return True
+        for cluster in self.clusters:
+            if cluster.lookup_task:
+                return True
+        for file in self.files.itervalues():
+            if file.state == File.PENDING or file.lookup_task:
+                return True
+        return False
+
+    def _check_idle(self):
+        # Callbacks of finished requests can start new ones, so a step has
+        # only finished if nothing was running on two checks in a row
+        if self._busy():
+            self._idle_checks = 0
+            return
+        self._idle_checks += 1
+        if self._idle_checks < 2:
+            return
+        self._idle_checks = 0
+        if self.step == self.LOADING:
+            self._lookup_clusters()
+        elif self.step == self.CLUSTER_LOOKUP:
+            self._lookup_files()
+        elif self.step == self.FILE_LOOKUP:
+            self._save_files()
+        elif self.step == self.SAVING:
+            self._finish()
+
+    def _lookup_clusters(self):
+        self.step = self.CLUSTER_LOOKUP
+        self.cluster([self.unmatched_files])
+        for cluster in self.clusters:
+            for file in cluster.files:
+                self.report.write("cluster", file=file.filename,
+                                  album=cluster.metadata["album"],
+                                  artist=cluster.metadata["albumartist"])
+            cluster.lookup_metadata()
+        self.log.info("Looking up %d clusters", len(self.clusters))
+
+    def _unidentified_files(self):
+        files = list(self.unmatched_files.files)
+        for cluster in self.clusters:
+            files.extend(cluster.files)
+        return files
+
+    def _lookup_files(self):
+        self.step = self.FILE_LOOKUP
+        files = self._unidentified_files()
+        self.log.info("Looking up %d files", len(files))
+        self.autotag(files)
+
+    def _save_files(self):
+        self.step = self.SAVING
+        files = []
+        for file in sorted(self.files.values(), key=lambda f: f.filename):
+            track = file.parent
+            if isinstance(track, Track):
+                self.report.write("match", file=file.filename,
+                                  release=track.album.id, recording=track.id,
+                                  similarity=file.similarity)
+                files.append(file)
+            elif isinstance(track, Cluster) and track.related_album:
+                self.report.write("unmatched", file=file.filename,
+                                  release=track.related_album.id)
+            else:
+                self.report.write("unmatched", file=file.filename)
+        self.log.info("Saving %d files", len(files))
+        self.save(files)
+
+    def _finish(self):
+        self._idle_timer.stop()
+        self.report.write("summary", counts=dict(self.report.counts),
+                          metrics=registry.dump())
+        self.report.close()
+        errors = self.report.counts.get("load_error", 0) + self.report.counts.get("save_error", 0)
+        QtCore.QCoreApplication.exit(1 if errors else 0)
+
+    def _file_loaded(self, result=None, error=None):
+        file = result
+        if file is None or error is not None or file.has_error():
+            filename = file.filename if file is not None else None
+            message = file.error if file is not None else None
+            self.report.write("load_error", file=filename,
+                              error=str(error or message))
+        else:
+            self.report.write("load", file=file.filename)
+        BaseTagger._file_loaded(self, result, error)
+
+    def _file_saved(self, result=None, error=None):
+        if error is not None:
+            self.report.write("save_error", error=str(error))
+            return
+        file, old_filename, new_filename = result
+        if file.state == File.ERROR:
+            self.report.write("save_error", file=old_filename, error=file.error)
+        else:
+            self.report.write("save", file=old_filename, new_file=new_filename)
+        BaseTagger._file_saved(self, result, error)
+
+    def move_files_to_album(self, files, albumid=None, album=None):
+        if album is not None:
+            albumid = album.id
+        for file in files:
+            self.report.write("album", file=file.filename, release=albumid)
+        BaseTagger.move_files_to_album(self, files, albumid, album)
+
+    def move_file_to_track(self, file, albumid, trackid):
+        self.report.write("track", file=file.filename, release=albumid,
+                          recording=trackid)
+        BaseTagger.move_file_to_track(self, file, albumid, trackid)
+
+    def move_file_to_nat(self, file, trackid, node=None):
+        self.report.write("standalone", file=file.filename, recording=trackid)
+        BaseTagger.move_file_to_nat(self, file, trackid, node)
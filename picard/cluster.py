@@ -21,7 +21,7 @@
 import re
 from heapq import heappush, heappop
 from PyQt4 import QtCore
-from picard.metadata import Metadata
+from picard.metadata import Metadata, ReleaseScoringProfile
 from picard.similarity import similarity2, similarity
 from picard.ui.item import Item
 from picard.util import format_time
@@ -65,20 +65,23 @@ class Cluster(QtCore.QObject, Item):
             file._move(self)
             file.update(signal=False)
         self.files.extend(files)
-        self.item.add_files(files)
+        if self.item:
+            self.item.add_files(files)
 
     def add_file(self, file):
         self.metadata['totaltracks'] += 1
         self.metadata.length += file.metadata.length
         self.files.append(file)
         file.update(signal=False)
-        self.item.add_file(file)
+        if self.item:
+            self.item.add_file(file)
 
     def remove_file(self, file):
         self.metadata['totaltracks'] -= 1
         self.metadata.length -= file.metadata.length
         self.files.remove(file)
-        self.item.remove_file(file)
+        if self.item:
+            self.item.remove_file(file)
         if not self.special and self.get_num_files() == 0:
             self.tagger.remove_cluster(self)
 
@@ -132,7 +135,7 @@ class Cluster(QtCore.QObject, Item):
             return self.metadata['albumartist']
         return self.metadata[column]
 
-    def _compare_to_release(self, release):
+    def _compare_to_release(self, release, profile=None):
         """
         Compare cluster metadata to a MusicBrainz release. Produces a
         probability as a linear combination of weights that the
@@ -155,7 +158,7 @@ class Cluster(QtCore.QObject, Item):
         parts.append((similarity2(a, b), w["artist"]))
         total += w["artist"]
 
-        t, p = self.metadata.compare_to_release(release, w, self.config)
+        t, p = self.metadata.compare_to_release(release, w, self.config, profile)
         total += t
         parts.extend(p)
 
@@ -176,8 +179,9 @@ class Cluster(QtCore.QObject, Item):
 
         # multiple matches -- calculate similarities to each of them
         matches = []
+        profile = ReleaseScoringProfile.get(self.config).for_lookup()
         for release in releases:
-            matches.append((self._compare_to_release(release), release))
+            matches.append((self._compare_to_release(release, profile), release))
         matches.sort(reverse=True)
         #self.log.debug("Matches: %r", matches)
 
@@ -426,7 +430,8 @@ class ClusterEngine(object):
             for x in xrange(y):
                 if x != y:
                     c = similarity(self.clusterDict.getToken(x).lower(),
-                                   self.clusterDict.getToken(y).lower())
+                                   self.clusterDict.getToken(y).lower(),
+                                   threshold)
                     #print "'%s' - '%s' = %f" % (
                     #    self.clusterDict.getToken(x).encode('utf-8', 'replace').lower(),
                     #    self.clusterDict.getToken(y).encode('utf-8', 'replace').lower(), c)
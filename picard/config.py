@@ -26,6 +26,25 @@ class ConfigError(Exception):
     pass
 
 
+class SettingsSnapshot(dict):
+    """Read-only copy of the values of the options in a configuration
+    section.
+
+    Reading from it is a plain dictionary lookup, use it in code which
+    reads options often. ``version`` is different for every snapshot of a
+    section."""
+
+    def __init__(self, values, version):
+        dict.__init__(self, values)
+        self.version = version
+
+    def __read_only(self, *args, **kwargs):
+        raise TypeError("Settings snapshots are read-only")
+
+    __setitem__ = __delitem__ = clear = update = __read_only
+    pop = popitem = setdefault = __read_only
+
+
 class ConfigSection(LockableObject):
     """Configuration section."""
 
@@ -33,6 +52,9 @@ class ConfigSection(LockableObject):
         LockableObject.__init__(self)
         self.__config = config
         self.__name = name
+        self.__snapshot = None
+        self.__version = 0
+        self.__changes = 0
 
     def __getitem__(self, name):
         self.lock_for_read()
@@ -50,9 +72,35 @@ class ConfigSection(LockableObject):
         try:
             self.__config.setValue("%s/%s" % (self.__name, name),
                                   QtCore.QVariant(value))
+            self.__changes += 1
+            self.__snapshot = None
         finally:
             self.unlock()
 
+    def snapshot(self):
+        """Return a ``SettingsSnapshot`` of all options in this section.
+
+        The snapshot is reused until an option is changed or registered."""
+        snapshot = self.__snapshot
+        if snapshot is None or snapshot.num_options != len(Option.registry):
+            changes = self.__changes
+            num_options = len(Option.registry)
+            values = {}
+            for section, name in Option.registry.keys():
+                if section == self.__name:
+                    values[name] = self[name]
+            self.lock_for_write()
+            try:
+                self.__version += 1
+                snapshot = SettingsSnapshot(values, self.__version)
+                snapshot.num_options = num_options
+                # Don't keep it if an option was changed in the meantime
+                if changes == self.__changes:
+                    self.__snapshot = snapshot
+            finally:
+                self.unlock()
+        return snapshot
+
 
 class Config(QtCore.QSettings):
     """Configuration."""
@@ -65,6 +113,10 @@ class Config(QtCore.QSettings):
         self.profile = ConfigSection(self, "profile/default")
         self.current_preset = "default"
 
+    def snapshot(self):
+        """Return a ``SettingsSnapshot`` of the settings."""
+        return self.setting.snapshot()
+
     def switchProfile(self, profilename):
         """Sets the current profile."""
         key = u"profile/%s" % (profilename,)
@@ -28,7 +28,7 @@ import traceback
 from PyQt4 import QtCore
 from picard.track import Track
 from picard.mbxml import artist_credit_from_node
-from picard.metadata import Metadata
+from picard.metadata import Metadata, ReleaseScoringProfile
 from picard.ui.item import Item
 from picard.script import ScriptParser
 from picard.similarity import similarity2
@@ -45,8 +45,78 @@ from picard.util import (
     format_time,
     LockableObject,
     pathcmp,
-    mimetype
+    mimetype,
+    get_device,
     )
+from picard.util.lrucache import LRUCache
+
+
+# Devices of directories, only used from the main thread
+_device_cache = LRUCache(1000)
+
+def _get_device(dirname):
+    device = _device_cache.get(dirname)
+    if device is None:
+        device = _device_cache[dirname] = get_device(dirname)
+    return device
+
+
+# Locks for moving files into a directory, with the number of threads
+# holding or waiting for them. Unused locks are dropped.
+_directory_locks = {}
+_directory_locks_lock = QtCore.QMutex()
+
+def _lock_directory(dirname):
+    """Lock moving files into the directory ``dirname``."""
+    _directory_locks_lock.lock()
+    try:
+        entry = _directory_locks.get(dirname)
+        if entry is None:
+            entry = _directory_locks[dirname] = [QtCore.QMutex(), 0]
+        entry[1] += 1
+    finally:
+        _directory_locks_lock.unlock()
+    entry[0].lock()
+
+
+def _unlock_directory(dirname):
+    """Unlock the directory ``dirname`` locked with ``_lock_directory``."""
+    _directory_locks_lock.lock()
+    try:
+        entry = _directory_locks[dirname]
+        entry[0].unlock()
+        entry[1] -= 1
+        if not entry[1]:
+            del _directory_locks[dirname]
+    finally:
+        _directory_locks_lock.unlock()
+
+
+# Settings that change how the tags are written, a file whose tags are
+# unchanged is still saved if one of them changed since it was loaded
+TAG_FORMAT_SETTINGS = ('write_id3v1', 'write_id3v23', 'id3v2_encoding',
+                       'remove_ape_from_mp3', 'remove_id3_from_flac',
+                       'tpe2_albumartist')
+
+
+def tag_format(settings):
+    """Return the values of ``TAG_FORMAT_SETTINGS`` in ``settings``."""
+    return tuple([settings[name] for name in TAG_FORMAT_SETTINGS])
+
+
+class SavePlan(object):
+    """What saving a file has to do.
+
+    ``diff`` is the ``MetadataDiff`` to the tags last loaded from or saved
+    to the file, ``write_tags`` tells whether the tags have to be written
+    and ``tag_format`` is what ``tag_format()`` returns for the settings
+    they are written with. Renaming and moving are decided when saving,
+    they are no-ops if the file name doesn't change."""
+
+    def __init__(self, diff, write_tags, tag_format=None):
+        self.diff = diff
+        self.write_tags = write_tags
+        self.tag_format = tag_format
 
 
 class File(LockableObject, Item):
@@ -69,6 +139,8 @@ class File(LockableObject, Item):
         self.id = self.new_id()
         self.filename = filename
         self.base_filename = os.path.basename(filename)
+        self.parent = None
+        self.similarity = 1.0
         self._state = File.UNDEFINED
         self.state = File.PENDING
         self.error = None
@@ -78,10 +150,9 @@ class File(LockableObject, Item):
         self.saved_metadata = Metadata()
         self.metadata = self.user_metadata
 
-        self.similarity = 1.0
-        self.parent = None
-
         self.lookup_task = None
+        # Tag format settings of the last load or save, see tag_format()
+        self.tag_format = None
 
         self.comparison_weights = {"title": 13, "artist": 4, "album": 5,
             "length": 10, "totaltracks": 4, "releasetype": 20,
@@ -107,6 +178,7 @@ class File(LockableObject, Item):
             self.error = None
             self.state = self.NORMAL
             self._copy_loaded_metadata(result)
+            self.tag_format = tag_format(self.config.setting)
         self.update()
         return self
 
@@ -130,8 +202,9 @@ class File(LockableObject, Item):
 
     def copy_metadata(self, metadata):
         exceptions = ['musicip_puid', 'acoustid_id']
-        if self.config.setting['preserved_tags']:
-            exceptions.extend(re.split(r'\s+', self.config.setting['preserved_tags']))
+        preserved_tags = self.config.snapshot()['preserved_tags']
+        if preserved_tags:
+            exceptions.extend(re.split(r'\s+', preserved_tags))
         for tag in exceptions:
             self.saved_metadata[tag] = self.metadata[tag]
         self.metadata.copy(metadata)
@@ -149,16 +222,52 @@ class File(LockableObject, Item):
         self.set_pending()
         metadata = Metadata()
         metadata.copy(self.metadata)
+        plan = self._plan_save(metadata, settings)
         self.tagger.save_queue.put((
-            partial(self._save_and_rename, self.filename, metadata, settings),
-            partial(self._saving_finished, next),
-            QtCore.Qt.LowEventPriority + 2))
+            partial(self._save_and_rename, self.filename, metadata, settings,
+                    plan),
+            partial(self._saving_finished, next, plan),
+            QtCore.Qt.LowEventPriority + 2),
+            self._save_devices(settings))
+
+    def _save_devices(self, settings):
+        """Return the devices saving the file reads from or writes to."""
+        dirname = os.path.dirname(self.filename)
+        devices = set([_get_device(dirname)])
+        if settings["move_files"]:
+            move_to = settings["move_files_to"]
+            if not os.path.isabs(move_to):
+                move_to = os.path.normpath(os.path.join(dirname, move_to))
+            devices.add(_get_device(move_to))
+        return devices
+
+    def _plan_save(self, metadata, settings):
+        """Decide what saving ``metadata`` has to write to the file."""
+        diff = metadata.diff(self.orig_metadata)
+        format = tag_format(settings)
+        if settings["dont_write_tags"]:
+            write_tags = False
+        elif settings["clear_existing_tags"]:
+            # Tags we didn't load may have to be removed
+            write_tags = True
+        elif format != self.tag_format:
+            # The tags have to be converted to the new format
+            write_tags = True
+        else:
+            write_tags = bool(diff.changed or diff.removed or
+                (diff.images_changed and settings["save_images_to_tags"]))
+        return SavePlan(diff, write_tags, format)
 
-    def _save_and_rename(self, old_filename, metadata, settings):
+    def _save_and_rename(self, old_filename, metadata, settings, plan=None):
         """Save the metadata."""
         new_filename = old_filename
-        if not settings["dont_write_tags"]:
+        if plan is None:
+            plan = SavePlan(None, not settings["dont_write_tags"])
+        if plan.write_tags:
             self._save(old_filename, metadata, settings)
+        elif not settings["dont_write_tags"]:
+            self.log.debug("Tags of %r are unchanged, not saving them",
+                           old_filename)
         # Rename files
         if settings["rename_files"] or settings["move_files"]:
             new_filename = self._rename(old_filename, metadata, settings)
@@ -178,7 +287,7 @@ class File(LockableObject, Item):
         return new_filename
 
     @call_next
-    def _saving_finished(self, next, result=None, error=None):
+    def _saving_finished(self, next, plan=None, result=None, error=None):
         old_filename = new_filename = self.filename
         if error is not None:
             self.error = str(error)
@@ -196,6 +305,8 @@ class File(LockableObject, Item):
             self.orig_metadata['~length'] = format_time(length)
             for k, v in temp_info.items():
                 self.orig_metadata[k] = v
+            if plan is not None and plan.write_tags:
+                self.tag_format = plan.tag_format
             self.error = None
             self.clear_pending()
         return self, old_filename, new_filename
@@ -260,17 +371,23 @@ class File(LockableObject, Item):
             self._make_filename(old_filename, metadata, settings))
         if old_filename != new_filename + ext:
             new_dirname = os.path.dirname(new_filename)
-            if not os.path.isdir(encode_filename(new_dirname)):
-                os.makedirs(new_dirname)
-            tmp_filename = new_filename
-            i = 1
-            while (not pathcmp(old_filename, new_filename + ext) and
-                   os.path.exists(encode_filename(new_filename + ext))):
-                new_filename = "%s (%d)" % (tmp_filename, i)
-                i += 1
-            new_filename = new_filename + ext
-            self.log.debug("Moving file %r => %r", old_filename, new_filename)
-            shutil.move(encode_filename(old_filename), encode_filename(new_filename))
+            # Files are saved in parallel, don't pick the same free name
+            # for two of them
+            _lock_directory(new_dirname)
+            try:
+                if not os.path.isdir(encode_filename(new_dirname)):
+                    os.makedirs(new_dirname)
+                tmp_filename = new_filename
+                i = 1
+                while (not pathcmp(old_filename, new_filename + ext) and
+                       os.path.exists(encode_filename(new_filename + ext))):
+                    new_filename = "%s (%d)" % (tmp_filename, i)
+                    i += 1
+                new_filename = new_filename + ext
+                self.log.debug("Moving file %r => %r", old_filename, new_filename)
+                shutil.move(encode_filename(old_filename), encode_filename(new_filename))
+            finally:
+                _unlock_directory(new_dirname)
             return new_filename
         else:
             return old_filename
@@ -335,6 +452,7 @@ class File(LockableObject, Item):
             self.parent.remove_file(self)
         self.tagger.puidmanager.remove(self.metadata['musicip_puid'])
         self.tagger.acoustidmanager.remove(self)
+        self.tagger.identify_progress.finish(self)
         self.state = File.REMOVED
 
     def move(self, parent):
@@ -378,6 +496,7 @@ class File(LockableObject, Item):
             self.similarity = 1.0
             if self.state in (File.CHANGED, File.NORMAL):
                 self.state = File.NORMAL
+        self._update_album_state()
         if signal:
             self.log.debug("Updating file %r", self)
             if self.item:
@@ -437,19 +556,24 @@ class File(LockableObject, Item):
             elif self._state == File.PENDING:
                 File.num_pending_files -= 1
         self._state = state
+        self._update_album_state()
         if update:
             self.update()
         self.tagger.emit(QtCore.SIGNAL("file_state_changed"), File.num_pending_files)
 
     state = property(get_state, set_state)
 
+    def _update_album_state(self):
+        if isinstance(self.parent, Track):
+            self.parent.album._file_state_changed(self.parent, self)
+
     def column(self, column):
         m = self.metadata
         if column == "title" and not m["title"]:
             return self.base_filename
         return m[column]
 
-    def _compare_to_track(self, track):
+    def _compare_to_track(self, track, profile=None):
         """
         Compare file metadata to a MusicBrainz track.
 
@@ -496,7 +620,7 @@ class File(LockableObject, Item):
 
         scores = []
         for release in releases:
-            t, p = self.metadata.compare_to_release(release, w, self.config)
+            t, p = self.metadata.compare_to_release(release, w, self.config, profile)
             total_ = total + t
             parts_ = list(parts) + p
             scores.append((reduce(lambda x, y: x + y[0] * y[1] / total_, parts_, 0.0), release.id))
@@ -530,8 +654,9 @@ class File(LockableObject, Item):
 
         # multiple matches -- calculate similarities to each of them
         matches = []
+        profile = ReleaseScoringProfile.get(self.config).for_lookup()
         for track in tracks:
-            score, release = self._compare_to_track(track)
+            score, release = self._compare_to_track(track, profile)
             matches.append((score, track, release))
         matches.sort(reverse=True)
         #self.log.debug("Track matches: %r", matches)
@@ -566,6 +691,7 @@ class File(LockableObject, Item):
         """ Try to identify the file using the existing metadata. """
         self.tagger.window.set_statusbar_message(N_("Looking up the metadata for file %s..."), self.filename)
         self.clear_lookup_task()
+        self.tagger.identify_progress.start(self)
         self.lookup_task = self.tagger.xmlws.find_tracks(partial(self._lookup_finished, 'metadata'),
             track=self.metadata.get('title', ''),
             artist=self.metadata.get('artist', ''),
@@ -587,6 +713,7 @@ class File(LockableObject, Item):
         self.update()
 
     def clear_pending(self):
+        self.tagger.identify_progress.finish(self)
         if self.state == File.PENDING:
             self.state = File.NORMAL
             self.update()
@@ -24,6 +24,7 @@ import mutagen.wavpack
 import mutagen.optimfrog
 import mutagenext.tak
 from picard.file import File
+from picard.formats.padding import count_save
 from picard.metadata import Metadata
 from picard.util import encode_filename, sanitize_date, mimetype
 from os.path import isfile
@@ -147,7 +148,9 @@ class APEv2File(File):
                 tags['Cover Art (Front)'] = cover_filename + '\0' + data
                 break # can't save more than one item with the same name
                       # (mp3tags does this, but it's against the specs)
+        # APEv2 tags are after the audio data, it never has to be moved
         tags.save(encode_filename(filename))
+        count_save(False)
 
 class MusepackFile(APEv2File):
     """Musepack file."""
@@ -167,13 +170,14 @@ class WavPackFile(APEv2File):
         super(WavPackFile, self)._info(metadata, file)
         metadata['~format'] = self.NAME
 
-    def _save_and_rename(self, old_filename, metadata, settings):
+    def _save_and_rename(self, old_filename, metadata, settings, plan=None):
         """Includes an additional check for WavPack correction files"""
         wvc_filename = old_filename.replace(".wv", ".wvc")
         if isfile(wvc_filename):
             if settings["rename_files"] or settings["move_files"]:
                 self._rename(wvc_filename, metadata, settings)
-        return File._save_and_rename(self, old_filename, metadata, settings)
+        return File._save_and_rename(self, old_filename, metadata, settings,
+                                     plan)
 
 class OptimFROGFile(APEv2File):
     """OptimFROG file."""
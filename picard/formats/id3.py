@@ -24,7 +24,8 @@ from mutagen import id3
 from picard.metadata import Metadata
 from picard.file import File
 from picard.formats.mutagenext import compatid3
-from picard.util import encode_filename, sanitize_date
+from picard.formats.padding import tag_padding, count_save
+from picard.util import encode_filename, sanitize_date, partial
 from urlparse import urlparse
 
 
@@ -330,12 +331,14 @@ class ID3File(File):
         if tipl.people:
             tags.add(tipl)
 
+        padding = partial(tag_padding, settings=settings)
         if settings['write_id3v23']:
             tags.update_to_v23()
-            tags.save(encode_filename(filename), v2=3, v1=v1)
+            tags.save(encode_filename(filename), v2=3, v1=v1, padding=padding)
         else:
             tags.update_to_v24()
-            tags.save(encode_filename(filename), v2=4, v1=v1)
+            tags.save(encode_filename(filename), v2=4, v1=v1, padding=padding)
+        count_save(tags.rewritten)
 
         if self._IsMP3 and settings["remove_ape_from_mp3"]:
             try: mutagen.apev2.delete(encode_filename(filename))
@@ -58,7 +58,7 @@ class CompatID3(ID3):
             kwargs["known_frames"] = known_frames
         super(CompatID3, self).__init__(*args, **kwargs) 
 
-    def save(self, filename=None, v1=1, v2=4):
+    def save(self, filename=None, v1=1, v2=4, padding=None):
         """Save changes to a file.
 
         If no filename is given, the one most recently loaded is used.
@@ -71,8 +71,15 @@ class CompatID3(ID3):
               tags. If you want to save ID3v2.3 tags, you must call method
               update_to_v23 before saving the file.
 
+        padding -- function returning how much padding to add if the tag
+              doesn't fit in the space of the old tag, given the size of
+              the frames. By default the size is rounded up to 1 KB.
+
         The lack of a way to update only an ID3v1 tag is intentional.
+
+        Sets ``rewritten`` to whether the audio data had to be moved.
         """
+        self.rewritten = False
 
         # Sort frames by 'importance'
         order = ["TIT2", "TPE1", "TRCK", "TALB", "TPOS", "TDRC", "TCON"]
@@ -111,7 +118,8 @@ class CompatID3(ID3):
             if id3 != 'ID3': insize = -10
 
             if insize >= framesize: outsize = insize
-            else: outsize = (framesize + 1023) & ~0x3FF
+            elif padding is None: outsize = (framesize + 1023) & ~0x3FF
+            else: outsize = (framesize + padding(framesize) + 1023) & ~0x3FF
             framedata += '\x00' * (outsize - framesize)
 
             framesize = BitPaddedInt.to_str(outsize, width=4)
@@ -121,6 +129,7 @@ class CompatID3(ID3):
 
             if (insize < outsize):
                 insert_bytes(f, outsize-insize, insize+10)
+                self.rewritten = True
             f.seek(0)
             f.write(data)
 
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""Padding of tags in front of the audio data.
+
+If a new tag doesn't fit in the space of the old one, the audio data has
+to be moved, i.e. the whole file is rewritten. Reserving some space when
+that happens lets later saves of a slightly larger tag overwrite the old
+tag in place.
+"""
+
+from PyQt4 import QtCore
+
+
+MIN_PADDING = 1024
+MAX_PADDING = 1024 * 1024
+
+_lock = QtCore.QMutex()
+_saves = 0
+_rewrites = 0
+
+
+def tag_padding(tag_size, settings):
+    """Return the padding to reserve for a tag of ``tag_size`` bytes which
+    doesn't fit in the space of the old tag."""
+    padding = tag_size * settings["tag_padding_percent"] // 100
+    return min(max(padding, MIN_PADDING), MAX_PADDING)
+
+
+def count_save(rewritten):
+    """Count a saved file, ``rewritten`` tells whether the audio data had
+    to be moved."""
+    global _saves, _rewrites
+    _lock.lock()
+    try:
+        _saves += 1
+        if rewritten:
+            _rewrites += 1
+    finally:
+        _lock.unlock()
+
+
+def save_stats():
+    """Return how many files were saved and how many of them had to be
+    rewritten completely."""
+    _lock.lock()
+    try:
+        return {"saves": _saves, "rewrites": _rewrites}
+    finally:
+        _lock.unlock()
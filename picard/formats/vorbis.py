@@ -18,6 +18,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
 import base64
+import os.path
 import mutagen.flac
 import mutagen.ogg
 import mutagen.oggflac
@@ -25,6 +26,7 @@ import mutagen.oggspeex
 import mutagen.oggtheora
 import mutagen.oggvorbis
 from picard.file import File
+from picard.formats.padding import tag_padding, count_save
 from picard.metadata import Metadata
 from picard.util import encode_filename, sanitize_date
 
@@ -151,12 +153,33 @@ class VCommentFile(File):
                         base64.standard_b64encode(image.write()))
         file.tags.update(tags)
         kwargs = {}
-        if self._File == mutagen.flac.FLAC and settings["remove_id3_from_flac"]:
-            kwargs["deleteid3"] = True
+        if self._File == mutagen.flac.FLAC:
+            if settings["remove_id3_from_flac"]:
+                kwargs["deleteid3"] = True
+            self._reserve_padding(file, settings)
+        size = os.path.getsize(encode_filename(filename))
         try:
             file.save(**kwargs)
         except TypeError:
             file.save()
+        new_size = os.path.getsize(encode_filename(filename))
+        if self._File == mutagen.flac.FLAC:
+            # Only removing an ID3v1 tag can make it smaller
+            count_save(new_size > size)
+        else:
+            count_save(new_size != size)
+
+    def _reserve_padding(self, file, settings):
+        """Add padding for mutagen to use if the metadata blocks don't fit
+        in the space of the old ones anymore. Otherwise the padding is
+        reduced to fill exactly the old space."""
+        size = 0
+        for block in file.metadata_blocks:
+            if not isinstance(block, mutagen.flac.Padding):
+                size += len(block.write())
+        padding = mutagen.flac.Padding()
+        padding.length = tag_padding(size, settings)
+        file.metadata_blocks.append(padding)
 
 class FLACFile(VCommentFile):
     """FLAC file."""
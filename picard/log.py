@@ -19,62 +19,129 @@
 
 import sys
 import os
+import time
+import traceback
 from PyQt4 import QtCore
 import picard
 from picard.util import thread
+from picard.util.ringbuffer import RingBuffer
 
 
-def _stderr_receiver(prefix, msg):
-    sys.stderr.write("%s %s %s %s%s" % (prefix, str(QtCore.QThread.currentThreadId()), str(QtCore.QTime.currentTime().toString()), msg, os.linesep))
+DEBUG, INFO, WARNING, ERROR = range(4)
+
+_prefixes = {
+    DEBUG: "D:",
+    INFO: "I:",
+    WARNING: "W:",
+    ERROR: "E:",
+}
+
+
+def format_entry(entry):
+    """Format a log entry as a line of text."""
+    level, timestamp, thread_id, message, args = entry
+    if not isinstance(message, basestring):
+        message = repr(message)
+    if args:
+        try:
+            message = message % args
+        except (TypeError, ValueError):
+            message = "%s %r" % (message, args)
+    if isinstance(message, str):
+        message = message.decode("utf-8", "replace")
+    return u"%s %s %s %s" % (_prefixes[level], thread_id,
+        time.strftime("%H:%M:%S", time.localtime(timestamp)), message)
+
+
+def _stderr_receiver(entries):
+    for entry in entries:
+        sys.stderr.write(format_entry(entry).encode("utf-8", "replace") + os.linesep)
 
 
 class Log(object):
+    """Keeps the last ``capacity`` log entries and passes new ones to the
+    receivers.
 
-    def __init__(self):
-        self.entries = []
+    Messages below ``level`` are dropped right away. Entries store the
+    message and its arguments and are only formatted when displayed.
+    Receivers are called in the main thread with lists of entries, once per
+    event loop iteration at most.
+    """
+
+    capacity = 10000
+
+    def __init__(self, level=INFO):
+        self.level = level
+        self.entries = RingBuffer(self.capacity)
         self.receivers = [_stderr_receiver]
+        self._lock = QtCore.QMutex()
+        self._delivered = 0
+        self._delivery_pending = False
         picard.log.log = self
         picard.log.debug = self.debug
         picard.log.info = self.info
         picard.log.warning = self.warning
         picard.log.error = self.error
 
-    def _message(self, prefix, message, args, kwargs):
-        if not (isinstance(message, str) or isinstance(message, unicode)):
-            message = repr(message)
-        if args:
-            message = message % args
-        prefix = "%s" % (prefix,)
-        message = "%s" % (message,)
-        if isinstance(prefix, unicode):
-            prefix = prefix.encode("utf-8", "replace")
-        if isinstance(message, unicode):
-            message = message.encode("utf-8", "replace")
-        self.entries.append((prefix, message))
+    def _message(self, level, message, args):
+        entry = (level, time.time(), QtCore.QThread.currentThreadId(), message, args)
+        self._lock.lock()
+        self.entries.append(entry)
+        deliver = not self._delivery_pending
+        self._delivery_pending = True
+        self._lock.unlock()
+        if deliver:
+            thread.proxy_to_main(self._deliver)
+
+    def _deliver(self):
+        self._lock.lock()
+        entries = self.entries.since(self._delivered)
+        self._delivered = self.entries.total
+        self._delivery_pending = False
+        self._lock.unlock()
         for func in self.receivers:
             try:
-                func(prefix, message)
+                func(entries)
             except Exception, e:
-                import traceback
                 traceback.print_exc()
 
+    def delivered_entries(self):
+        """Return the entries already passed to the receivers. A receiver
+        added in the main thread gets the others with the next delivery."""
+        self._lock.lock()
+        try:
+            entries = self.entries.since(0)
+            pending = self.entries.total - self._delivered
+        finally:
+            self._lock.unlock()
+        if pending:
+            entries = entries[:max(0, len(entries) - pending)]
+        return entries
+
     def add_receiver(self, receiver):
         self.receivers.append(receiver)
 
+    def remove_receiver(self, receiver):
+        self.receivers.remove(receiver)
+
     def debug(self, message, *args, **kwargs):
-        pass
+        if self.level <= DEBUG:
+            self._message(DEBUG, message, args)
 
     def info(self, message, *args, **kwargs):
-        thread.proxy_to_main(self._message, "I:", message, args, kwargs)
+        if self.level <= INFO:
+            self._message(INFO, message, args)
 
     def warning(self, message, *args, **kwargs):
-        thread.proxy_to_main(self._message, "W:", message, args, kwargs)
+        if self.level <= WARNING:
+            self._message(WARNING, message, args)
 
     def error(self, message, *args, **kwargs):
-        thread.proxy_to_main(self._message, "E:", message, args, kwargs)
+        if self.level <= ERROR:
+            self._message(ERROR, message, args)
 
 
 class DebugLog(Log):
 
-    def debug(self, message, *args, **kwargs):
-        thread.proxy_to_main(self._message, "D:", message, args, kwargs)
+    def __init__(self):
+        Log.__init__(self, level=DEBUG)
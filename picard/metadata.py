@@ -17,6 +17,7 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
+import copy
 import re
 import unicodedata
 from picard.plugin import ExtensionPoint
@@ -25,6 +26,36 @@ from picard.util import format_time, load_release_type_scores
 
 MULTI_VALUED_JOINER = '; '
 
+# Hidden tags which are saved to files
+SAVED_HIDDEN_TAGS = ("~rating", "~id3:")
+
+
+def is_saved_tag(name):
+    """Return whether the tag ``name`` gets saved to files."""
+    return not name.startswith("~") or name.startswith(SAVED_HIDDEN_TAGS)
+
+
+class MetadataDiff(object):
+    """Changes of the saved tags and the images between two ``Metadata``.
+
+    ``changed`` maps the names of new or changed tags to their new values,
+    ``removed`` is the set of names of the removed tags. A diff is true
+    if there are any changes."""
+
+    def __init__(self, changed, removed, images_changed):
+        self.changed = changed
+        self.removed = removed
+        self.images_changed = images_changed
+
+    def __nonzero__(self):
+        return bool(self.changed or self.removed or self.images_changed)
+
+    def __repr__(self):
+        return "<MetadataDiff changed=%r removed=%r images_changed=%r>" % (
+            sorted(self.changed.keys()), sorted(self.removed),
+            self.images_changed)
+
+
 class Metadata(object):
     """List of metadata items with dict-like access."""
 
@@ -78,7 +109,13 @@ class Metadata(object):
         #print "******", reduce(lambda x, y: x + y[0] * y[1] / total, parts, 0.0)
         return reduce(lambda x, y: x + y[0] * y[1] / total, parts, 0.0)
 
-    def compare_to_release(self, release, weights, config):
+    def compare_to_release(self, release, weights, config, profile=None):
+        """Compare this metadata to a release node.
+
+        ``profile`` is the ``ReleaseScoringProfile`` to use, callers
+        comparing many releases should get it once and pass it in."""
+        if profile is None:
+            profile = ReleaseScoringProfile.get(config)
         total = 0.0
         parts = []
 
@@ -102,47 +139,34 @@ class Metadata(object):
             parts.append((score, weights["totaltracks"]))
             total += weights["totaltracks"]
 
-        preferred_countries = config.setting["preferred_release_countries"].split("  ")
-        preferred_formats = config.setting["preferred_release_formats"].split("  ")
-
-        total_countries = len(preferred_countries)
-        if total_countries:
-            score = 0.0
-            if "country" in release.children:
-                try:
-                    i = preferred_countries.index(release.country[0].text)
-                    score = float(total_countries - i) / float(total_countries)
-                except ValueError:
-                    pass
-            parts.append((score, weights["releasecountry"]))
-
-        total_formats = len(preferred_formats)
-        if total_formats:
-            score = 0.0
-            subtotal = 0
-            for medium in release.medium_list[0].medium:
-                if "format" in medium.children:
-                    try:
-                        i = preferred_formats.index(medium.format[0].text)
-                        score += float(total_formats - i) / float(total_formats)
-                    except ValueError:
-                        pass
-                    subtotal += 1
-            if subtotal > 0: score /= subtotal
-            parts.append((score, weights["format"]))
+        country_score, type_score = profile.release_scores(release)
+
+        if profile.total_countries:
+            parts.append((country_score, weights["releasecountry"]))
+
+        if profile.total_formats:
+            parts.append((profile.format_score(release), weights["format"]))
 
         if "releasetype" in weights:
-            type_scores = load_release_type_scores(config.setting["release_type_scores"])
-            if 'release_group' in release.children and 'type' in release.release_group[0].attribs:
-                release_type = release.release_group[0].type
-                score = type_scores.get(release_type, type_scores.get('Other', 0.5))
-            else:
-                score = 0.0
-            parts.append((score, weights["releasetype"]))
+            parts.append((type_score, weights["releasetype"]))
             total += weights["releasetype"]
 
         return (total, parts)
 
+    def diff(self, other):
+        """Return a ``MetadataDiff`` of the changes from ``other`` to this
+        metadata. Hidden tags which are not saved are ignored."""
+        changed = {}
+        removed = set()
+        other_items = other._items
+        for name, values in self._items.iteritems():
+            if is_saved_tag(name) and other_items.get(name) != values:
+                changed[name] = values
+        for name in other_items:
+            if name not in self._items and is_saved_tag(name):
+                removed.add(name)
+        return MetadataDiff(changed, removed, self.images != other.images)
+
     def copy(self, other):
         self._items = {}
         for key, values in other.rawitems():
@@ -253,6 +277,85 @@ class Metadata(object):
         return self._items.pop(key, None)
 
 
+class ReleaseScoringProfile(object):
+    """Release preferences from the options, prepared for scoring releases.
+
+    A profile is built once per change of the preferences. The copy
+    returned by ``for_lookup`` also remembers the scores of the releases
+    it has seen, for the duration of one lookup."""
+
+    _current = None
+
+    def __init__(self, preferred_countries, preferred_formats, release_type_scores):
+        self.key = (preferred_countries, preferred_formats, release_type_scores)
+        self.country_scores, self.total_countries = \
+            self._position_scores(preferred_countries.split("  "))
+        self.format_scores, self.total_formats = \
+            self._position_scores(preferred_formats.split("  "))
+        self.type_scores = load_release_type_scores(release_type_scores)
+        self.other_type_score = self.type_scores.get('Other', 0.5)
+        self._release_cache = None
+
+    @staticmethod
+    def _position_scores(values):
+        total = len(values)
+        scores = {}
+        for i, value in enumerate(values):
+            if value not in scores:
+                scores[value] = float(total - i) / float(total)
+        return scores, total
+
+    @classmethod
+    def get(cls, config):
+        """Return the profile for the current preferences in ``config``."""
+        setting = config.snapshot()
+        key = (setting["preferred_release_countries"],
+               setting["preferred_release_formats"],
+               setting["release_type_scores"])
+        profile = cls._current
+        if profile is None or profile.key != key:
+            profile = cls._current = cls(*key)
+        return profile
+
+    def for_lookup(self):
+        """Return a copy of this profile which caches release scores."""
+        profile = copy.copy(self)
+        profile._release_cache = {}
+        return profile
+
+    def release_scores(self, release):
+        """Return the country and release type scores of ``release``."""
+        cache = self._release_cache
+        if cache is not None and release.id in cache:
+            return cache[release.id]
+        country_score = 0.0
+        if "country" in release.children:
+            country_score = self.country_scores.get(release.country[0].text, 0.0)
+        if 'release_group' in release.children and 'type' in release.release_group[0].attribs:
+            release_type = release.release_group[0].type
+            type_score = self.type_scores.get(release_type, self.other_type_score)
+        else:
+            # The response has no release group type, another one may have
+            type_score = 0.0
+            cache = None
+        scores = (country_score, type_score)
+        if cache is not None:
+            cache[release.id] = scores
+        return scores
+
+    def format_score(self, release):
+        """Return the format score of the media listed in ``release``."""
+        score = 0.0
+        subtotal = 0
+        for medium in release.medium_list[0].medium:
+            if "format" in medium.children:
+                score += self.format_scores.get(medium.format[0].text, 0.0)
+                subtotal += 1
+        if subtotal > 0:
+            score /= subtotal
+        return score
+
+
 _album_metadata_processors = ExtensionPoint()
 _track_metadata_processors = ExtensionPoint()
 
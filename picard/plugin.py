@@ -55,6 +55,12 @@ class ExtensionPoint(QtCore.QObject):
     def __init__(self):
         QtCore.QObject.__init__(self)
         self.__items = []
+        self.__changes = 0
+        # Items of enabled plugins, the registry changes and settings
+        # snapshot they were collected for, and how often they changed
+        self.__active_items = []
+        self.__active_key = None
+        self.__active_version = 0
         _extension_points.append(self)
 
     def register(self, module, item):
@@ -63,15 +69,35 @@ class ExtensionPoint(QtCore.QObject):
         else:
             module = None
         self.__items.append((module, item))
+        self.__changes += 1
 
     def unregister_module(self, name):
         self.__items = filter(lambda i: i[0] != name, self.__items)
+        self.__changes += 1
+
+    def __update(self):
+        # The settings snapshot is replaced whenever a setting changes, so
+        # its version tells whether ``enabled_plugins`` may have changed
+        settings = self.config.snapshot()
+        key = (self.__changes, settings.version)
+        if key != self.__active_key:
+            enabled_plugins = settings["enabled_plugins"].split()
+            items = [item for module, item in self.__items
+                     if module is None or module in enabled_plugins]
+            if items != self.__active_items:
+                self.__active_items = items
+                self.__active_version += 1
+            self.__active_key = key
+
+    def __get_version(self):
+        self.__update()
+        return self.__active_version
+    version = property(__get_version, doc="""Changes whenever the items
+        returned by iterating over the extension point change.""")
 
     def __iter__(self):
-        enabled_plugins = self.config.setting["enabled_plugins"].split()
-        for module, item in self.__items:
-            if module is None or module in enabled_plugins:
-                yield item
+        self.__update()
+        return iter(self.__active_items)
 
 
 class PluginWrapper(object):
@@ -21,9 +21,12 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
 import re
+from timeit import default_timer
+from PyQt4 import QtCore
 from picard.metadata import Metadata
 from picard.metadata import MULTI_VALUED_JOINER
 from picard.plugin import ExtensionPoint
+from picard.util.lrucache import LRUCache
 from inspect import getargspec
 
 class ScriptError(Exception): pass
@@ -55,7 +58,7 @@ class ScriptVariable(object):
 
 class ScriptFunction(object):
 
-    def __init__(self, name, args, parser):
+    def __init__(self, name, args, parser, position=None):
         try:
             expected_args = parser.functions[name][2]
             if expected_args and (len(args) not in expected_args):
@@ -74,6 +77,8 @@ class ScriptFunction(object):
 
         self.name = name
         self.args = args
+        # (line, column) of the function in the script
+        self.position = position
 
     def __repr__(self):
         return "<ScriptFunction $%s(%r)>" % (self.name, self.args)
@@ -96,6 +101,289 @@ class ScriptExpression(list):
         return "".join(result)
 
 
+class CompiledExpression(ScriptExpression):
+    """Script expression evaluated by a compiled function.
+
+    It still contains the parsed items, so functions which get their
+    arguments unevaluated can inspect them as before."""
+
+    def __init__(self, items, function, dependencies=None, changes=()):
+        ScriptExpression.__init__(self, items)
+        self.eval = function
+        self.dependencies = dependencies
+        self.changes = changes
+
+
+class _Constant(object):
+    """Value of a script fragment known at compile time."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _constant_function(value):
+    return lambda parser: value
+
+
+def _compile_node(node, parser):
+    """Lower a parsed node to a function of the parser, or a _Constant."""
+    if isinstance(node, ScriptText):
+        return _Constant(unicode(node))
+    elif isinstance(node, ScriptVariable):
+        return _compile_variable(node)
+    elif isinstance(node, ScriptFunction):
+        if parser.profiler is not None:
+            return _compile_profiled_function(node, parser, parser.profiler)
+        return _compile_function(node, parser)
+    elif isinstance(node, ScriptExpression):
+        return _compile_expression(node, parser)
+    # Unknown node type, leave it to its own eval
+    return node.eval
+
+
+def _variable_name(name):
+    if name.startswith(u"_"):
+        name = u"~" + name[1:]
+    return name
+
+
+def _compile_variable(node):
+    name = _variable_name(node.name)
+    def variable(parser):
+        return parser.context.get(name, u"")
+    return variable
+
+
+def _compile_expression(expression, parser):
+    parts = []
+    for item in expression:
+        part = _compile_node(item, parser)
+        # Join neighbouring constants already
+        if (isinstance(part, _Constant) and parts and
+            isinstance(parts[-1], _Constant)):
+            parts[-1] = _Constant("".join([parts[-1].value, part.value]))
+        else:
+            parts.append(part)
+    if not parts:
+        return _Constant("")
+    if len(parts) == 1:
+        part = parts[0]
+        if isinstance(part, _Constant):
+            return _Constant("".join([part.value]))
+        def expression(parser):
+            return "".join([part(parser)])
+        return expression
+    functions = []
+    for part in parts:
+        if isinstance(part, _Constant):
+            functions.append(_constant_function(part.value))
+        else:
+            functions.append(part)
+    def expression(parser):
+        return "".join([f(parser) for f in functions])
+    return expression
+
+
+def _compile_argument(expression, parser):
+    """Compile an argument for a function which evaluates it itself."""
+    compiled = _compile_expression(expression, parser)
+    if isinstance(compiled, _Constant):
+        return CompiledExpression(expression, _constant_function(compiled.value)), True
+    return CompiledExpression(expression, compiled), False
+
+
+def _compile_function(node, parser):
+    function, eval_args, num_args = parser.functions[node.name]
+    if eval_args:
+        args = [_compile_expression(arg, parser) for arg in node.args]
+        constant = all([isinstance(arg, _Constant) for arg in args])
+        if constant:
+            values = tuple([arg.value for arg in args])
+        else:
+            if (function in _REGEX_FUNCTIONS and len(args) > 1 and
+                isinstance(args[1], _Constant)):
+                # Compile the literal pattern now
+                try:
+                    regex = _compile_regex(args[1].value)
+                except re.error:
+                    pass
+                else:
+                    function = _REGEX_FUNCTIONS[function]
+                    args[1] = _Constant(regex)
+            args = [_constant_function(arg.value) if isinstance(arg, _Constant) else arg
+                    for arg in args]
+            def call(parser):
+                return function(parser, *[arg(parser) for arg in args])
+            return call
+    else:
+        compiled = [_compile_argument(arg, parser) for arg in node.args]
+        values = tuple([arg for arg, is_constant in compiled])
+        constant = all([is_constant for arg, is_constant in compiled])
+
+    if constant and function in _CONSTANT_FUNCTIONS:
+        try:
+            return _Constant(function(parser, *values))
+        except Exception:
+            # Let it fail the same way when the script is run
+            pass
+    def call(parser):
+        return function(parser, *values)
+    return call
+
+
+def _compile_profiled_function(node, parser, profiler):
+    call = _compile_function(node, parser)
+    if isinstance(call, _Constant):
+        return call
+    stats = profiler.call_site(parser._text, node.name, node.position)
+    def profiled(parser):
+        start = default_timer()
+        try:
+            return call(parser)
+        finally:
+            stats[0] += 1
+            stats[1] += default_timer() - start
+    return profiled
+
+
+def _literal_argument(argument):
+    """Return the text of an argument without variables or functions."""
+    if isinstance(argument, ScriptExpression):
+        for item in argument:
+            if not isinstance(item, ScriptText):
+                return None
+        return u"".join(argument)
+    return None
+
+
+def _collect_dependencies(node, parser, names, changes):
+    if isinstance(node, ScriptText):
+        return True
+    elif isinstance(node, ScriptVariable):
+        names.add(_variable_name(node.name))
+        return True
+    elif isinstance(node, ScriptFunction):
+        function = parser.functions[node.name][0]
+        args = node.args
+        if function in _VARIABLE_FUNCTIONS:
+            num_names = _VARIABLE_FUNCTIONS[function]
+            for i, arg in enumerate(args[:num_names]):
+                name = _literal_argument(arg)
+                if name is None:
+                    return False
+                name = _variable_name(name)
+                names.add(name)
+                if i == 0 and function is not func_get:
+                    changes.add(name)
+            args = args[num_names:]
+        elif function not in _CONSTANT_FUNCTIONS:
+            return False
+        for arg in args:
+            if not _collect_dependencies(arg, parser, names, changes):
+                return False
+        return True
+    elif isinstance(node, ScriptExpression):
+        for item in node:
+            if not _collect_dependencies(item, parser, names, changes):
+                return False
+        return True
+    return False
+
+
+def script_dependencies(expression, parser, changes=None):
+    """Return the names of the variables a parsed script reads or writes.
+
+    Returns ``None`` if the result of the script can depend on something
+    else, e.g. if it calls a plugin function or gets a variable whose name
+    is not a literal. The names of the variables the script can change are
+    added to the set ``changes``."""
+    names = set()
+    if changes is None:
+        changes = set()
+    if _collect_dependencies(expression, parser, names, changes):
+        return tuple(sorted(names))
+    return None
+
+
+class ScriptProfiler(object):
+    """Call counts and cumulative run times of the functions in compiled
+    scripts, per function and per position in the scripts.
+
+    The time of a call includes the time of the calls in its arguments.
+    Script runs skipped because their result was cached are not counted."""
+
+    def __init__(self):
+        self._sites = {}
+        self._lock = QtCore.QMutex()
+
+    def call_site(self, script, name, position):
+        """Return the ``[calls, seconds]`` counters of a function call."""
+        self._lock.lock()
+        try:
+            return self._sites.setdefault((script, name, position), [0, 0.0])
+        finally:
+            self._lock.unlock()
+
+    def dump(self):
+        """Return the collected data, sorted by cumulative time.
+
+        The result only contains lists, dictionaries, strings and numbers,
+        so it can be saved as JSON."""
+        self._lock.lock()
+        try:
+            sites = [(key, list(stats)) for key, stats in self._sites.items()]
+        finally:
+            self._lock.unlock()
+        functions = {}
+        positions = []
+        for (script, name, position), (calls, seconds) in sites:
+            if not calls:
+                continue
+            totals = functions.setdefault(name, [0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+            line, column = position or (0, 0)
+            positions.append({
+                "function": name,
+                "script": script,
+                "line": line,
+                "column": column,
+                "calls": calls,
+                "seconds": seconds,
+            })
+        functions = [{"function": name, "calls": calls, "seconds": seconds}
+                     for name, (calls, seconds) in functions.items()]
+        functions.sort(key=lambda f: f["seconds"], reverse=True)
+        positions.sort(key=lambda p: p["seconds"], reverse=True)
+        return {"functions": functions, "positions": positions}
+
+    def log(self, log, limit=10):
+        """Write the ``limit`` most expensive functions and positions to
+        ``log``."""
+        dump = self.dump()
+        log.info("Script profile, by function:")
+        for f in dump["functions"][:limit]:
+            log.info("  $%s: %d calls, %.1f ms", f["function"], f["calls"],
+                     f["seconds"] * 1000)
+        log.info("Script profile, by position:")
+        for p in dump["positions"][:limit]:
+            script = p["script"].split("\n", 1)[0]
+            if len(script) > 40:
+                script = script[:37] + "..."
+            log.info("  $%s at line %d, column %d of %r: %d calls, %.1f ms",
+                     p["function"], p["line"], p["column"], script,
+                     p["calls"], p["seconds"] * 1000)
+
+    def clear(self):
+        self._lock.lock()
+        try:
+            for stats in self._sites.values():
+                stats[0] = 0
+                stats[1] = 0.0
+        finally:
+            self._lock.unlock()
+
+
 def isidentif(ch):
     return ch.isalnum() or ch == '_'
 
@@ -114,7 +402,41 @@ Grammar:
 """
 
     _function_registry = ExtensionPoint()
-    _cache = {}
+    _functions = {}
+    _functions_version = None
+    # Parsed and compiled scripts by (script, function table version,
+    # interpret, profiler)
+    _cache = LRUCache(100)
+    # Results of scripts by (script, function table version, values of
+    # the variables the script uses)
+    _results = LRUCache(2000)
+    _results_evaluated = 0
+    _results_skipped = 0
+    _cache_lock = QtCore.QMutex()
+    # Set by start_profiling
+    _profiler = None
+
+    def __init__(self, interpret=False):
+        """If ``interpret`` is true, scripts are run by walking the parsed
+        tree instead of being compiled."""
+        self.interpret = interpret
+        self.profiler = ScriptParser._profiler
+
+    @classmethod
+    def start_profiling(cls):
+        """Profile the function calls of scripts compiled from now on.
+
+        Returns the ``ScriptProfiler`` collecting the results."""
+        if cls._profiler is None:
+            cls._profiler = ScriptProfiler()
+        return cls._profiler
+
+    @classmethod
+    def stop_profiling(cls):
+        """Stop profiling scripts and return the profiler, if any."""
+        profiler = cls._profiler
+        cls._profiler = None
+        return profiler
 
     def __raise_eof(self):
         raise EndOfFile("Unexpected end of script at position %d, line %d" % (self._x, self._y))
@@ -157,13 +479,15 @@ Grammar:
 
     def parse_function(self):
         start = self._pos
+        position = (self._y, self._x - 1)
         while True:
             ch = self.read()
             if ch == '(':
                 name = self._text[start:self._pos-1]
                 if name not in self.functions:
                     raise UnknownFunction("Unknown function '%s'" % name)
-                return ScriptFunction(name, self.parse_arguments(), self)
+                return ScriptFunction(name, self.parse_arguments(), self,
+                                      position)
             elif ch is None:
                 self.__raise_eof()
             elif not isidentif(ch):
@@ -226,9 +550,19 @@ Grammar:
         return (tokens, ch)
 
     def load_functions(self):
-        self.functions = {}
-        for name, function, eval_args, num_args in ScriptParser._function_registry:
-            self.functions[name] = (function, eval_args, num_args)
+        """Get the table of enabled script functions.
+
+        The table is only rebuilt if the registered or enabled plugins have
+        changed since it was built last."""
+        version = ScriptParser._function_registry.version
+        if version != ScriptParser._functions_version:
+            functions = {}
+            for name, function, eval_args, num_args in ScriptParser._function_registry:
+                functions[name] = (function, eval_args, num_args)
+            ScriptParser._functions = functions
+            ScriptParser._functions_version = version
+        self.functions = ScriptParser._functions
+        self.functions_version = version
 
     def parse(self, script, functions=False):
         """Parse the script."""
@@ -241,15 +575,113 @@ Grammar:
             self.load_functions()
         return self.parse_expression(True)[0]
 
+    def compile(self, script, functions=False):
+        """Parse the script and compile it to Python functions.
+
+        The result is an expression, its ``eval`` method takes the parser
+        just like the one of a parsed script. Calls of built-in functions
+        with only literal arguments are evaluated here already.
+
+        The ``dependencies`` attribute of the result lists the variables
+        the script uses and ``changes`` the ones it can change, see
+        ``script_dependencies``."""
+        expression = self.parse(script, functions)
+        compiled = _compile_expression(expression, self)
+        if isinstance(compiled, _Constant):
+            compiled = _constant_function(compiled.value)
+        changes = set()
+        dependencies = script_dependencies(expression, self, changes)
+        if dependencies is not None:
+            changes = tuple([(i, name) for i, name in enumerate(dependencies)
+                             if name in changes])
+        return CompiledExpression(expression, compiled, dependencies, changes)
+
     def eval(self, script, context=None, file=None):
         """Parse and evaluate the script."""
         self.context = context if context is not None else Metadata()
         self.file = file
         self.load_functions()
-        key = hash(script)
-        if key not in ScriptParser._cache:
-            ScriptParser._cache[key] = self.parse(script, True)
-        return ScriptParser._cache[key].eval(self)
+        key = (script, self.functions_version, self.interpret, self.profiler)
+        cache = ScriptParser._cache
+        lock = ScriptParser._cache_lock
+        lock.lock()
+        try:
+            expression = cache.get(key)
+        finally:
+            lock.unlock()
+        if expression is None:
+            if self.interpret:
+                expression = self.parse(script, True)
+            else:
+                expression = self.compile(script, True)
+            lock.lock()
+            try:
+                cache[key] = expression
+            finally:
+                lock.unlock()
+        if self.interpret or expression.dependencies is None:
+            return expression.eval(self)
+        return self.__eval_memoized(key, expression)
+
+    def __eval_memoized(self, key, expression):
+        """Evaluate a script which only depends on the values of its
+        variables, reusing the result of an earlier run on the same values.
+
+        Changes the script made to its variables are stored with the
+        result and applied again when the run is skipped."""
+        context = self.context
+        names = expression.dependencies
+        try:
+            values = tuple(map(tuple, map(context.getall, names)))
+            key = (key[0], key[1], values)
+            hash(key)
+        except (AttributeError, TypeError):
+            return expression.eval(self)
+        lock = ScriptParser._cache_lock
+        lock.lock()
+        try:
+            memo = ScriptParser._results.get(key)
+            if memo is None:
+                ScriptParser._results_evaluated += 1
+            else:
+                ScriptParser._results_skipped += 1
+        finally:
+            lock.unlock()
+        if memo is not None:
+            result, changes = memo
+            for name, new_values in changes:
+                if new_values:
+                    context[name] = list(new_values)
+                elif name in context:
+                    del context[name]
+            return result
+        result = expression.eval(self)
+        changes = []
+        for i, name in expression.changes:
+            new_values = tuple(context.getall(name))
+            if new_values != values[i]:
+                changes.append((name, new_values))
+        lock.lock()
+        try:
+            ScriptParser._results[key] = (result, tuple(changes))
+        finally:
+            lock.unlock()
+        return result
+
+    @classmethod
+    def result_cache_stats(cls):
+        """Return how many script runs were skipped because the variables
+        used by the script had the same values as in an earlier run."""
+        lock = cls._cache_lock
+        lock.lock()
+        try:
+            return {
+                "evaluated": cls._results_evaluated,
+                "skipped": cls._results_skipped,
+                "cached": len(cls._results),
+            }
+        finally:
+            lock.unlock()
 
 
 def register_script_function(function, name=None, eval_args=True,
@@ -329,15 +761,46 @@ def func_inmulti(parser, text, value, separator=MULTI_VALUED_JOINER):
     """Splits ``text`` by ``separator``, and returns true if the resulting list contains ``value``."""
     return func_in(parser, text.split(separator) if separator else [text], value)
 
-def func_rreplace(parser, text, old, new):
-    return re.sub(old, new, text)
+_regex_cache = LRUCache(500)
+_regex_cache_lock = QtCore.QMutex()
 
-def func_rsearch(parser, text, pattern):
-    match = re.search(pattern, text)
+def _compile_regex(pattern):
+    """Compile ``pattern``, reusing earlier results. Invalid patterns are
+    remembered too, their error is raised again."""
+    _regex_cache_lock.lock()
+    try:
+        regex = _regex_cache.get(pattern)
+    finally:
+        _regex_cache_lock.unlock()
+    if regex is None:
+        try:
+            regex = re.compile(pattern)
+        except re.error, e:
+            regex = e
+        _regex_cache_lock.lock()
+        try:
+            _regex_cache[pattern] = regex
+        finally:
+            _regex_cache_lock.unlock()
+    if isinstance(regex, re.error):
+        raise regex
+    return regex
+
+def _rreplace(parser, text, regex, new):
+    return regex.sub(new, text)
+
+def _rsearch(parser, text, regex):
+    match = regex.search(text)
     if match:
         return match.group(1)
     return u""
 
+def func_rreplace(parser, text, old, new):
+    return _rreplace(parser, text, _compile_regex(old), new)
+
+def func_rsearch(parser, text, pattern):
+    return _rsearch(parser, text, _compile_regex(pattern))
+
 def func_num(parser, text, length):
     format = "%%0%dd" % int(length)
     try:
@@ -601,3 +1064,28 @@ register_script_function(func_firstalphachar, "firstalphachar")
 register_script_function(func_initials, "initials")
 register_script_function(func_firstwords, "firstwords")
 register_script_function(func_truncate, "truncate")
+
+# Functions which only depend on their arguments, calls of these with
+# literal arguments are evaluated when the script is compiled
+_CONSTANT_FUNCTIONS = set([
+    func_if, func_if2, func_noop, func_left, func_right, func_lower,
+    func_upper, func_pad, func_strip, func_replace, func_in, func_inmulti,
+    func_rreplace, func_rsearch, func_num, func_trim, func_add, func_sub,
+    func_div, func_mod, func_mul, func_or, func_and, func_not, func_eq,
+    func_ne, func_lt, func_lte, func_gt, func_gte, func_len,
+    func_firstalphachar, func_initials, func_firstwords, func_truncate,
+])
+
+# Functions which get or set the variables named by their first arguments,
+# with the number of those arguments
+_VARIABLE_FUNCTIONS = {
+    func_get: 1, func_set: 1, func_unset: 1, func_setmulti: 1,
+    func_copy: 2, func_copymerge: 2,
+}
+
+# Functions getting a regular expression as second argument, with the
+# variant taking the compiled expression instead
+_REGEX_FUNCTIONS = {
+    func_rreplace: _rreplace,
+    func_rsearch: _rsearch,
+}
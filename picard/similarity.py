@@ -20,6 +20,7 @@
 import re
 from picard.util import unaccent, strip_non_alnum
 from picard.util.astrcmp import astrcmp
+from picard.util.lrucache import LRUCache
 
 
 _split_re = re.compile("\W", re.UNICODE)
@@ -36,24 +37,37 @@ _replace_words = {
     "disc 8": "CD8",
 }
 
+# The same album and track titles get compared against many releases and
+# tracks, so their normalized and tokenized forms are remembered
+_normalize_cache = LRUCache(5000)
+_tokenize_cache = LRUCache(5000)
+
 def normalize(orig_string):
     """Strips non-alphanumeric characters from a string unless doing so would make it blank."""
+    try:
+        return _normalize_cache[orig_string]
+    except KeyError:
+        pass
     string = strip_non_alnum(orig_string.lower())
     if not string:
         string = orig_string
     #string = " ".join(filter(lambda a: a not in _stop_words and len(a) > 1,
     #                         _split_re.split(string)))
     #string = unaccent(string)
+    _normalize_cache[orig_string] = string
     return string
 
-def similarity(a1, b1):
-    """Calculates similarity of single words as a function of their edit distance."""
+def similarity(a1, b1, threshold=0.0):
+    """Calculates similarity of single words as a function of their edit distance.
+
+    If ``threshold`` is given, 0.0 is returned as soon as it is clear that
+    the similarity would be lower than ``threshold``."""
     a2 = normalize(a1)
     if a2:
         b2 = normalize(b1)
     else:
-        b2 = ""
-    return astrcmp(a2, b2)
+        b2 = u""
+    return astrcmp(a2, b2, threshold)
     #sim1 = astrcmp(a1, b1)
     #if a2 or b2:
     #    sim2 = astrcmp(a2, b2)
@@ -65,14 +79,32 @@ def similarity(a1, b1):
 
 _split_words_re = re.compile('\W+', re.UNICODE)
 
+def tokenize(string):
+    """Returns a tuple of lower-cased words from ``string``."""
+    try:
+        return _tokenize_cache[string]
+    except KeyError:
+        pass
+    words = tuple(filter(bool, _split_words_re.split(string.lower())))
+    _tokenize_cache[string] = words
+    return words
+
+def cache_stats():
+    """Returns the hit rate statistics of the normalization caches."""
+    return {
+        'normalize': _normalize_cache.stats(),
+        'tokenize': _tokenize_cache.stats(),
+    }
+
 def similarity2(a, b):
     """Calculates similarity of a multi-word strings."""
-    alist = filter(bool, _split_words_re.split(a.lower()))
-    blist = filter(bool, _split_words_re.split(b.lower()))
+    alist = tokenize(a)
+    blist = tokenize(b)
     total = 0
     score = 0.0
     if len(alist) > len(blist):
         alist, blist = blist, alist
+    blist = list(blist)
     for a in alist:
         ms = 0.0
         mp = None
@@ -51,7 +51,7 @@ shutil.copystat = _patched_shutil_copystat
 import picard.resources
 import picard.plugins
 
-from picard import musicdns, version_string, log, acoustid
+from picard import musicdns, version_string, log, acoustid, similarity
 from picard.album import Album, NatAlbum
 from picard.browser.browser import BrowserIntegration
 from picard.browser.filelookup import FileLookup
@@ -59,7 +59,7 @@ from picard.cluster import Cluster, ClusterList, UnmatchedFiles
 from picard.config import Config
 from picard.disc import Disc, DiscError
 from picard.file import File
-from picard.formats import open as open_file
+from picard.formats import open as open_file, padding
 from picard.metadata import Metadata
 from picard.track import Track, NonAlbumTrack
 from picard.config import IntOption
@@ -83,24 +83,21 @@ from picard.util import (
     thread,
     mbid_validate
     )
+from picard.util.metrics import registry
+from picard.util.progress import Progress
 from picard.webservice import XmlWebService
 
-class Tagger(QtGui.QApplication):
+# Number of threads saving files, at most one per device is busy
+SAVE_THREADS = 4
 
-    file_state_changed = QtCore.pyqtSignal(int)
-    cluster_added = QtCore.pyqtSignal(Cluster)
-    cluster_removed = QtCore.pyqtSignal(Cluster)
-    album_added = QtCore.pyqtSignal(Album)
-    album_removed = QtCore.pyqtSignal(Album)
-
-    __instance = None
+# How often a summary of the metrics is logged, in ms
+METRICS_LOG_INTERVAL = 5 * 60 * 1000
 
-    def __init__(self, args, localedir, autoupdate, debug=False):
-        QtGui.QApplication.__init__(self, args)
-        self.__class__.__instance = self
+class BaseTagger(object):
+    """The file, cluster and album handling shared by the GUI and the batch
+    mode. Subclasses are also a QCoreApplication and define the signals."""
 
-        self._args = args
-        self._autoupdate = autoupdate
+    def setup(self, localedir, debug=False, profile_scripts=False):
         self.config = Config()
 
         if sys.platform == "win32":
@@ -112,15 +109,17 @@ class Tagger(QtGui.QApplication):
         # Initialize threading and allocate threads
         self.thread_pool = thread.ThreadPool(self)
 
-        self.load_queue = queue.Queue()
-        self.save_queue = queue.Queue()
-        self.analyze_queue = queue.Queue()
-        self.other_queue = queue.Queue()
+        self.load_queue = queue.Queue(name="load")
+        # Files are saved in parallel if they are on different devices
+        self.save_queue = queue.PartitionedQueue(name="save")
+        self.analyze_queue = queue.Queue(name="analyze")
+        self.other_queue = queue.Queue(name="other")
 
         threads = self.thread_pool.threads
         threads.append(thread.Thread(self.thread_pool, self.load_queue))
         threads.append(thread.Thread(self.thread_pool, self.load_queue))
-        threads.append(thread.Thread(self.thread_pool, self.save_queue))
+        for i in range(SAVE_THREADS):
+            threads.append(thread.PartitionedThread(self.thread_pool, self.save_queue))
         threads.append(thread.Thread(self.thread_pool, self.other_queue))
         threads.append(thread.Thread(self.thread_pool, self.other_queue))
         threads.append(thread.Thread(self.thread_pool, self.analyze_queue))
@@ -135,6 +134,14 @@ class Tagger(QtGui.QApplication):
             self.log = log.Log()
         self.log.debug("Starting Picard %s from %r", picard.__version__, os.path.abspath(__file__))
 
+        if profile_scripts:
+            self.script_profiler = ScriptParser.start_profiling()
+            self._script_profile_timer = QtCore.QTimer(self)
+            self._script_profile_timer.timeout.connect(self._log_script_profile)
+            self._script_profile_timer.start(60000)
+        else:
+            self.script_profiler = None
+
         # TODO remove this before the final release
         if sys.platform == "win32":
             olduserdir = "~\\Local Settings\\Application Data\\MusicBrainz Picard"
@@ -175,7 +182,6 @@ class Tagger(QtGui.QApplication):
 
         self.puidmanager = PUIDManager()
         self.acoustidmanager = AcoustIDManager()
-        self.browser_integration = BrowserIntegration()
 
         self.files = {}
         self.clusters = ClusterList()
@@ -183,7 +189,21 @@ class Tagger(QtGui.QApplication):
         self.mbid_redirects = {}
         self.unmatched_files = UnmatchedFiles()
         self.nats = None
-        self.window = MainWindow()
+        self.identify_progress = Progress(
+            N_("Identified %(done)s / %(total)s files (%(rate)d/s)"))
+
+        # Metrics, see picard.util.metrics
+        registry.register_collector("save_queue", self.save_queue.stats)
+        registry.register_collector("webservice", self.xmlws.queue_depths)
+        registry.register_collector("padding", padding.save_stats)
+        registry.register_collector("script_cache", ScriptParser.result_cache_stats)
+        registry.register_collector("similarity_cache", similarity.cache_stats)
+        if self.script_profiler is not None:
+            registry.register_collector("script_profile", self.script_profiler.dump)
+        self._metrics_logged = 0
+        self._metrics_timer = QtCore.QTimer(self)
+        self._metrics_timer.timeout.connect(self._log_metrics)
+        self._metrics_timer.start(METRICS_LOG_INTERVAL)
 
     def setup_gettext(self, localedir):
         """Setup locales, load translations, install gettext functions."""
@@ -253,44 +273,25 @@ class Tagger(QtGui.QApplication):
         if nat.loaded:
             self.nats.update()
 
+    def _log_metrics(self):
+        if registry.observations != self._metrics_logged:
+            self._metrics_logged = registry.observations
+            self.log.info("Metrics: %s", registry.summary())
+
+    def _log_script_profile(self):
+        if self.script_profiler.dump()["functions"]:
+            self.script_profiler.log(self.log)
+            self.script_profiler.clear()
+
     def exit(self):
         self.stopping = True
+        if self.script_profiler is not None:
+            self._log_script_profile()
         self._ofa.done()
         self._acoustid.done()
         self.thread_pool.stop()
-        self.browser_integration.stop()
         self.xmlws.stop()
 
-    def _run_init(self):
-        if self._args:
-            files = []
-            for file in self._args:
-                if os.path.isdir(file):
-                    self.add_directory(decode_filename(file))
-                else:
-                    files.append(decode_filename(file))
-            if files:
-                self.add_files(files)
-            del self._args
-
-    def run(self):
-        self.browser_integration.start()
-        self.window.show()
-        QtCore.QTimer.singleShot(0, self._run_init)
-        res = self.exec_()
-        self.exit()
-        return res
-
-    def event(self, event):
-        if event.type() == QtCore.QEvent.FileOpen:
-            f = str(event.file())
-            self.add_files([f])
-            # We should just return True here, except that seems to
-            # cause the event's sender to get a -9874 error, so
-            # apparently there's some magic inside QFileOpenEvent...
-            return 1
-        return QtGui.QApplication.event(self, event)
-
     def _file_loaded(self, result=None, error=None):
         file = result
         if file is not None and error is None and not file.has_error():
@@ -376,32 +377,6 @@ class Tagger(QtGui.QApplication):
         """Get file by a filename."""
         return self.files.get(filename, None)
 
-    def get_file_lookup(self):
-        """Return a FileLookup object."""
-        return FileLookup(self, self.config.setting["server_host"],
-                          self.config.setting["server_port"],
-                          self.browser_integration.port)
-
-    def search(self, text, type, adv=False):
-        """Search on the MusicBrainz website."""
-        lookup = self.get_file_lookup()
-        getattr(lookup, type + "Search")(text, adv)
-
-    def lookup(self, metadata):
-        """Lookup the metadata on the MusicBrainz website."""
-        lookup = self.get_file_lookup()
-        albumid = metadata["musicbrainz_albumid"]
-        trackid = metadata["musicbrainz_trackid"]
-        if trackid:
-            lookup.trackLookup(trackid)
-        elif albumid:
-            lookup.albumLookup(albumid)
-        else:
-            lookup.tagLookup(metadata["artist"], metadata["album"],
-                             metadata["title"], metadata["tracknumber"],
-                             str(metadata.length),
-                             metadata["~filename"], metadata["musicip_puid"])
-
     def get_files_from_objects(self, objects, save=False):
         """Return list of files from list of albums, clusters, tracks or files."""
         files = set()
@@ -444,8 +419,7 @@ class Tagger(QtGui.QApplication):
         if nat:
             return nat
         nat = NonAlbumTrack(id)
-        self.nats.tracks.append(nat)
-        self.nats.update(True)
+        self.nats.add_track(nat)
         if node:
             nat._parse_recording(node)
         else:
@@ -504,28 +478,6 @@ class Tagger(QtGui.QApplication):
         if files:
             self.remove_files(files)
 
-    def _lookup_disc(self, disc, result=None, error=None):
-        self.restore_cursor()
-        if error is not None:
-            QtGui.QMessageBox.critical(self.window, _(u"CD Lookup Error"),
-                _(u"Error while reading CD:\n\n%s") % error)
-        else:
-            disc.lookup()
-
-    def lookup_cd(self, action=None):
-        """Reads CD from the selected drive and tries to lookup the DiscID on MusicBrainz."""
-        if action is None:
-            device = self.config.setting["cd_lookup_device"].split(",", 1)[0]
-        else:
-            device = unicode(action.text())
-
-        disc = Disc()
-        self.set_wait_cursor()
-        self.other_queue.put((
-            partial(disc.read, encode_filename(device)),
-            partial(self._lookup_disc, disc),
-            QtCore.Qt.LowEventPriority))
-
     def _lookup_puid(self, file, result=None, error=None):
         puid = result
         if file.state == File.PENDING:
@@ -546,6 +498,7 @@ class Tagger(QtGui.QApplication):
         files = self.get_files_from_objects(objs)
         for file in files:
             file.set_pending()
+            self.identify_progress.start(file)
             if self.use_acoustid:
                 self._acoustid.analyze(file, partial(file._lookup_finished, 'acoustid'))
             else:
@@ -595,15 +548,6 @@ class Tagger(QtGui.QApplication):
     #  Utils
     # =======================================================================
 
-    def set_wait_cursor(self):
-        """Sets the waiting cursor."""
-        QtGui.QApplication.setOverrideCursor(
-            QtGui.QCursor(QtCore.Qt.WaitCursor))
-
-    def restore_cursor(self):
-        """Restores the cursor set by ``set_wait_cursor``."""
-        QtGui.QApplication.restoreOverrideCursor()
-
     def refresh(self, objs):
         for obj in objs:
             if isinstance(obj, Album):
@@ -611,21 +555,138 @@ class Tagger(QtGui.QApplication):
             elif isinstance(obj, NonAlbumTrack):
                 obj.load()
 
-    @classmethod
-    def instance(cls):
-        return cls.__instance
-
     def num_files(self):
         return len(self.files)
 
     def num_pending_files(self):
         return len([file for file in self.files.values() if file.state == File.PENDING])
 
+
+class Tagger(BaseTagger, QtGui.QApplication):
+
+    file_state_changed = QtCore.pyqtSignal(int)
+    cluster_added = QtCore.pyqtSignal(Cluster)
+    cluster_removed = QtCore.pyqtSignal(Cluster)
+    album_added = QtCore.pyqtSignal(Album)
+    album_removed = QtCore.pyqtSignal(Album)
+
+    __instance = None
+
+    def __init__(self, args, localedir, autoupdate, debug=False,
+                 profile_scripts=False):
+        QtGui.QApplication.__init__(self, args)
+        self.__class__.__instance = self
+
+        self._args = args
+        self._autoupdate = autoupdate
+        self.setup(localedir, debug, profile_scripts)
+        self.browser_integration = BrowserIntegration()
+        self.window = MainWindow()
+
+    def _run_init(self):
+        if self._args:
+            files = []
+            for file in self._args:
+                if os.path.isdir(file):
+                    self.add_directory(decode_filename(file))
+                else:
+                    files.append(decode_filename(file))
+            if files:
+                self.add_files(files)
+            del self._args
+
+    def exit(self):
+        BaseTagger.exit(self)
+        self.browser_integration.stop()
+
+    def run(self):
+        self.browser_integration.start()
+        self.window.show()
+        QtCore.QTimer.singleShot(0, self._run_init)
+        res = self.exec_()
+        self.exit()
+        return res
+
+    def event(self, event):
+        if event.type() == QtCore.QEvent.FileOpen:
+            f = str(event.file())
+            self.add_files([f])
+            # We should just return True here, except that seems to
+            # cause the event's sender to get a -9874 error, so
+            # apparently there's some magic inside QFileOpenEvent...
+            return 1
+        return QtGui.QApplication.event(self, event)
+
+    def get_file_lookup(self):
+        """Return a FileLookup object."""
+        return FileLookup(self, self.config.setting["server_host"],
+                          self.config.setting["server_port"],
+                          self.browser_integration.port)
+
+    def search(self, text, type, adv=False):
+        """Search on the MusicBrainz website."""
+        lookup = self.get_file_lookup()
+        getattr(lookup, type + "Search")(text, adv)
+
+    def lookup(self, metadata):
+        """Lookup the metadata on the MusicBrainz website."""
+        lookup = self.get_file_lookup()
+        albumid = metadata["musicbrainz_albumid"]
+        trackid = metadata["musicbrainz_trackid"]
+        if trackid:
+            lookup.trackLookup(trackid)
+        elif albumid:
+            lookup.albumLookup(albumid)
+        else:
+            lookup.tagLookup(metadata["artist"], metadata["album"],
+                             metadata["title"], metadata["tracknumber"],
+                             str(metadata.length),
+                             metadata["~filename"], metadata["musicip_puid"])
+
+    def _lookup_disc(self, disc, result=None, error=None):
+        self.restore_cursor()
+        if error is not None:
+            QtGui.QMessageBox.critical(self.window, _(u"CD Lookup Error"),
+                _(u"Error while reading CD:\n\n%s") % error)
+        else:
+            disc.lookup()
+
+    def lookup_cd(self, action=None):
+        """Reads CD from the selected drive and tries to lookup the DiscID on MusicBrainz."""
+        if action is None:
+            device = self.config.setting["cd_lookup_device"].split(",", 1)[0]
+        else:
+            device = unicode(action.text())
+
+        disc = Disc()
+        self.set_wait_cursor()
+        self.other_queue.put((
+            partial(disc.read, encode_filename(device)),
+            partial(self._lookup_disc, disc),
+            QtCore.Qt.LowEventPriority))
+
+    def set_wait_cursor(self):
+        """Sets the waiting cursor."""
+        QtGui.QApplication.setOverrideCursor(
+            QtGui.QCursor(QtCore.Qt.WaitCursor))
+
+    def restore_cursor(self):
+        """Restores the cursor set by ``set_wait_cursor``."""
+        QtGui.QApplication.restoreOverrideCursor()
+
+    @classmethod
+    def instance(cls):
+        return cls.__instance
+
 def help():
     print """Usage: %s [OPTIONS] [FILE] [FILE] ...
 
 Options:
     -d, --debug             enable debug-level logging
+    -P, --profile-scripts   log the time spent in tagger script functions
+    -b, --batch             tag the files without the GUI and exit
+        --report=FILE       write the decisions of the batch mode to FILE
+                            as JSON lines (default: standard output)
     -h, --help              display this help and exit
     -v, --version           display version information and exit
 """ % (sys.argv[0],)
@@ -637,8 +698,10 @@ def version():
 
 def main(localedir=None, autoupdate=True):
     signal.signal(signal.SIGINT, signal.SIG_DFL)
-    opts, args = getopt.getopt(sys.argv[1:], "hvd", ["help", "version", "debug"])
+    opts, args = getopt.getopt(sys.argv[1:], "hvdPb", ["help", "version", "debug", "profile-scripts", "batch", "report="])
     kwargs = {}
+    batch = False
+    report = None
     for opt, arg in opts:
         if opt in ("-h", "--help"):
             return help()
@@ -646,5 +709,17 @@ def main(localedir=None, autoupdate=True):
             return version()
         elif opt in ("-d", "--debug"):
             kwargs["debug"] = True
-    tagger = Tagger(args, localedir, autoupdate, **kwargs)
+        elif opt in ("-P", "--profile-scripts"):
+            kwargs["profile_scripts"] = True
+        elif opt in ("-b", "--batch"):
+            batch = True
+        elif opt == "--report":
+            report = arg
+    if batch:
+        from picard.batch import BatchTagger
+        if report:
+            kwargs["report"] = open(report, "w")
+        tagger = BatchTagger(args, localedir, **kwargs)
+    else:
+        tagger = Tagger(args, localedir, autoupdate, **kwargs)
     sys.exit(tagger.run())
@@ -52,7 +52,7 @@ class Track(DataObject, Item):
         if file not in self.linked_files:
             self.linked_files.append(file)
             self.num_linked_files += 1
-        self.album._add_file(self, file)
+            self.album._add_file(self, file)
         self.update_file_metadata(file)
 
     def update_file_metadata(self, file):
@@ -76,6 +76,10 @@ class Track(DataObject, Item):
     def update(self):
         if self.item:
             self.item.update()
+        else:
+            # Collapsed albums have no track items, the album row still
+            # shows the counts and state of the tracks
+            self.album.update(update_tracks=False)
 
     def iterfiles(self, save=False):
         for file in self.linked_files:
@@ -114,19 +118,20 @@ class Track(DataObject, Item):
 
     def _customize_metadata(self):
         tm = self.metadata
+        setting = self.config.snapshot()
 
         # Custom VA name
         if tm['musicbrainz_artistid'] == VARIOUS_ARTISTS_ID:
-            tm['artistsort'] = tm['artist'] = self.config.setting['va_name']
+            tm['artistsort'] = tm['artist'] = setting['va_name']
 
-        if self.config.setting['folksonomy_tags']:
-            self._convert_folksonomy_tags_to_genre()
+        if setting['folksonomy_tags']:
+            self._convert_folksonomy_tags_to_genre(setting)
 
         # Convert Unicode punctuation
-        if self.config.setting['convert_punctuation']:
+        if setting['convert_punctuation']:
             tm.apply_func(asciipunct)
 
-    def _convert_folksonomy_tags_to_genre(self):
+    def _convert_folksonomy_tags_to_genre(self, setting):
         # Combine release and track tags
         tags = dict(self.folksonomy_tags)
         for name, count in self.album.folksonomy_tags.iteritems():
@@ -141,9 +146,9 @@ class Track(DataObject, Item):
             taglist.append((100 * count / maxcount, name))
         taglist.sort(reverse=True)
         # And generate the genre metadata tag
-        maxtags = self.config.setting['max_tags']
-        minusage = self.config.setting['min_tag_usage']
-        ignore_tags = self.config.setting['ignore_tags']
+        maxtags = setting['max_tags']
+        minusage = setting['min_tag_usage']
+        ignore_tags = setting['ignore_tags']
         genre = []
         for usage, name in taglist[:maxtags]:
             if name in ignore_tags:
@@ -152,7 +157,7 @@ class Track(DataObject, Item):
                 break
             name = _TRANSLATE_TAGS.get(name, name.title())
             genre.append(name)
-        join_tags = self.config.setting['join_tags']
+        join_tags = setting['join_tags']
         if join_tags:
             genre = [join_tags.join(genre)]
         self.metadata['genre'] = genre
@@ -220,6 +225,8 @@ class NonAlbumTrack(Track):
         self.loaded = True
         if self.callback:
             self.callback()
+        # The title and trackid the album's match index uses have changed
+        self.album._build_match_index()
         self.tagger.nats.update(True)
 
     def run_when_loaded(self, func):
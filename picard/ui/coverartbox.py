@@ -17,12 +17,51 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
+import hashlib
 import os
 from PyQt4 import QtCore, QtGui, QtNetwork
 from picard.album import Album
+from picard.cluster import Cluster
 from picard.track import Track
 from picard.file import File
-from picard.util import webbrowser2, encode_filename
+from picard.util import webbrowser2, encode_filename, partial
+from picard.util.lrucache import LRUCache
+
+
+THUMBNAIL_SIZE = 121
+
+
+def _image_key(data):
+    """Returns the cache key for the image data."""
+    return hashlib.md5(data).digest()
+
+
+def _load_thumbnail(data):
+    """Decodes and scales the image data. Runs in a worker thread."""
+    image = QtGui.QImage()
+    if image.loadFromData(data):
+        image = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE,
+                             QtCore.Qt.IgnoreAspectRatio,
+                             QtCore.Qt.SmoothTransformation)
+    return image
+
+
+def _adjacent_objects(item, count=2):
+    """Returns the objects next to `item` in its album or cluster."""
+    if isinstance(item, Track):
+        siblings = item.album.tracks
+    elif isinstance(item, File) and isinstance(item.parent, Cluster):
+        siblings = item.parent.files
+    elif isinstance(item, File) and isinstance(item.parent, Track):
+        tracks = _adjacent_objects(item.parent, count)
+        return [track.linked_files[0] for track in tracks if track.linked_files]
+    else:
+        return []
+    try:
+        index = siblings.index(item)
+    except ValueError:
+        return []
+    return siblings[index + 1:index + 1 + count] + siblings[max(0, index - count):index]
 
 
 class ActiveLabel(QtGui.QLabel):
@@ -73,8 +112,12 @@ class CoverArtBox(QtGui.QGroupBox):
         self.setFlat(True)
         self.release = None
         self.data = None
+        # Cache key of the image shown
+        self._data_key = None
         self.item = None
         self.shadow = QtGui.QPixmap(":/images/CoverArtShadow.png")
+        self.thumbnails = LRUCache(200)
+        self._pending = set()
         self.coverArt = ActiveLabel(False, parent)
         self.coverArt.setPixmap(self.shadow)
         self.coverArt.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignHCenter)
@@ -92,28 +135,73 @@ class CoverArtBox(QtGui.QGroupBox):
             return
 
         self.data = data
+        self._data_key = None
         if not force and self.isHidden():
             return
 
         cover = self.shadow
         if self.data:
-            if pixmap is None:
-                pixmap = QtGui.QPixmap()
-                pixmap.loadFromData(self.data[1])
-            if not pixmap.isNull():
-                cover = QtGui.QPixmap(self.shadow)
-                pixmap = pixmap.scaled(121, 121, QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.SmoothTransformation)
-                painter = QtGui.QPainter(cover)
-                painter.drawPixmap(1, 1, pixmap)
-                painter.end()
+            key = self._data_key = _image_key(self.data[1])
+            if pixmap is not None:
+                cover = self._compose(pixmap.toImage())
+                self.thumbnails[key] = cover
+            else:
+                cover = self.thumbnails.get(key)
+                if cover is None:
+                    cover = self.shadow
+                    self._load_thumbnail(self.data[1], key)
         self.coverArt.setPixmap(cover)
 
+    def _compose(self, image):
+        if image is None or image.isNull():
+            return self.shadow
+        if image.width() != THUMBNAIL_SIZE or image.height() != THUMBNAIL_SIZE:
+            image = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE,
+                                 QtCore.Qt.IgnoreAspectRatio,
+                                 QtCore.Qt.SmoothTransformation)
+        cover = QtGui.QPixmap(self.shadow)
+        painter = QtGui.QPainter(cover)
+        painter.drawImage(1, 1, image)
+        painter.end()
+        return cover
+
+    def _load_thumbnail(self, data, key=None):
+        # The cache is only used from the main thread, the worker only
+        # decodes images which are not in it
+        if key is None:
+            key = _image_key(data)
+        if key in self._pending or key in self.thumbnails:
+            return
+        self._pending.add(key)
+        self.tagger.other_queue.put((
+            partial(_load_thumbnail, data),
+            partial(self._thumbnail_loaded, key),
+            QtCore.Qt.LowEventPriority))
+
+    def _thumbnail_loaded(self, key, result=None, error=None):
+        self._pending.discard(key)
+        if error is not None:
+            self.log.error("Can't load image: %s", error)
+            return
+        cover = self._compose(result)
+        self.thumbnails[key] = cover
+        if key == self._data_key and self.isVisible():
+            self.coverArt.setPixmap(cover)
+
+    def prefetch(self, item):
+        """Loads the thumbnails of the objects next to `item`."""
+        for obj in _adjacent_objects(item):
+            if obj.metadata.images:
+                self._load_thumbnail(obj.metadata.images[0][1])
+
     def set_metadata(self, metadata, item):
         self.item = item
         data = None
         if metadata and metadata.images:
             data = metadata.images[0]
         self.__set_data(data)
+        if self.isVisible():
+            self.prefetch(item)
         release = None
         if metadata:
             release = metadata.get("musicbrainz_albumid", None)
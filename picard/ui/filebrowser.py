@@ -48,25 +48,33 @@ class FileBrowser(QtGui.QTreeView):
         self.addAction(self.toggle_hidden_action)
         self.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
 
+        self._scroll_path = None
         self._set_model()
         self._restore_state()
 
     def showEvent(self, event):
-        self.refresh()
+        # The model watches the directories it has listed, so there is
+        # nothing to reload here
+        self._scroll_to_current()
         QtGui.QTreeView.showEvent(self, event)
 
     def _set_model(self):
-        self.dirmodel = QtGui.QDirModel()
-        self.dirmodel.setLazyChildCount(True)
-        self.dirmodel.setSorting(QtCore.QDir.Name | QtCore.QDir.DirsFirst | QtCore.QDir.IgnoreCase)
+        self.dirmodel = QtGui.QFileSystemModel(self)
+        self.dirmodel.setReadOnly(True)
+        self.dirmodel.setResolveSymlinks(False)
+        self.dirmodel.setNameFilterDisables(False)
         self._set_model_filter()
         filters = []
         for exts, name in supported_formats():
             filters.extend("*" + e for e in exts)
         self.dirmodel.setNameFilters(filters)
+        # Listing happens in the model's own thread, results arrive in batches
+        if hasattr(self.dirmodel, "directoryLoaded"):
+            self.connect(self.dirmodel, QtCore.SIGNAL("directoryLoaded(QString)"), self._directory_loaded)
         self.setModel(self.dirmodel)
+        self.dirmodel.setRootPath(QtCore.QDir.rootPath())
         if sys.platform == "darwin":
-            self.setRootIndex(self.dirmodel.index("/Volumes")) 
+            self.setRootIndex(self.dirmodel.index("/Volumes"))
         header = self.header()
         header.hideSection(1)
         header.hideSection(2)
@@ -74,13 +82,22 @@ class FileBrowser(QtGui.QTreeView):
         header.setResizeMode(QtGui.QHeaderView.ResizeToContents)
         header.setStretchLastSection(False)
         header.setVisible(False)
-        
+
     def _set_model_filter(self):
         filter = QtCore.QDir.AllDirs | QtCore.QDir.Files | QtCore.QDir.Drives | QtCore.QDir.NoDotAndDotDot
         if self.config.persist["show_hidden_files"]:
             filter |= QtCore.QDir.Hidden
         self.dirmodel.setFilter(filter)
-        
+
+    def _directory_loaded(self, path):
+        if not self._scroll_path:
+            return
+        path = unicode(path)
+        if self._scroll_path.startswith(path):
+            self._scroll_to_current()
+            if os.path.dirname(self._scroll_path) == path:
+                self._scroll_path = None
+
     def startDrag(self, supportedActions):
         indexes = self.selectedIndexes()
         if len(indexes):
@@ -90,20 +107,35 @@ class FileBrowser(QtGui.QTreeView):
                 pass
 
     def refresh(self):
-        for index in self.selectedIndexes():
-            self.dirmodel.refresh(index)
+        """Re-reads the directory listings from disk.
+
+        Changes are normally picked up by the model's file system watcher,
+        which is not available on all file systems (e.g. network mounts)."""
+        path = self._current_path()
+        old_model = self.dirmodel
+        self._set_model()
+        old_model.deleteLater()
+        if path:
+            self._select_path(path)
+
+    def _current_path(self):
+        indexes = self.selectedIndexes()
+        if indexes:
+            return self.dirmodel.filePath(indexes[0])
+        return None
+
+    def _scroll_to_current(self):
+        index = self.currentIndex()
+        if index.isValid():
             self.scrollTo(index)
-            self.expand(index)
-            
+
     def show_hidden(self, state):
         self.config.persist["show_hidden_files"] = state
-        if self.isVisible():
-            self._set_model_filter()
+        self._set_model_filter()
 
     def save_state(self):
-        indexes = self.selectedIndexes()
-        if indexes:
-            path = self.dirmodel.filePath(indexes[0])
+        path = self._current_path()
+        if path:
             self.config.persist["current_browser_path"] = path
 
     def restore_state(self):
@@ -112,11 +144,15 @@ class FileBrowser(QtGui.QTreeView):
     def _restore_state(self):
         path = self.config.persist["current_browser_path"]
         if path:
-            path = find_existing_path(unicode(path))
-            index = self.dirmodel.index(path)
-            self.selectionModel().select(index, QtGui.QItemSelectionModel.SelectCurrent)
-            self.scrollTo(index)
-            self.expand(index)
+            self._select_path(find_existing_path(unicode(path)))
+
+    def _select_path(self, path):
+        index = self.dirmodel.index(path)
+        self.setCurrentIndex(index)
+        self.expand(index)
+        # The parent directories may still be loading, scroll once they are
+        self._scroll_path = unicode(self.dirmodel.filePath(index))
+        self.scrollTo(index)
 
     def move_files_here(self):
         indexes = self.selectedIndexes()
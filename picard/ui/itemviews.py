@@ -157,7 +157,7 @@ class MainPanel(QtGui.QSplitter):
         self._selected_view = i
         self.views[j].clearSelection()
         self._selected_objects.clear()
-        self._selected_objects.update(item.obj for item in self.views[i].selectedItems())
+        self._selected_objects.update(self.views[i].selected_objects())
         self.window.update_selection(self.selected_objects())
 
     def update_selection_0(self):
@@ -173,7 +173,7 @@ class MainPanel(QtGui.QSplitter):
             self._ignore_selection_changes = False
 
 
-class BaseTreeView(QtGui.QTreeWidget):
+class BaseTreeView(QtGui.QTreeView):
 
     options = [
         TextOption("persist", "file_view_sizes", "250 40 100"),
@@ -184,13 +184,19 @@ class BaseTreeView(QtGui.QTreeWidget):
         Option("setting", "color_pending", QtGui.QColor(128, 128, 128), QtGui.QColor),
     ]
 
+    itemSelectionChanged = QtCore.pyqtSignal()
+
     def __init__(self, window, parent=None):
-        QtGui.QTreeWidget.__init__(self, parent)
+        QtGui.QTreeView.__init__(self, parent)
         self.window = window
         self.panel = parent
 
+        self.item_model = ItemTreeModel(self)
+        self.root = self.item_model.root
+        self.setModel(self.item_model)
+        self.setUniformRowHeights(True)
+
         self.numHeaderSections = len(MainPanel.columns)
-        self.setHeaderLabels([_(h) for h, n in MainPanel.columns])
         self.restore_state()
 
         self.setAcceptDrops(True)
@@ -199,8 +205,6 @@ class BaseTreeView(QtGui.QTreeWidget):
         self.setSelectionMode(QtGui.QAbstractItemView.ExtendedSelection)
 
         # enable sorting, but don't actually use it by default
-        # XXX it would be nice to be able to go to the 'no sort' mode, but the
-        #     internal model that QTreeWidget uses doesn't support it
         self.header().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
         self.setSortingEnabled(True)
 
@@ -210,8 +214,16 @@ class BaseTreeView(QtGui.QTreeWidget):
         self.collapse_all_action.triggered.connect(self.collapseAll)
         self.doubleClicked.connect(self.activate_item)
 
+    def selectionChanged(self, selected, deselected):
+        QtGui.QTreeView.selectionChanged(self, selected, deselected)
+        self.itemSelectionChanged.emit()
+
+    def selected_objects(self):
+        item_from_index = self.item_model.item_from_index
+        return [item_from_index(index).obj for index in self.selectionModel().selectedRows()]
+
     def contextMenuEvent(self, event):
-        item = self.itemAt(event.pos())
+        item = self.item_model.item_from_index(self.indexAt(event.pos()))
         if not item:
             return
         obj = item.obj
@@ -334,15 +346,6 @@ class BaseTreeView(QtGui.QTreeWidget):
         else:
             self.config.persist["album_view_sizes"] = sizes
 
-    def supportedDropActions(self):
-        return QtCore.Qt.CopyAction | QtCore.Qt.MoveAction
-
-    def mimeTypes(self):
-        """List of MIME types accepted by this view."""
-        return ["text/uri-list",
-                "application/picard.file-list",
-                "application/picard.album-list"]
-
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
             event.setDropAction(QtCore.Qt.CopyAction)
@@ -352,37 +355,12 @@ class BaseTreeView(QtGui.QTreeWidget):
 
     def startDrag(self, supportedActions):
         """Start drag, *without* using pixmap."""
-        items = self.selectedItems()
-        if items:
+        indexes = self.selectionModel().selectedRows()
+        if indexes:
             drag = QtGui.QDrag(self)
-            drag.setMimeData(self.mimeData(items))
+            drag.setMimeData(self.item_model.mimeData(indexes))
             drag.start(supportedActions)
 
-    def mimeData(self, items):
-        """Return MIME data for specified items."""
-        album_ids = []
-        file_ids = []
-        for item in items:
-            obj = item.obj
-            if isinstance(obj, Album):
-                album_ids.append(str(obj.id))
-            elif isinstance(obj, Track):
-                for file in obj.linked_files:
-                    file_ids.append(str(file.id))
-            elif isinstance(obj, File):
-                file_ids.append(str(obj.id))
-            elif isinstance(obj, Cluster):
-                for file in obj.files:
-                    file_ids.append(str(file.id))
-            elif isinstance(obj, ClusterList):
-                for cluster in obj:
-                    for file in cluster.files:
-                        file_ids.append(str(file.id))
-        mimeData = QtCore.QMimeData()
-        mimeData.setData("application/picard.album-list", "\n".join(album_ids))
-        mimeData.setData("application/picard.file-list", "\n".join(file_ids))
-        return mimeData
-
     def drop_files(self, files, target):
         if isinstance(target, (Track, Cluster)):
             for file in files:
@@ -433,15 +411,7 @@ class BaseTreeView(QtGui.QTreeWidget):
     def dropEvent(self, event):
         return QtGui.QTreeView.dropEvent(self, event)
 
-    def dropMimeData(self, parent, index, data, action):
-        target = None
-        if parent:
-            if index == parent.childCount():
-                item = parent
-            else:
-                item = parent.child(index)
-            if item is not None:
-                target = item.obj
+    def drop_mime_data(self, data, target):
         self.log.debug("Drop target = %r", target)
         handled = False
         # text/uri-list
@@ -466,210 +436,551 @@ class BaseTreeView(QtGui.QTreeWidget):
         return handled
 
     def activate_item(self, index):
-        obj = self.itemFromIndex(index).obj
+        obj = self.item_model.item_from_index(index).obj
         if obj.can_view_info():
             self.window.view_info()
 
-    def add_cluster(self, cluster, parent_item=None):
-        if parent_item is None:
-            parent_item = self.clusters
-        cluster_item = ClusterItem(cluster, not cluster.special, parent_item)
-        if cluster.hide_if_empty and not cluster.files:
-            cluster_item.update()
-            cluster_item.setHidden(True)
-        else:
-            cluster_item.add_files(cluster.files)
-
 
 class FileTreeView(BaseTreeView):
 
     def __init__(self, window, parent=None):
         BaseTreeView.__init__(self, window, parent)
-        self.unmatched_files = ClusterItem(self.tagger.unmatched_files, False, self)
-        self.unmatched_files.update()
-        self.setItemExpanded(self.unmatched_files, True)
-        self.clusters = ClusterItem(self.tagger.clusters, False, self)
-        self.clusters.setText(0, _(u"Clusters"))
-        self.setItemExpanded(self.clusters, True)
+        self.unmatched_files = self.root.child_item(self.tagger.unmatched_files, keep=True)
+        self.clusters = self.root.child_item(self.tagger.clusters, keep=True)
+        self.root.add_children([self.tagger.unmatched_files, self.tagger.clusters])
+        self.setExpanded(self.item_model.index_for(self.unmatched_files), True)
+        self.setExpanded(self.item_model.index_for(self.clusters), True)
         self.tagger.cluster_added.connect(self.add_cluster)
         self.tagger.cluster_removed.connect(self.remove_cluster)
 
+    def add_cluster(self, cluster):
+        self.clusters.add_children([cluster])
+        self.clusters.child_item(cluster, keep=True)
+
     def remove_cluster(self, cluster):
-        cluster.item.setSelected(False)
-        self.clusters.removeChild(cluster.item)
+        self.clusters.remove_child(cluster)
 
 
 class AlbumTreeView(BaseTreeView):
 
     def __init__(self, window, parent=None):
         BaseTreeView.__init__(self, window, parent)
+        self.root.sortable = True
         self.tagger.album_added.connect(self.add_album)
         self.tagger.album_removed.connect(self.remove_album)
 
     def add_album(self, album):
-        item = AlbumItem(album, True, self)
-        item.setIcon(0, AlbumItem.icon_cd)
-        for i, column in enumerate(MainPanel.columns):
-            font = item.font(i)
-            font.setBold(True)
-            item.setFont(i, font)
-            item.setText(i, album.column(column[1]))
-        self.add_cluster(album.unmatched_files, item)
+        self.root.add_children([album])
+        item = self.root.child_item(album, keep=True)
+        # the unmatched files row is shown by AlbumItem once it has files
+        item.child_item(album.unmatched_files, keep=True)
 
     def remove_album(self, album):
-        album.item.setSelected(False)
-        self.takeTopLevelItem(self.indexOfTopLevelItem(album.item))
+        self.root.remove_child(album)
+
+
+class ItemTreeModel(QtCore.QAbstractItemModel):
+    """Model exposing albums, clusters, tracks and files to a tree view.
+
+    Rows are read lazily from the underlying objects. A `TreeItem` is only
+    created when the view asks for the index of its row, and its column
+    values are computed the first time they are displayed and cached until
+    the object is updated.
+
+    Updates are not applied right away. Items are marked dirty and
+    refreshed together at most once per `REFRESH_INTERVAL` milliseconds,
+    so a burst of changes to the same rows repaints them only once.
+    """
+
+    REFRESH_INTERVAL = 16
+
+    def __init__(self, view):
+        QtCore.QAbstractItemModel.__init__(self, view)
+        self.view = view
+        self.root = TreeItem(None, self, None)
+        self.root._children = []
+        self.sort_column = -1
+        self.sort_order = QtCore.Qt.AscendingOrder
+        self._dirty = {}
+        self._selection_changed = False
+        self._refresh_timer = QtCore.QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(self.REFRESH_INTERVAL)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+    def create_item(self, obj, parent):
+        if isinstance(obj, Album):
+            cls = AlbumItem
+        elif isinstance(obj, Track):
+            cls = TrackItem
+        elif isinstance(obj, File):
+            cls = FileItem
+        else:
+            cls = ClusterItem
+        return cls(obj, self, parent)
+
+    def item_from_index(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return None
+
+    def index_for(self, item, column=0):
+        """Return the index of `item`, or None if it is not shown."""
+        if item is self.root:
+            return QtCore.QModelIndex()
+        row = item.row()
+        if row < 0:
+            return None
+        return self.createIndex(row, column, item)
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        item = self.item_from_index(parent) or self.root
+        children = item.children()
+        if row < 0 or row >= len(children) or column < 0 or column >= len(MainPanel.columns):
+            return QtCore.QModelIndex()
+        child = item.child_item(children[row])
+        child._row = row
+        return self.createIndex(row, column, child)
+
+    def parent(self, index):
+        item = self.item_from_index(index)
+        if item is None or item.parent is None or item.parent is self.root:
+            return QtCore.QModelIndex()
+        return self.index_for(item.parent) or QtCore.QModelIndex()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        item = self.item_from_index(parent) or self.root
+        return len(item.children())
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(MainPanel.columns)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        item = self.item_from_index(index)
+        if item is None:
+            return QtCore.QVariant()
+        column = index.column()
+        texts, icon, foreground, background, font = item.display()
+        if role == QtCore.Qt.DisplayRole:
+            return QtCore.QVariant(texts[column])
+        elif role == QtCore.Qt.DecorationRole:
+            if column == 0 and icon is not None:
+                return QtCore.QVariant(icon)
+        elif role == QtCore.Qt.ForegroundRole:
+            if foreground is not None:
+                return QtCore.QVariant(foreground)
+        elif role == QtCore.Qt.BackgroundRole:
+            if background is not None:
+                return QtCore.QVariant(background)
+        elif role == QtCore.Qt.FontRole:
+            if font is not None:
+                return QtCore.QVariant(font)
+        return QtCore.QVariant()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return QtCore.QVariant(_(MainPanel.columns[section][0]))
+        return QtCore.QVariant()
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.ItemIsDropEnabled
+        return (QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable |
+                QtCore.Qt.ItemIsDragEnabled | QtCore.Qt.ItemIsDropEnabled)
 
+    def supportedDropActions(self):
+        return QtCore.Qt.CopyAction | QtCore.Qt.MoveAction
 
-class TreeItem(QtGui.QTreeWidgetItem):
+    def mimeTypes(self):
+        """List of MIME types accepted by this view."""
+        return ["text/uri-list",
+                "application/picard.file-list",
+                "application/picard.album-list"]
 
-    __lt__ = lambda self, other: False
+    def mimeData(self, indexes):
+        """Return MIME data for specified items."""
+        album_ids = []
+        file_ids = []
+        for index in indexes:
+            if index.column() != 0:
+                continue
+            obj = self.item_from_index(index).obj
+            if isinstance(obj, Album):
+                album_ids.append(str(obj.id))
+            elif isinstance(obj, Track):
+                for file in obj.linked_files:
+                    file_ids.append(str(file.id))
+            elif isinstance(obj, File):
+                file_ids.append(str(obj.id))
+            elif isinstance(obj, Cluster):
+                for file in obj.files:
+                    file_ids.append(str(file.id))
+            elif isinstance(obj, ClusterList):
+                for cluster in obj:
+                    for file in cluster.files:
+                        file_ids.append(str(file.id))
+        mimeData = QtCore.QMimeData()
+        mimeData.setData("application/picard.album-list", "\n".join(album_ids))
+        mimeData.setData("application/picard.file-list", "\n".join(file_ids))
+        return mimeData
 
-    def __init__(self, obj, sortable, *args):
-        QtGui.QTreeWidgetItem.__init__(self, *args)
+    def dropMimeData(self, data, action, row, column, parent):
+        target = None
+        item = self.item_from_index(parent)
+        if item is not None:
+            children = item.children()
+            if row < 0 or row >= len(children):
+                target = item.obj
+            else:
+                target = children[row]
+        return self.view.drop_mime_data(data, target)
+
+    def insert_rows(self, item, row, objs):
+        parent = self.index_for(item)
+        if parent is None:
+            item._children[row:row] = objs
+            return
+        self.beginInsertRows(parent, row, row + len(objs) - 1)
+        item._children[row:row] = objs
+        self.endInsertRows()
+        if item.sortable and self.sort_column >= 0:
+            self._sort_items([item])
+
+    def remove_rows(self, item, first, last):
+        parent = self.index_for(item)
+        if parent is not None:
+            selection = QtGui.QItemSelection(
+                self.index(first, 0, parent),
+                self.index(last, len(MainPanel.columns) - 1, parent))
+            self.view.selectionModel().select(selection, QtGui.QItemSelectionModel.Deselect)
+            self.beginRemoveRows(parent, first, last)
+        removed = item._children[first:last + 1]
+        del item._children[first:last + 1]
+        if parent is not None:
+            self.endRemoveRows()
+        return removed
+
+    def schedule_refresh(self, item, update_tracks=False):
+        """Mark `item` to be refreshed on the next `refresh()`."""
+        self._dirty[item] = self._dirty.get(item, False) or update_tracks
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start()
+
+    def refresh(self):
+        """Refresh all items marked dirty since the last refresh."""
+        dirty = self._dirty
+        self._dirty = {}
+        self._selection_changed = False
+        # albums refreshing their tracks also cover the dirty tracks
+        for item, update_tracks in dirty.items():
+            if update_tracks:
+                item.refresh(update_tracks=True)
+                for child in item._items.values():
+                    if isinstance(child, TrackItem):
+                        dirty.pop(child, None)
+                del dirty[item]
+        for item in dirty:
+            item.refresh()
+        if self._selection_changed:
+            TreeItem.window.update_selection()
+
+    def item_changed(self, item):
+        index = self.index_for(item)
+        if index is None:
+            return
+        last = self.createIndex(index.row(), len(MainPanel.columns) - 1, item)
+        self.dataChanged.emit(index, last)
+        if self.view.selectionModel().isSelected(index):
+            self._selection_changed = True
+
+    def expand(self, item):
+        index = self.index_for(item)
+        if index is not None:
+            self.view.setExpanded(index, True)
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        if column < 0:
+            return
+        items = []
+        pending = [self.root]
+        while pending:
+            item = pending.pop()
+            if item._children is not None:
+                if item.sortable:
+                    items.append(item)
+                pending.extend(item._items.values())
+        self._sort_items(items)
+
+    def sort_key(self, obj):
+        if self.sort_column == 1:
+            return obj.metadata.length or 0
+        return obj.column(MainPanel.columns[self.sort_column][1]).lower()
+
+    def _sort_items(self, items):
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        positions = [(self.item_from_index(index), index.column()) for index in old_indexes]
+        reverse = self.sort_order == QtCore.Qt.DescendingOrder
+        for item in items:
+            item._children.sort(key=self.sort_key, reverse=reverse)
+        new_indexes = []
+        for item, column in positions:
+            new_indexes.append(self.index_for(item, column) or QtCore.QModelIndex())
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+
+class TreeItem(object):
+    """A row of `ItemTreeModel`, created on demand for `obj`."""
+
+    sortable = False
+
+    def __init__(self, obj, model, parent):
         self.obj = obj
-        if obj is not None:
-            obj.item = self
-        if sortable:
-            self.__lt__ = self._lt
+        self.model = model
+        self.parent = parent
+        self.keep = False
+        self._children = None
+        self._items = {}
+        self._row = 0
+        self._display = None
+
+    def row(self):
+        """Return the row of this item in its parent, or -1 if it is hidden."""
+        if self.parent is None:
+            return -1
+        children = self.parent._children
+        if children is None:
+            return -1
+        row = self._row
+        if row < len(children) and children[row] is self.obj:
+            return row
+        try:
+            self._row = row = children.index(self.obj)
+        except ValueError:
+            return -1
+        return row
+
+    def children(self):
+        if self._children is None:
+            self._children = self.fetch_children()
+            if self.sortable and self.model.sort_column >= 0:
+                self._children.sort(key=self.model.sort_key,
+                                    reverse=self.model.sort_order == QtCore.Qt.DescendingOrder)
+        return self._children
+
+    def fetch_children(self):
+        return []
+
+    def child_item(self, obj, keep=False):
+        item = self._items.get(id(obj))
+        if item is None:
+            item = self.model.create_item(obj, self)
+            self._items[id(obj)] = item
+            obj.item = item
+        if keep:
+            item.keep = True
+        return item
+
+    def add_children(self, objs):
+        if self._children is not None and objs:
+            self.model.insert_rows(self, len(self._children), list(objs))
+
+    def remove_child(self, obj):
+        if self._children is None:
+            item = self._items.pop(id(obj), None)
+            if item is not None:
+                item.detach()
+            return
+        try:
+            row = self._children.index(obj)
+        except ValueError:
+            return
+        self._remove(row, row, detach_all=True)
 
-    def _lt(self, other):
-        column = self.treeWidget().sortColumn()
-        if column == 1:
-            return (self.obj.metadata.length or 0) < (other.obj.metadata.length or 0)
-        return self.text(column).toLower() < other.text(column).toLower()
+    def sync(self):
+        """Bring the rows in line with the current children of the object."""
+        if self._children is None:
+            return
+        old = self._children
+        new = self.fetch_children()
+        if new == old:
+            return
+        num = len(old)
+        if new[:num] == old:
+            self.model.insert_rows(self, num, new[num:])
+        elif old[:len(new)] == new:
+            self._remove(len(new), num - 1)
+        else:
+            if old:
+                self._remove(0, num - 1)
+            self.model.insert_rows(self, 0, new)
+
+    def _remove(self, first, last, detach_all=False):
+        for obj in self.model.remove_rows(self, first, last):
+            item = self._items.get(id(obj))
+            if item is None:
+                continue
+            if item.keep and not detach_all:
+                item.reset()
+            else:
+                del self._items[id(obj)]
+                item.detach()
+
+    def reset(self):
+        for item in self._items.values():
+            if not item.keep:
+                del self._items[id(item.obj)]
+                item.detach()
+            else:
+                item.reset()
+        self._children = None
+
+    def detach(self):
+        for item in self._items.values():
+            item.detach()
+        self._items = {}
+        self._children = None
+        self.parent = None
+        if self.obj.item is self:
+            self.obj.item = None
+
+    def display(self):
+        if self._display is None:
+            self._display = self.compute_display()
+        return self._display
+
+    def column_texts(self):
+        return [self.obj.column(name) for title, name in MainPanel.columns]
 
 
 class ClusterItem(TreeItem):
 
-    def __init__(self, *args):
-        TreeItem.__init__(self, *args)
-        self.setIcon(0, ClusterItem.icon_dir)
+    sortable = True
+
+    def fetch_children(self):
+        if isinstance(self.obj, ClusterList):
+            return list(self.obj)
+        return list(self.obj.files)
+
+    def compute_display(self):
+        if isinstance(self.obj, ClusterList):
+            texts = [_(u"Clusters")] + [u""] * (len(MainPanel.columns) - 1)
+        else:
+            texts = self.column_texts()
+        return texts, ClusterItem.icon_dir, None, None, None
 
     def update(self):
-        for i, column in enumerate(MainPanel.columns):
-            self.setText(i, self.obj.column(column[1]))
+        self.model.schedule_refresh(self)
         album = self.obj.related_album
-        if self.obj.special and album and album.loaded:
+        if self.obj.special and album and album.loaded and album.item:
             album.item.update(update_tracks=False)
-        if self.isSelected():
-            TreeItem.window.update_selection()
+
+    def refresh(self):
+        self._display = None
+        self.model.item_changed(self)
 
     def add_file(self, file):
         self.add_files([file])
 
     def add_files(self, files):
-        if self.obj.hide_if_empty and self.obj.files:
-            self.setHidden(False)
+        if self.obj.hide_if_empty and self.row() < 0 and self.parent is not None:
+            self.parent.sync()
+        else:
+            self.add_children(files)
         self.update()
-        items = []
-        for file in files:
-            item = FileItem(file, True)
-            item.update()
-            items.append(item)
-        self.addChildren(items)
 
     def remove_file(self, file):
-        file.item.setSelected(False)
-        self.removeChild(file.item)
+        self.remove_child(file)
         self.update()
-        if self.obj.hide_if_empty and not self.obj.files:
-            self.setHidden(True)
+        if self.obj.hide_if_empty and not self.obj.files and self.parent is not None:
+            self.parent.sync()
 
 
 class AlbumItem(TreeItem):
 
-    def update(self, update_tracks=True):
+    def fetch_children(self):
         album = self.obj
+        children = list(album.tracks)
+        cluster = album.unmatched_files
+        if cluster.files or not cluster.hide_if_empty:
+            children.append(cluster)
+        return children
+
+    def compute_display(self):
+        album = self.obj
+        icon = AlbumItem.icon_cd_saved if album.is_complete() else AlbumItem.icon_cd
+        font = QtGui.QFont(self.model.view.font())
+        font.setBold(True)
+        return self.column_texts(), icon, None, None, font
+
+    def update(self, update_tracks=True):
+        self.model.schedule_refresh(self, update_tracks)
+
+    def refresh(self, update_tracks=False):
         if update_tracks:
-            oldnum = self.childCount() - 1
-            newnum = len(album.tracks)
-            if oldnum > newnum: # remove old items
-                for i in xrange(oldnum - newnum):
-                    self.takeChild(newnum - 1)
-                oldnum = newnum
-            # update existing items
-            for i in xrange(oldnum):
-                item = self.child(i)
-                track = album.tracks[i]
-                item.obj = track
-                track.item = item
-                item.update(update_album=False)
-            if newnum > oldnum: # add new items
-                items = []
-                for i in xrange(newnum - 1, oldnum - 1, -1): # insertChildren is backwards
-                    item = TrackItem(album.tracks[i], False)
-                    item.setHidden(False) # Workaround to make sure the parent state gets updated
-                    items.append(item)
-                self.insertChildren(oldnum, items)
-                for item in items: # Update after insertChildren so that setExpanded works
-                    item.update(update_album=False)
-        self.setIcon(0, AlbumItem.icon_cd_saved if album.is_complete() else AlbumItem.icon_cd)
-        for i, column in enumerate(MainPanel.columns):
-            self.setText(i, album.column(column[1]))
-        if self.isSelected():
-            TreeItem.window.update_selection()
+            self.sync()
+            for item in self._items.values():
+                if isinstance(item, TrackItem):
+                    item.refresh()
+        self._display = None
+        self.model.item_changed(self)
 
 
 class TrackItem(TreeItem):
 
-    def update(self, update_album=True):
+    def fetch_children(self):
+        track = self.obj
+        if track.num_linked_files > 1:
+            return list(track.linked_files)
+        return []
+
+    def compute_display(self):
         track = self.obj
         if track.num_linked_files == 1:
             file = track.linked_files[0]
-            file.item = None
             color = TrackItem.track_colors[file.state]
             bgcolor = get_match_color(file.similarity, TreeItem.base_color)
             icon = FileItem.decide_file_icon(file)
-            self.takeChildren()
         else:
             color = TreeItem.text_color
             bgcolor = get_match_color(1, TreeItem.base_color)
             icon = TrackItem.icon_note
-            oldnum = self.childCount()
-            newnum = track.num_linked_files
-            if oldnum > newnum: # remove old items
-                for i in xrange(oldnum - newnum):
-                    self.takeChild(newnum - 1).obj.item = None
-                oldnum = newnum
-            for i in xrange(oldnum): # update existing items
-                item = self.child(i)
-                file = track.linked_files[i]
-                item.obj = file
-                file.item = item
-                item.update()
-            if newnum > oldnum: # add new items
-                items = []
-                for i in xrange(newnum - 1, oldnum - 1, -1):
-                    item = FileItem(track.linked_files[i], False)
-                    item.update()
-                    items.append(item)
-                self.addChildren(items)
-            self.setExpanded(True)
-        self.setIcon(0, icon)
-        for i, column in enumerate(MainPanel.columns):
-            self.setText(i, track.column(column[1]))
-            self.setForeground(i, color)
-            self.setBackground(i, bgcolor)
-        if self.isSelected():
-            TreeItem.window.update_selection()
-        if update_album:
-            self.parent().update(update_tracks=False)
+        return self.column_texts(), icon, color, bgcolor, None
+
+    def update(self, update_album=True):
+        self.model.schedule_refresh(self)
+        if update_album and self.parent is not None:
+            self.parent.update(update_tracks=False)
+
+    def refresh(self):
+        self._display = None
+        self.sync()
+        for item in self._items.values():
+            item.refresh()
+        if self._children:
+            self.model.expand(self)
+        self.model.item_changed(self)
 
 
 class FileItem(TreeItem):
 
-    def update(self):
+    def compute_display(self):
         file = self.obj
-        self.setIcon(0, FileItem.decide_file_icon(file))
         color = FileItem.file_colors[file.state]
         bgcolor = get_match_color(file.similarity, TreeItem.base_color)
-        for i, column in enumerate(MainPanel.columns):
-            self.setText(i, file.column(column[1]))
-            self.setForeground(i, color)
-            self.setBackground(i, bgcolor)
-        if self.isSelected():
-            TreeItem.window.update_selection()
+        return self.column_texts(), FileItem.decide_file_icon(file), color, bgcolor, None
+
+    def update(self):
+        self.model.schedule_refresh(self)
+
+    def refresh(self):
+        self._display = None
+        self.model.item_changed(self)
 
     @staticmethod
     def decide_file_icon(file):
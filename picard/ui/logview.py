@@ -19,7 +19,7 @@
 
 
 from PyQt4 import QtCore, QtGui, Qt
-from picard.log import log
+from picard.log import log, format_entry
 
 
 class LogView(QtGui.QDialog):
@@ -29,6 +29,7 @@ class LogView(QtGui.QDialog):
         self.resize(540, 340)
         self.setWindowTitle(_("Log"))
         self.doc = QtGui.QTextDocument(self)
+        self.doc.setMaximumBlockCount(log.capacity)
         self.textCursor = QtGui.QTextCursor(self.doc)
         font = QtGui.QFont()
         font.setFamily("Monospace")
@@ -38,13 +39,20 @@ class LogView(QtGui.QDialog):
         self.browser.setDocument(self.doc)
         vbox = QtGui.QHBoxLayout(self)
         vbox.addWidget(self.browser)
-        for prefix, msg in log.entries:
-            self.add_entry(prefix, msg)
-        log.add_receiver(self.add_entry)
+        self.add_entries(log.delivered_entries())
+        log.add_receiver(self.add_entries)
+        self.finished.connect(self.remove_receiver)
 
-    def add_entry(self, prefix, msg):
+    def remove_receiver(self):
+        if self.add_entries in log.receivers:
+            log.remove_receiver(self.add_entries)
+
+    def add_entries(self, entries):
+        if not entries:
+            return
         self.textCursor.movePosition(QtGui.QTextCursor.End)
-        self.textCursor.insertText(prefix + ' ' + str(QtCore.QThread.currentThreadId()) + ' ' + QtCore.QTime.currentTime().toString() + ' ' + msg, self.textFormat)
-        self.textCursor.insertBlock()
+        for entry in entries:
+            self.textCursor.insertText(format_entry(entry), self.textFormat)
+            self.textCursor.insertBlock()
         sb = self.browser.verticalScrollBar()
         sb.setValue(sb.maximum())
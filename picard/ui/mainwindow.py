@@ -21,6 +21,7 @@ from PyQt4 import QtCore, QtGui
 
 import sys
 import os.path
+import time
 
 from picard.album import Album
 from picard.file import File
@@ -47,6 +48,9 @@ def register_ui_init (function):
 
 class MainWindow(QtGui.QMainWindow):
 
+    # The status bar is redrawn at most this many times per second
+    STATUSBAR_UPDATES_PER_SECOND = 4
+
     options = [
         Option("persist", "window_state", QtCore.QByteArray(),
                QtCore.QVariant.toByteArray),
@@ -202,6 +206,14 @@ class MainWindow(QtGui.QMainWindow):
         self.statusBar().addPermanentWidget(self.file_counts_label)
         self.connect(self.tagger, QtCore.SIGNAL("file_state_changed"), self.update_statusbar)
         self.update_statusbar(0)
+        self._statusbar_message = None
+        self._statusbar_update_pending = False
+        self._statusbar_updated = 0.0
+        self._statusbar_progress_shown = False
+        self._statusbar_timer = QtCore.QTimer(self)
+        self._statusbar_timer.setSingleShot(True)
+        self.connect(self._statusbar_timer, QtCore.SIGNAL("timeout()"), self._update_statusbar_message)
+        self.tagger.identify_progress.callback = self._request_statusbar_update
 
     def update_statusbar(self, num_pending_files):
         """Updates the status bar information."""
@@ -209,14 +221,48 @@ class MainWindow(QtGui.QMainWindow):
             % {"files": self.tagger.num_files(), "pending": num_pending_files})
 
     def set_statusbar_message(self, message, *args, **kwargs):
-        """Set the status bar message."""
+        """Set the status bar message.
+
+        Can be called from any thread. The status bar is updated at most
+        STATUSBAR_UPDATES_PER_SECOND times per second and shows the latest
+        message. While files are being identified it shows their progress
+        instead."""
         try:
             if message:
                 self.log.debug(repr(message.replace('%%s', '%%r')), *args)
         except:
             pass
-        self.tagger.thread_pool.call_from_thread(
-            self._set_statusbar_message, message, *args, **kwargs)
+        self._statusbar_message = (message, args, kwargs)
+        self._request_statusbar_update()
+
+    def _request_statusbar_update(self):
+        if not self._statusbar_update_pending:
+            self._statusbar_update_pending = True
+            self.tagger.thread_pool.call_from_thread(self._schedule_statusbar_update)
+
+    def _schedule_statusbar_update(self):
+        if self._statusbar_timer.isActive():
+            return
+        interval = 1.0 / self.STATUSBAR_UPDATES_PER_SECOND
+        delay = self._statusbar_updated + interval - time.time()
+        self._statusbar_timer.start(max(0, int(delay * 1000)))
+
+    def _update_statusbar_message(self):
+        # Clear the flag first, so that messages set from now on schedule
+        # another update
+        self._statusbar_update_pending = False
+        self._statusbar_updated = time.time()
+        progress = self.tagger.identify_progress
+        if progress.active or self._statusbar_progress_shown:
+            # Per-file messages are superseded by the aggregate progress,
+            # which stays visible for a while after the last file finished
+            self._statusbar_message = None
+            self._statusbar_progress_shown = progress.active
+            self.statusBar().showMessage(progress.text(), 0 if progress.active else 3000)
+        elif self._statusbar_message is not None:
+            message, args, kwargs = self._statusbar_message
+            self._statusbar_message = None
+            self._set_statusbar_message(message, *args, **kwargs)
 
     def _set_statusbar_message(self, message, *args, **kwargs):
         if message:
@@ -387,6 +433,9 @@ class MainWindow(QtGui.QMainWindow):
         self.view_log_action = QtGui.QAction(_(u"View &Log..."), self)
         self.connect(self.view_log_action, QtCore.SIGNAL("triggered()"), self.show_log)
 
+        self.view_stats_action = QtGui.QAction(_(u"View &Statistics..."), self)
+        self.connect(self.view_stats_action, QtCore.SIGNAL("triggered()"), self.show_stats)
+
         self.connect(self.tagger.xmlws, QtCore.SIGNAL("authentication_required"), self.show_password_dialog)
         self.connect(self.tagger.xmlws, QtCore.SIGNAL("proxyAuthentication_required"), self.show_proxy_dialog)
 
@@ -458,6 +507,7 @@ class MainWindow(QtGui.QMainWindow):
         menu.addAction(self.support_forum_action)
         menu.addAction(self.report_bug_action)
         menu.addAction(self.view_log_action)
+        menu.addAction(self.view_stats_action)
         menu.addSeparator()
         menu.addAction(self.donate_action)
         menu.addAction(self.about_action)
@@ -599,6 +649,11 @@ class MainWindow(QtGui.QMainWindow):
         w = LogView(self)
         w.show()
 
+    def show_stats(self):
+        from picard.ui.statsdialog import StatsDialog
+        w = StatsDialog(self)
+        w.show()
+
     def open_bug_report(self):
         webbrowser2.open("http://musicbrainz.org/doc/Picard_Troubleshooting")
 
@@ -29,30 +29,118 @@ from picard.util.tags import display_tag_name
 from picard.ui.edittagdialog import EditTagDialog
 
 
+def _tag_shown(name):
+    return not name.startswith("~") or name == "~length"
+
+
+def _copy_items(metadata):
+    return dict((name, values[:]) for name, values in metadata._items.iteritems())
+
+
+def _object_tags(items, orig_items, clear_existing_tags):
+    """Return the original and new tags shown for one object.
+
+    `orig_items` is None for tracks without files. Unless existing tags are
+    cleared, original tags that the new metadata does not overwrite are kept
+    on save and shown as new values too.
+    """
+    new_tags = dict((name, values) for name, values in items.iteritems() if _tag_shown(name))
+    orig_tags = {}
+    if orig_items is not None:
+        orig_tags = dict((name, values) for name, values in orig_items.iteritems() if _tag_shown(name))
+        if not clear_existing_tags:
+            for name, values in orig_tags.iteritems():
+                new_tags.setdefault(name, values)
+    return orig_tags, new_tags
+
+
 class TagCounter(dict):
+    """Aggregate the values of tags over a set of objects.
+
+    Values are added and removed one object at a time. For each tag the
+    number of objects per distinct value is kept, up to `max_values`
+    distinct values. Past that the tag is only reported as different and
+    is marked stale when values are removed, so that it can be rebuilt.
+    """
+
+    max_values = 100
 
     def __init__(self):
         self.counts = {}
         self.different = set()
         self.objects = 0
+        self.values = {}
+        self.capped = set()
+        self.stale = set()
 
     def __getitem__(self, tag):
         return dict.get(self, tag, [])
 
     def add(self, tag, values):
-        if tag not in self.different:
-            values = sorted(values)
-            if tag not in self:
-                self[tag] = values
-            elif self[tag] != values:
-                self.different.add(tag)
-                self[tag] = None
         self.counts[tag] = self.counts.get(tag, 0) + 1
+        if tag not in self.capped:
+            key = tuple(sorted(values))
+            counts = self.values.setdefault(tag, {})
+            counts[key] = counts.get(key, 0) + 1
+            if len(counts) > self.max_values:
+                del self.values[tag]
+                self.capped.add(tag)
+        self._update(tag)
+
+    def remove(self, tag, values):
+        count = self.counts[tag] - 1
+        if count:
+            self.counts[tag] = count
+        else:
+            del self.counts[tag]
+            self.capped.discard(tag)
+            self.stale.discard(tag)
+        if tag in self.capped:
+            self.stale.add(tag)
+        elif tag in self.values:
+            key = tuple(sorted(values))
+            counts = self.values[tag]
+            if counts[key] > 1:
+                counts[key] -= 1
+            else:
+                del counts[key]
+                if not counts:
+                    del self.values[tag]
+        self._update(tag)
+
+    def rebuild(self, tag, all_values):
+        """Recount `tag` from the values of all objects that have it."""
+        self.counts.pop(tag, None)
+        self.values.pop(tag, None)
+        self.capped.discard(tag)
+        self.stale.discard(tag)
+        for values in all_values:
+            self.add(tag, values)
+        self._update(tag)
+
+    def _update(self, tag):
+        if tag in self.capped:
+            dict.__setitem__(self, tag, None)
+            self.different.add(tag)
+            return
+        counts = self.values.get(tag)
+        if not counts:
+            dict.pop(self, tag, None)
+            self.different.discard(tag)
+        elif len(counts) == 1:
+            dict.__setitem__(self, tag, list(counts.keys()[0]))
+            self.different.discard(tag)
+        else:
+            dict.__setitem__(self, tag, None)
+            self.different.add(tag)
 
     def clear(self):
         dict.clear(self)
         self.counts.clear()
         self.different.clear()
+        self.values.clear()
+        self.capped.clear()
+        self.stale.clear()
         self.objects = 0
         return self
 
@@ -62,6 +150,8 @@ class TagCounter(dict):
         if tag in self.different or (count > 0 and missing > 0):
             if missing > 0:
                 return ungettext("(missing from %d item)", "(missing from %d items)", missing) % missing
+            elif tag in self.capped:
+                return _("(more than %d different values)") % self.max_values
             else:
                 return _("(different across %d items)") % self.objects
         return None
@@ -107,6 +197,9 @@ class MetadataBox(QtGui.QTableWidget):
         self.objects = set()
         self.orig_tags = TagCounter()
         self.new_tags = TagCounter()
+        # object -> copies of the metadata counted in orig_tags/new_tags
+        self._counted = {}
+        self._clear_existing_tags = None
         self.selection_mutex = QtCore.QMutex()
         self.updating = False
         self.update_pending = False
@@ -246,34 +339,37 @@ class MetadataBox(QtGui.QTableWidget):
         self.selection_mutex.unlock()
 
         if not (self.files or self.tracks):
+            self._counted.clear()
             return None
-        orig_tags = self.orig_tags.clear()
-        new_tags = self.new_tags.clear()
-        # existing_tags are orig_tags that would not be overwritten by
-        # any new_tags, assuming clear_existing_tags is disabled.
-        existing_tags = set()
+        orig_tags = self.orig_tags
+        new_tags = self.new_tags
+        counted = self._counted
 
         clear_existing_tags = self.config.setting["clear_existing_tags"]
+        if clear_existing_tags != self._clear_existing_tags:
+            counted.clear()
+            orig_tags.clear()
+            new_tags.clear()
+            self._clear_existing_tags = clear_existing_tags
 
-        for file in self.files:
-            for name, values in file.metadata._items.iteritems():
-                if not name.startswith("~") or name == "~length":
-                    new_tags.add(name, values)
-            for name, values in file.orig_metadata._items.iteritems():
-                if not name.startswith("~") or name == "~length":
-                    orig_tags.add(name, values)
-                    if not ((name in new_tags and not name in existing_tags) or clear_existing_tags):
-                        new_tags.add(name, values)
-                        existing_tags.add(name)
-            orig_tags.objects += 1
-
-        new_tags.objects = orig_tags.objects
+        selected = set(self.files)
         for track in self.tracks:
             if track.num_linked_files == 0:
-                for name, values in track.metadata._items.iteritems():
-                    if not name.startswith("~") or name == "~length":
-                        new_tags.add(name, values)
-                new_tags.objects += 1
+                selected.add(track)
+        for obj in counted.keys():
+            if obj not in selected:
+                self._count_tags(obj, False, clear_existing_tags)
+        for obj in selected:
+            self._count_tags(obj, True, clear_existing_tags)
+
+        for tags, i in ((orig_tags, 0), (new_tags, 1)):
+            for tag in list(tags.stale):
+                all_values = []
+                for items, orig_items in counted.itervalues():
+                    values = _object_tags(items, orig_items, clear_existing_tags)[i].get(tag)
+                    if values is not None:
+                        all_values.append(values)
+                tags.rebuild(tag, all_values)
 
         all_tags = set(orig_tags.keys() + new_tags.keys())
         common_tags = MetadataBox.common_tags
@@ -290,8 +386,51 @@ class MetadataBox(QtGui.QTableWidget):
             self.tag_names = [tag for tag in tag_names if self.tag_status(tag) != "empty"]
         return True
 
+    def _count_tags(self, obj, selected, clear_existing_tags):
+        """Add, remove or update the contribution of `obj` to the tag counts."""
+        old = self._counted.get(obj)
+        new = None
+        if selected:
+            if isinstance(obj, File):
+                if (old is not None and old[0] == obj.metadata._items and
+                    old[1] == obj.orig_metadata._items):
+                    return
+                new = (_copy_items(obj.metadata), _copy_items(obj.orig_metadata))
+            else:
+                if old is not None and old[0] == obj.metadata._items:
+                    return
+                new = (_copy_items(obj.metadata), None)
+            self._counted[obj] = new
+        else:
+            del self._counted[obj]
+
+        if old is None:
+            old_orig, old_new = {}, {}
+            self.new_tags.objects += 1
+            if new[1] is not None:
+                self.orig_tags.objects += 1
+        else:
+            old_orig, old_new = _object_tags(old[0], old[1], clear_existing_tags)
+        if new is None:
+            new_orig, new_new = {}, {}
+            self.new_tags.objects -= 1
+            if old[1] is not None:
+                self.orig_tags.objects -= 1
+        else:
+            new_orig, new_new = _object_tags(new[0], new[1], clear_existing_tags)
+
+        for tags, old_tags, new_tags in ((self.orig_tags, old_orig, new_orig),
+                                         (self.new_tags, old_new, new_new)):
+            for tag, values in old_tags.iteritems():
+                if new_tags.get(tag) != values:
+                    tags.remove(tag, values)
+            for tag, values in new_tags.iteritems():
+                if old_tags.get(tag) != values:
+                    tags.add(tag, values)
+
     def _update_items(self, result=None, error=None):
         if result is None or error is not None:
+            self._counted.clear()
             self.orig_tags.clear()
             self.new_tags.clear()
             self.tag_names = None
@@ -18,7 +18,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
 from PyQt4 import QtCore, QtGui
-from picard.config import BoolOption, TextOption
+from picard.config import BoolOption, IntOption, TextOption
 from picard.ui.options import OptionsPage, OptionsCheckError, register_options_page
 from picard.ui.ui_options_tags import Ui_TagsOptionsPage
 
@@ -41,6 +41,8 @@ class TagsOptionsPage(OptionsPage):
         BoolOption("setting", "remove_ape_from_mp3", False),
         BoolOption("setting", "tpe2_albumartist", False),
         BoolOption("setting", "dont_write_tags", False),
+        # Padding to reserve when a tag grows, in percent of its size
+        IntOption("setting", "tag_padding_percent", 10),
     ]
 
     def __init__(self, parent=None):
@@ -64,6 +66,7 @@ class TagsOptionsPage(OptionsPage):
         self.ui.remove_ape_from_mp3.setChecked(self.config.setting["remove_ape_from_mp3"])
         self.ui.remove_id3_from_flac.setChecked(self.config.setting["remove_id3_from_flac"])
         self.ui.preserved_tags.setText(self.config.setting["preserved_tags"])
+        self.ui.tag_padding_percent.setValue(self.config.setting["tag_padding_percent"])
         self.update_encodings()
 
     def save(self):
@@ -80,6 +83,7 @@ class TagsOptionsPage(OptionsPage):
         self.config.setting["remove_ape_from_mp3"] = self.ui.remove_ape_from_mp3.isChecked()
         self.config.setting["remove_id3_from_flac"] = self.ui.remove_id3_from_flac.isChecked()
         self.config.setting["preserved_tags"] = unicode(self.ui.preserved_tags.text())
+        self.config.setting["tag_padding_percent"] = self.ui.tag_padding_percent.value()
         self.tagger.window.enable_tag_saving_action.setChecked(not self.config.setting["dont_write_tags"])
 
     def update_encodings(self):
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from PyQt4 import QtCore, QtGui
+from picard.util.metrics import registry
+
+
+# How often the dialog updates itself, in ms
+REFRESH_INTERVAL = 2000
+
+
+class StatsDialog(QtGui.QDialog):
+    """Shows the metrics of the running tagger."""
+
+    def __init__(self, parent=None):
+        QtGui.QDialog.__init__(self, parent)
+        self.resize(540, 400)
+        self.setWindowTitle(_("Statistics"))
+        self.tree = QtGui.QTreeWidget(self)
+        self.tree.setColumnCount(2)
+        self.tree.setHeaderLabels([_("Name"), _("Value")])
+        self.tree.setUniformRowHeights(True)
+        buttons = QtGui.QDialogButtonBox(self)
+        save_button = buttons.addButton(_("&Save..."), QtGui.QDialogButtonBox.ActionRole)
+        save_button.clicked.connect(self.save)
+        buttons.addButton(QtGui.QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+        vbox = QtGui.QVBoxLayout(self)
+        vbox.addWidget(self.tree)
+        vbox.addWidget(buttons)
+        self.expanded = set([_("Latency"), _("Counters")])
+        self.refresh()
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+        self.finished.connect(self.timer.stop)
+
+    def refresh(self):
+        dump = registry.dump()
+        for i in range(self.tree.topLevelItemCount()):
+            item = self.tree.topLevelItem(i)
+            if item.isExpanded():
+                self.expanded.add(unicode(item.text(0)))
+            else:
+                self.expanded.discard(unicode(item.text(0)))
+        self.tree.clear()
+        latency = {}
+        for name, h in dump["histograms"].items():
+            latency[name] = _("%(count)d x %(mean).1f ms, p95 %(p95).0f ms, max %(max).0f ms") % {
+                "count": h["count"], "mean": h["mean_ms"],
+                "p95": h["p95_ms"], "max": h["max_ms"]}
+        self._add_items(self.tree.invisibleRootItem(), [
+            (_("Latency"), latency),
+            (_("Counters"), dump["counters"]),
+            ] + sorted(dump["collected"].items()))
+        for i in range(self.tree.topLevelItemCount()):
+            item = self.tree.topLevelItem(i)
+            item.setExpanded(unicode(item.text(0)) in self.expanded)
+        self.tree.resizeColumnToContents(0)
+
+    def _add_items(self, parent, items):
+        for name, value in items:
+            item = QtGui.QTreeWidgetItem(parent)
+            item.setText(0, unicode(name))
+            if isinstance(value, dict):
+                self._add_items(item, sorted(value.items()))
+            elif isinstance(value, list):
+                self._add_items(item, [(i, v) for i, v in enumerate(value)])
+            elif isinstance(value, float):
+                item.setText(1, "%.3f" % value)
+            else:
+                item.setText(1, unicode(value))
+
+    def save(self):
+        filename = QtGui.QFileDialog.getSaveFileName(self, _("Save Statistics"),
+            "picard-stats.json", _("JSON files (*.json)"))
+        if not filename:
+            return
+        try:
+            f = open(unicode(filename), "w")
+            try:
+                json.dump(registry.dump(), f, indent=2, sort_keys=True)
+            finally:
+                f.close()
+        except (IOError, OSError), e:
+            QtGui.QMessageBox.critical(self, _("Save Statistics"),
+                _("Couldn't save the statistics:\n\n%s") % e)
@@ -99,9 +99,22 @@ class Ui_TagsOptionsPage(object):
         self.label_2.setObjectName(_fromUtf8("label_2"))
         self.horizontalLayout_2.addWidget(self.label_2)
         self.vboxlayout2.addWidget(self.groupBox_2)
+        self.horizontalLayout_3 = QtGui.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName(_fromUtf8("horizontalLayout_3"))
+        self.tag_padding_percent_label = QtGui.QLabel(self.rename_files_2)
+        self.tag_padding_percent_label.setObjectName(_fromUtf8("tag_padding_percent_label"))
+        self.horizontalLayout_3.addWidget(self.tag_padding_percent_label)
+        self.tag_padding_percent = QtGui.QSpinBox(self.rename_files_2)
+        self.tag_padding_percent.setMaximum(100)
+        self.tag_padding_percent.setObjectName(_fromUtf8("tag_padding_percent"))
+        self.horizontalLayout_3.addWidget(self.tag_padding_percent)
+        spacerItem2 = QtGui.QSpacerItem(40, 20, QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Minimum)
+        self.horizontalLayout_3.addItem(spacerItem2)
+        self.vboxlayout2.addLayout(self.horizontalLayout_3)
         self.vboxlayout.addWidget(self.rename_files_2)
-        spacerItem2 = QtGui.QSpacerItem(274, 41, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
-        self.vboxlayout.addItem(spacerItem2)
+        spacerItem3 = QtGui.QSpacerItem(274, 41, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
+        self.vboxlayout.addItem(spacerItem3)
+        self.tag_padding_percent_label.setBuddy(self.tag_padding_percent)
 
         self.retranslateUi(TagsOptionsPage)
         QtCore.QMetaObject.connectSlotsByName(TagsOptionsPage)
@@ -122,4 +135,6 @@ class Ui_TagsOptionsPage(object):
         self.enc_utf8.setText(_("UTF-8"))
         self.enc_utf16.setText(_("UTF-16"))
         self.enc_iso88591.setText(_("ISO-8859-1"))
+        self.tag_padding_percent_label.setText(_("Reserve space for tags to grow:"))
+        self.tag_padding_percent.setSuffix(_(" %"))
 
@@ -326,6 +326,15 @@ def find_existing_path(path):
     return decode_filename(path)
 
 
+def get_device(path):
+    """Return the ``st_dev`` of the file system ``path`` or its nearest
+    existing parent directory is on, or ``None`` if it is unknown."""
+    try:
+        return os.stat(encode_filename(find_existing_path(path))).st_dev
+    except EnvironmentError:
+        return None
+
+
 def call_next(func):
     def func_wrapper(self, *args, **kwargs):
         next = args[0]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""Assignment of rows to columns in a score matrix.
+
+Matrices are lists of rows, a cell is either a score or ``None`` if the row
+must not be assigned to that column. Every column is assigned to at most one
+row and the functions return a dictionary mapping row indexes to column
+indexes; rows without a usable column are left out.
+"""
+
+# Largest number of rows or columns solved with the O(n^3) Hungarian
+# algorithm, bigger matrices are assigned greedily
+MAX_OPTIMAL_SIZE = 150
+
+
+def optimal_assignment(scores):
+    """Assignment with the highest total score (Hungarian algorithm)."""
+    rows = len(scores)
+    if not rows:
+        return {}
+    cols = len(scores[0])
+    n = max(rows, cols)
+    if not cols:
+        return {}
+    # Square cost matrix, 1-based as in the classical formulation. Padding
+    # and forbidden cells cost nothing, which is the same as not assigning.
+    inf = 1e30
+    cost = [[0.0] * (n + 1) for i in xrange(n + 1)]
+    for i, row in enumerate(scores):
+        cost_row = cost[i + 1]
+        for j, score in enumerate(row):
+            if score is not None:
+                cost_row[j + 1] = -score
+    u = [0.0] * (n + 1)
+    v = [0.0] * (n + 1)
+    match = [0] * (n + 1)
+    way = [0] * (n + 1)
+    for i in xrange(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (n + 1)
+        used = [False] * (n + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            cost_row = cost[i0]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in xrange(1, n + 1):
+                if not used[j]:
+                    cur = cost_row[j] - ui0 - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in xrange(n + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    result = {}
+    for j in xrange(1, cols + 1):
+        i = match[j]
+        if 0 < i <= rows and scores[i - 1][j - 1] is not None:
+            result[i - 1] = j - 1
+    return result
+
+
+def greedy_assignment(scores, row_keys=None):
+    """Assigns the best scoring pairs first.
+
+    Pairs with the same score are taken by column and then by the key of
+    the row in ``row_keys``, or by row index if no keys are given. With
+    keys the result doesn't depend on the order of the rows, but it isn't
+    guaranteed to have the highest total score."""
+    if row_keys is None:
+        row_keys = range(len(scores))
+    pairs = []
+    for i, row in enumerate(scores):
+        key = row_keys[i]
+        for j, score in enumerate(row):
+            if score is not None:
+                pairs.append((-score, j, key, i))
+    pairs.sort()
+    result = {}
+    used = set()
+    for score, j, key, i in pairs:
+        if i not in result and j not in used:
+            result[i] = j
+            used.add(j)
+    return result
+
+
+def best_assignment(scores, max_optimal_size=MAX_OPTIMAL_SIZE, row_keys=None):
+    """Optimal assignment for small matrices, greedy for large ones."""
+    if not scores:
+        return {}
+    if max(len(scores), len(scores[0])) > max_optimal_size:
+        return greedy_assignment(scores, row_keys)
+    return optimal_assignment(scores)
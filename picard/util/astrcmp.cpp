@@ -148,16 +148,152 @@ float LevenshteinDistance(const Py_UNICODE * s1, int len1,
 	return result;
 }
 
+/***
+ * Compute Levenshtein distance, but only as far as it is needed to decide
+ * whether the similarity reaches ``min_similarity``. Only the diagonal band
+ * of cells that can still lead to a good enough result is computed (Ukkonen),
+ * and the computation stops as soon as the whole band is over the limit.
+ * Only the last three rows of the matrix are kept in memory, sized by the
+ * shorter of the two strings.
+ *
+ * Returns the same value as LevenshteinDistance if the similarity is at
+ * least ``min_similarity``, 0.0 otherwise.
+ ***/
+
+float LevenshteinDistanceBounded(const Py_UNICODE * s1, int len1,
+	                             const Py_UNICODE * s2, int len2,
+	                             float min_similarity)
+{
+	/* Check string lengths */
+
+	if (len1 == 0)
+		return 0.0f;
+
+	if (len2 == 0)
+		return 0.0f;
+
+	/* Let the second string be the shorter one, the rows are sized by it.
+	   The transposition step below is symmetric, so this doesn't change
+	   the result. */
+
+	if (len2 > len1)
+	{
+		const Py_UNICODE *tmp_s = s1; s1 = s2; s2 = tmp_s;
+		int tmp_len = len1; len1 = len2; len2 = tmp_len;
+	}
+
+	/* Find the highest distance that still gives the wanted similarity,
+	   using the same arithmetic as the final score */
+
+	int maxlen = len1;
+	int limit = (int)((1.0f - min_similarity) * (float)maxlen);
+	if (limit > maxlen)
+		limit = maxlen;
+	while (limit < maxlen &&
+	       ((float)1 - ((float)(limit + 1) / (float)maxlen)) >= min_similarity)
+		limit++;
+	while (limit >= 0 &&
+	       ((float)1 - ((float)limit / (float)maxlen)) < min_similarity)
+		limit--;
+
+	/* Every cell is at least as high as its distance from the main
+	   diagonal, so the length difference alone can rule the strings out */
+
+	if (limit < 0 || len1 - len2 > limit)
+		return 0.0f;
+
+	/* Cells outside of the band are only known to be over the limit */
+
+	int over = limit + 1;
+	int *rows = new int[3 * (len2 + 1)];
+	int *prev2 = rows;
+	int *prev = rows + (len2 + 1);
+	int *row = rows + 2 * (len2 + 1);
+
+	for (int index2 = 0; index2 <= len2; index2++)
+		prev[index2] = min(index2, over);
+	int prev_min = 0;
+
+	for (int index1 = 1; index1 <= len1; index1++)
+	{
+		Py_UNICODE s1_current = s1[index1 - 1];
+		int first = max(1, index1 - limit);
+		int last = min(len2, index1 + limit);
+		int row_min = over;
+
+		/* The cell left of the band is either the first column or
+		   outside of the band */
+
+		row[first - 1] = (first == 1) ? min(index1, over) : over;
+
+		for (int index2 = first; index2 <= last; index2++)
+		{
+			Py_UNICODE s2_current = s2[index2 - 1];
+			int cost = (s1_current == s2_current) ? 0 : 1;
+
+			int above = prev[index2];
+			int left = row[index2 - 1];
+			int diagonal = prev[index2 - 1];
+			int cell = min(min(above + 1, left + 1), diagonal + cost);
+
+			/* Transposition, the same as in LevenshteinDistance */
+
+			if (index1 > 2 && index2 > 2)
+			{
+				int trans = prev2[index2 - 2] + 1;
+				if (s1[index1 - 2] != s2_current)
+					trans++;
+				if (s1_current != s2[index2 - 2])
+					trans++;
+				if (cell > trans)
+					cell = trans;
+			}
+
+			cell = min(cell, over);
+			row[index2] = cell;
+			row_min = min(row_min, cell);
+		}
+
+		/* The next row reads one cell past the end of this band */
+
+		if (last < len2)
+			row[last + 1] = over;
+
+		/* No later row can get below the minimum of the last two rows */
+
+		if (row_min > limit && prev_min > limit)
+		{
+			delete [] rows;
+			return 0.0f;
+		}
+
+		int *tmp = prev2;
+		prev2 = prev;
+		prev = row;
+		row = tmp;
+		prev_min = row_min;
+	}
+
+	int distance = prev[len2];
+	delete [] rows;
+
+	if (distance > limit)
+		return 0.0f;
+
+	return ((float)1 - ((float)distance / (float)maxlen));
+}
+
 static PyObject *
 astrcmp(PyObject *self, PyObject *args)
 {
     PyObject *s1, *s2;
 	float d;
+	float min_similarity = 0.0f;
 	const Py_UNICODE *us1, *us2;
 	int len1, len2;
     PyThreadState *_save;
 
-    if (!PyArg_ParseTuple(args, "UU", &s1, &s2))
+    if (!PyArg_ParseTuple(args, "UU|f", &s1, &s2, &min_similarity))
         return NULL;
 
 	us1 = PyUnicode_AS_UNICODE(s1);
@@ -166,13 +302,18 @@ astrcmp(PyObject *self, PyObject *args)
 	len2 = PyUnicode_GetSize(s2);
 
     Py_UNBLOCK_THREADS
-	d = LevenshteinDistance(us1, len1, us2, len2);
+	if (min_similarity > 0.0f)
+		d = LevenshteinDistanceBounded(us1, len1, us2, len2, min_similarity);
+	else
+		d = LevenshteinDistance(us1, len1, us2, len2);
     Py_BLOCK_THREADS
     return Py_BuildValue("f", d);
 }
 
 static PyMethodDef AstrcmpMethods[] = {
-    {"astrcmp", astrcmp, METH_VARARGS, "Compute Levenshtein distance"},
+    {"astrcmp", astrcmp, METH_VARARGS,
+     "Compute Levenshtein distance. If the optional minimal similarity is "
+     "given, 0.0 is returned as soon as it can't be reached."},
     {NULL, NULL, 0, NULL}
 };
 
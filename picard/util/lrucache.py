@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""A bounded mapping which discards the least recently used entries."""
+
+
+class LRUCache(object):
+    """Dictionary-like cache holding at most ``maxsize`` entries.
+
+    Lookups with ``[]`` and ``get`` are counted in ``hits`` and ``misses``.
+    The cache does no locking, share it only between callers in one thread.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        # key -> [prev, next, key, value]; the root link is never removed
+        self._map = {}
+        self._root = root = []
+        root[:] = [root, root, None, None]
+
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def __getitem__(self, key):
+        try:
+            link = self._map[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        self._mark_used(link)
+        return link[3]
+
+    def get(self, key, default=None):
+        link = self._map.get(key)
+        if link is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._mark_used(link)
+        return link[3]
+
+    def __setitem__(self, key, value):
+        try:
+            link = self._map[key]
+        except KeyError:
+            if self.maxsize > 0 and len(self._map) >= self.maxsize:
+                self._discard_oldest()
+            root = self._root
+            last = root[0]
+            link = [last, root, key, value]
+            last[1] = root[0] = self._map[key] = link
+        else:
+            link[3] = value
+            self._mark_used(link)
+
+    def __delitem__(self, key):
+        link_prev, link_next, key, value = self._map.pop(key)
+        link_prev[1] = link_next
+        link_next[0] = link_prev
+
+    def _mark_used(self, link):
+        link_prev, link_next = link[0], link[1]
+        link_prev[1] = link_next
+        link_next[0] = link_prev
+        root = self._root
+        last = root[0]
+        link[0] = last
+        link[1] = root
+        last[1] = root[0] = link
+
+    def _discard_oldest(self):
+        oldest = self._root[1]
+        del self[oldest[2]]
+
+    def stats(self):
+        """Returns a dictionary with the size and hit rate of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._map),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+        }
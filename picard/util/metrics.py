@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""Counters and latency histograms for the stages of the tagger.
+
+Metrics are recorded in the module-level ``registry`` from any thread, e.g.
+``registry.observe("queue.load.run", seconds)``. Other modules can register
+a collector, a function returning a dictionary, whose result is included in
+the dump.
+"""
+
+import time
+from PyQt4 import QtCore
+
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000,
+           30000, 60000)
+
+
+class Histogram(object):
+    """Distribution of durations, in buckets of ``BUCKETS``."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        i = 0
+        while i < len(BUCKETS) and ms > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket holding the ``fraction``
+        quantile, in milliseconds. The last bucket is bounded by the
+        maximum."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                break
+        if i < len(BUCKETS):
+            return float(min(BUCKETS[i], self.max * 1000))
+        return self.max * 1000
+
+    def dump(self):
+        return {
+            "count": self.count,
+            "seconds": self.seconds,
+            "mean_ms": self.seconds * 1000 / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max * 1000,
+            "buckets": [{"le_ms": bound, "count": n} for bound, n in
+                        zip(list(BUCKETS) + [None], self.counts) if n],
+        }
+
+
+class Registry(object):
+    """Named counters and histograms. All methods are thread-safe."""
+
+    def __init__(self, clock=time.time):
+        self._lock = QtCore.QMutex()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = {}
+        # Number of durations observed, to tell whether anything happened
+        self.observations = 0
+        self.clock = clock
+        self.started = clock()
+
+    def count(self, name, n=1):
+        self._lock.lock()
+        try:
+            self._counters[name] = self._counters.get(name, 0) + n
+        finally:
+            self._lock.unlock()
+
+    def observe(self, name, seconds):
+        """Add a duration to the histogram ``name``."""
+        self._lock.lock()
+        try:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(seconds)
+            self.observations += 1
+        finally:
+            self._lock.unlock()
+
+    def register_collector(self, name, func):
+        """Include the dictionary returned by ``func`` in the dump."""
+        self._lock.lock()
+        try:
+            self._collectors[name] = func
+        finally:
+            self._lock.unlock()
+
+    def unregister_collector(self, name):
+        self._lock.lock()
+        try:
+            self._collectors.pop(name, None)
+        finally:
+            self._lock.unlock()
+
+    def dump(self):
+        """Return all metrics. The result only contains lists, dictionaries,
+        strings and numbers, so it can be saved as JSON."""
+        self._lock.lock()
+        try:
+            counters = dict(self._counters)
+            histograms = {}
+            for name, histogram in self._histograms.items():
+                histograms[name] = histogram.dump()
+            collectors = self._collectors.items()
+        finally:
+            self._lock.unlock()
+        # Collectors take their own locks, don't hold ours while they run
+        collected = {}
+        for name, func in collectors:
+            try:
+                collected[name] = func()
+            except Exception, e:
+                collected[name] = {"error": str(e)}
+        return {
+            "uptime": self.clock() - self.started,
+            "counters": counters,
+            "histograms": histograms,
+            "collected": collected,
+        }
+
+    def summary(self):
+        """Return a line with the count and latency of each histogram."""
+        dump = self.dump()
+        parts = []
+        for name in sorted(dump["histograms"]):
+            h = dump["histograms"][name]
+            parts.append("%s %d x %.1f ms (p95 %.0f ms)" % (
+                name, h["count"], h["mean_ms"], h["p95_ms"]))
+        return "; ".join(parts)
+
+    def clear(self):
+        self._lock.lock()
+        try:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = self.clock()
+        finally:
+            self._lock.unlock()
+
+
+registry = Registry()
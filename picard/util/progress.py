@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""Counters for reporting the progress of batch operations."""
+
+import locale
+import time
+
+
+def format_count(number):
+    """Formats ``number`` with the thousands separator of the locale."""
+    return locale.format("%d", number, grouping=True)
+
+
+class Progress(object):
+    """Counts the items of a batch operation, such as identifying files.
+
+    ``start`` and ``finish`` may be called more than once for the same item.
+    A new batch begins when ``start`` is called after all items of the
+    previous one have finished. ``callback`` is called whenever the counts
+    change. The counters do no locking.
+    """
+
+    def __init__(self, message, callback=None, clock=time.time):
+        self.message = message
+        self.callback = callback
+        self.clock = clock
+        self._pending = set()
+        self.total = 0
+        self.done = 0
+        self.started = None
+
+    @property
+    def active(self):
+        return bool(self._pending)
+
+    def start(self, item):
+        if item in self._pending:
+            return
+        if not self._pending:
+            self.total = self.done = 0
+            self.started = self.clock()
+        self._pending.add(item)
+        self.total += 1
+        self._changed()
+
+    def finish(self, item):
+        try:
+            self._pending.remove(item)
+        except KeyError:
+            return
+        self.done += 1
+        self._changed()
+
+    def rate(self):
+        """Returns the number of finished items per second."""
+        if self.started is None:
+            return 0.0
+        elapsed = self.clock() - self.started
+        if elapsed <= 0:
+            return 0.0
+        return self.done / elapsed
+
+    def text(self):
+        return _(self.message) % {
+            "done": format_count(self.done),
+            "total": format_count(self.total),
+            "rate": self.rate(),
+        }
+
+    def _changed(self):
+        if self.callback is not None:
+            self.callback()
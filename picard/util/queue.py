@@ -3,13 +3,18 @@
 from time import time as _time
 from collections import deque
 from PyQt4 import QtCore
+from picard.util.metrics import registry
 
 class Queue:
     """Create a queue object with a given maximum size.
 
-    If maxsize is <= 0, the queue size is infinite.
+    If maxsize is <= 0, the queue size is infinite. If the queue has a
+    ``name``, the time items wait in it is recorded as ``queue.<name>.wait``.
     """
-    def __init__(self, maxsize=0):
+    def __init__(self, maxsize=0, name=None):
+        self.name = name
+        # Time each queued item was put, by item id
+        self.put_times = {}
         self._init(maxsize)
         # mutex must be held whenever the queue is mutating.  All methods
         # that acquire mutex must release it before returning.  mutex
@@ -47,6 +52,7 @@ class Queue:
             while self._full():
                 self.not_full.wait(self.mutex)
             self._put(item)
+            self.put_times[id(item)] = _time()
             self.not_empty.wakeOne()
         finally:
             self.mutex.unlock()
@@ -67,11 +73,18 @@ class Queue:
             while self._empty():
                 self.not_empty.wait(self.mutex)
             item = self._get()
+            self._waited(item)
             self.not_full.wakeOne()
             return item
         finally:
             self.mutex.unlock()
 
+    def _waited(self, item):
+        """Record how long ``item`` was queued."""
+        put_time = self.put_times.pop(id(item), None)
+        if put_time is not None and self.name and item is not None:
+            registry.observe("queue.%s.wait" % self.name, _time() - put_time)
+
     # Initialize the queue representation
     def _init(self, maxsize):
         self.maxsize = maxsize
@@ -95,6 +108,7 @@ class Queue:
     # Remove an item from the queue
     def _remove(self, item):
         if item in self.queue:
+            self.put_times.pop(id(item), None)
             try:
                 # remove is only availible in python 2.5
                 self.queue.remove(item)
@@ -110,3 +124,117 @@ class Queue:
     # Get an item from the queue
     def _get(self):
         return self.queue.popleft()
+
+
+class PartitionedQueue(Queue):
+    """Queue for items which use some resources exclusively, e.g. disks.
+
+    ``put`` takes the set of resources an item needs. ``get`` only returns
+    items whose resources are not used by another running item, and items
+    sharing a resource are returned in the order they were put. Call
+    ``task_done`` when an item returned by ``get`` has been processed.
+    The time spent per resource is counted, see ``stats``.
+    """
+
+    def _init(self, maxsize):
+        Queue._init(self, maxsize)
+        # Resources of running items, by item id
+        self.running = {}
+        self.busy = set()
+        # resource -> [queued items, finished items, seconds]
+        self.resources = {}
+        # Number of queued items without resources
+        self.free_items = 0
+
+    def put(self, item, resources=()):
+        """Put an item which needs ``resources`` into the queue."""
+        Queue.put(self, (item, frozenset(resources)))
+
+    def _put(self, entry):
+        Queue._put(self, entry)
+        if not entry[1]:
+            self.free_items += 1
+        for resource in entry[1]:
+            self.resources.setdefault(resource, [0, 0, 0.0])[0] += 1
+
+    def _dequeued(self, entry):
+        if not entry[1]:
+            self.free_items -= 1
+        for resource in entry[1]:
+            self.resources[resource][0] -= 1
+
+    def _remove(self, item):
+        for entry in self.queue:
+            if entry[0] == item:
+                self.queue.remove(entry)
+                self.put_times.pop(id(entry), None)
+                self._dequeued(entry)
+                break
+
+    def _find(self):
+        """Return the index of the first item which can run, or -1."""
+        unavailable = set(self.busy)
+        num_resources = len(self.resources)
+        for i, (item, resources) in enumerate(self.queue):
+            if not unavailable.intersection(resources):
+                return i
+            # Later items using these resources have to wait too
+            unavailable.update(resources)
+            if len(unavailable) >= num_resources and not self.free_items:
+                break
+        return -1
+
+    def get(self):
+        """Remove and return an item which can run now."""
+        self.mutex.lock()
+        try:
+            while True:
+                i = self._find()
+                if i >= 0:
+                    break
+                self.not_empty.wait(self.mutex)
+            self.queue.rotate(-i)
+            entry = self.queue.popleft()
+            self.queue.rotate(i)
+            self._dequeued(entry)
+            self._waited(entry)
+            item, resources = entry
+            if item is not None:
+                self.busy.update(resources)
+                self.running[id(item)] = (resources, _time())
+            self.not_full.wakeOne()
+            return item
+        finally:
+            self.mutex.unlock()
+
+    def task_done(self, item):
+        """Release the resources of an item returned by ``get``."""
+        self.mutex.lock()
+        try:
+            resources, start = self.running.pop(id(item))
+            seconds = _time() - start
+            self.busy.difference_update(resources)
+            for resource in resources:
+                counters = self.resources[resource]
+                counters[1] += 1
+                counters[2] += seconds
+            self.not_empty.wakeAll()
+        finally:
+            self.mutex.unlock()
+
+    def stats(self):
+        """Return the queued and finished items and the time spent for
+        each resource."""
+        self.mutex.lock()
+        try:
+            stats = {}
+            for resource, (queued, finished, seconds) in self.resources.items():
+                stats[resource] = {
+                    'queued': queued,
+                    'finished': finished,
+                    'seconds': seconds,
+                    'items_per_second': finished / seconds if seconds else 0.0,
+                }
+            return stats
+        finally:
+            self.mutex.unlock()
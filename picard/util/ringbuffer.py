@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# Picard, the next-generation MusicBrainz tagger
+# Copyright (C) 2012 The MusicBrainz Picard developers
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""A fixed-capacity buffer which overwrites its oldest items."""
+
+
+class RingBuffer(object):
+    """Sequence of at most ``capacity`` items, oldest first.
+
+    ``total`` counts all items ever appended, so a reader can remember it
+    and later fetch only the newer items with ``since``. The buffer does no
+    locking.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self._items = []
+        self.total = 0
+
+    def append(self, item):
+        if len(self._items) < self.capacity:
+            self._items.append(item)
+        else:
+            self._items[self.total % self.capacity] = item
+        self.total += 1
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self.since(0))
+
+    def since(self, total):
+        """Return the items appended after the first ``total`` ones that
+        are still in the buffer."""
+        items = self._items
+        count = min(self.total - total, len(items))
+        if count <= 0:
+            return []
+        end = self.total % self.capacity if len(items) == self.capacity else len(items)
+        start = end - count
+        if start >= 0:
+            return items[start:end]
+        return items[start:] + items[:end]
@@ -18,7 +18,9 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
 import sys
+import time
 import traceback
+from picard.util.metrics import registry
 from picard.util.queue import Queue
 from PyQt4 import QtCore
 
@@ -55,8 +57,14 @@ class Thread(QtCore.QThread):
 
     def run_item(self, item):
         func, next, priority = item
+        started = time.time()
         try:
-            result = func()
+            try:
+                result = func()
+            finally:
+                if self.queue.name:
+                    registry.observe("queue.%s.run" % self.queue.name,
+                                     time.time() - started)
         except:
             self.log.error(traceback.format_exc())
             self.to_main(next, priority, error=sys.exc_info()[1])
@@ -68,6 +76,16 @@ class Thread(QtCore.QThread):
         QtCore.QCoreApplication.postEvent(self.parent(), event, priority)
 
 
+class PartitionedThread(Thread):
+    """Thread running the items of a ``PartitionedQueue``."""
+
+    def run_item(self, item):
+        try:
+            Thread.run_item(self, item)
+        finally:
+            self.queue.task_done(item)
+
+
 class ThreadPool(QtCore.QObject):
 
     instance = None
@@ -33,6 +33,7 @@ from PyQt4 import QtCore, QtNetwork, QtXml
 from PyQt4.QtCore import QUrl
 from picard import version_string
 from picard.util import partial
+from picard.util.metrics import registry
 from picard.const import PUID_SUBMIT_HOST, PUID_SUBMIT_PORT, ACOUSTID_KEY
 
 
@@ -158,7 +159,8 @@ class XmlWebService(QtCore.QObject):
         reply = send(request, data) if data is not None else send(request)
         key = (host, port)
         self._last_request_times[key] = time.time()
-        self._active_requests[reply] = (request, handler, xml)
+        self._active_requests[reply] = (request, handler, xml, key,
+                                        self._last_request_times[key])
         return True
 
     @staticmethod
@@ -173,16 +175,19 @@ class XmlWebService(QtCore.QObject):
 
     def _process_reply(self, reply):
         try:
-            request, handler, xml = self._active_requests.pop(reply)
+            request, handler, xml, key, started = self._active_requests.pop(reply)
         except KeyError:
             self.log.error("Error: Request not found for %s" % str(reply.request().url().toString()))
             return
+        registry.observe("ws.%s:%d.response" % key, time.time() - started)
         error = int(reply.error())
         redirect = reply.attribute(QtNetwork.QNetworkRequest.RedirectionTargetAttribute).toUrl()
         self.log.debug("Received reply for %s: HTTP %d (%s)",
                        reply.request().url().toString(),
                        reply.attribute(QtNetwork.QNetworkRequest.HttpStatusCodeAttribute).toInt()[0],
                        reply.attribute(QtNetwork.QNetworkRequest.HttpReasonPhraseAttribute).toString())
+        if error:
+            registry.count("ws.%s:%d.errors" % key)
         if handler is not None:
             if error:
                 self.log.error("Network request error for %s: %s (QT code %d, HTTP code %d)",
@@ -240,6 +245,26 @@ class XmlWebService(QtCore.QObject):
         for reply in self._active_requests.keys():
             reply.abort()
 
+    def num_pending_tasks(self):
+        """Returns the number of queued and running requests."""
+        queued = 0
+        for queues in (self._high_priority_queues, self._low_priority_queues):
+            for queue in queues.itervalues():
+                queued += len(queue)
+        return queued + len(self._active_requests)
+
+    def queue_depths(self):
+        """Returns the queued and running requests for each host."""
+        depths = {}
+        for key in self._hosts:
+            queued = 0
+            for queues in (self._high_priority_queues, self._low_priority_queues):
+                queued += len(queues.get(key, ()))
+            depths["%s:%d" % key] = {"queued": queued, "active": 0}
+        for request, handler, xml, key, started in self._active_requests.itervalues():
+            depths.setdefault("%s:%d" % key, {"queued": 0, "active": 0})["active"] += 1
+        return depths
+
     def _run_next_task(self):
         delay = sys.maxint
         for key in self._hosts:
@@ -0,0 +1,87 @@
+"""Benchmarks for Picard's hot paths.
+
+The benchmarks are not run with the tests, run them one by one, e.g.:
+
+    python -m test.benchmark.release_scoring
+
+or run all hot paths on a synthetic corpus with ``test.benchmark.suite``.
+"""
+
+import gzip
+import os.path
+import time
+import xml.sax
+from picard.webservice import XmlNode
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+class _XmlHandler(xml.sax.ContentHandler):
+    """Builds the same ``XmlNode`` tree as ``picard.webservice.XmlHandler``."""
+
+    def __init__(self):
+        xml.sax.ContentHandler.__init__(self)
+        self.document = XmlNode()
+        self.node = self.document
+        self.path = []
+
+    @staticmethod
+    def _node_name(name):
+        return "".join([c if c.isalnum() and ord(c) < 128 else "_"
+                        for c in name.split(":")[-1]])
+
+    def startElement(self, name, attrs):
+        node = XmlNode()
+        for key, value in attrs.items():
+            node.attribs[self._node_name(key)] = unicode(value)
+        self.node.append_child(self._node_name(name), node)
+        self.path.append(self.node)
+        self.node = node
+
+    def endElement(self, name):
+        self.node = self.path.pop()
+
+    def characters(self, text):
+        self.node.text += unicode(text)
+
+
+def parse_xml(data):
+    """Parse a web service response."""
+    handler = _XmlHandler()
+    xml.sax.parseString(data, handler)
+    return handler.document
+
+
+def load_xml(name):
+    """Parse a saved web service response from the test data directory."""
+    filename = data_path(name)
+    if filename.endswith(".gz"):
+        f = gzip.open(filename, "rb")
+    else:
+        f = open(filename, "rb")
+    try:
+        return parse_xml(f.read())
+    finally:
+        f.close()
+
+
+def measure(func, number=10, repeat=3):
+    """Return the best time of ``repeat`` runs of ``number`` calls, per call."""
+    best = None
+    for i in xrange(repeat):
+        start = time.time()
+        for j in xrange(number):
+            func()
+        elapsed = (time.time() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def report(name, seconds):
+    print "%-50s %10.3f ms" % (name, seconds * 1000)
@@ -0,0 +1,27 @@
+"""Reads an option through the config section and from a settings
+snapshot."""
+
+from picard.config import Config, IntOption, TextOption
+from test.benchmark import measure, report
+
+
+IntOption("setting", "track_matching_threshold", 40)
+TextOption("setting", "enabled_plugins", "")
+
+
+def main():
+    config = Config()
+    setting = config.setting
+    def read_section():
+        for i in xrange(1000):
+            setting["track_matching_threshold"]
+    report("option x1000, config section", measure(read_section))
+    def read_snapshot():
+        snapshot = config.snapshot()
+        for i in xrange(1000):
+            snapshot["track_matching_threshold"]
+    report("option x1000, snapshot", measure(read_snapshot))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""Generates a synthetic corpus for the benchmarks.
+
+The corpus is made of tagged files in every format that can be created
+without an encoder and of web service responses (release lookups,
+recording searches and AcoustID lookups). Everything is derived from a
+seeded random generator, so the same seed always gives the same corpus.
+"""
+
+import os.path
+import shutil
+import struct
+import wave
+from xml.sax.saxutils import escape, quoteattr
+import picard.formats
+from picard.metadata import Metadata
+from test.benchmark import data_path
+
+
+WORDS = (u"love", u"night", u"heart", u"blue", u"river", u"dream", u"fire",
+         u"song", u"road", u"light", u"summer", u"rain", u"city", u"gold",
+         u"shadow", u"morning", u"wild", u"ocean", u"star", u"home",
+         u"été", u"straße", u"дождь",
+         u"夜")
+
+COUNTRIES = ("GB", "US", "XE", "DE", "JP", "NL")
+FORMATS = ("CD", "Digital Media", "12\" Vinyl", "Cassette")
+TYPES = ("Album", "Single", "EP", "Compilation", "Live", "Other")
+
+# Sample files copied for formats which need real audio data
+SAMPLES = {
+    "mp3": "test.mp3",
+    "flac": "test.flac",
+    "ogg": "test.ogg",
+    "m4a": "test.m4a",
+    "wma": "test.wma",
+    "wv": "test.wv",
+}
+
+
+def _write_wav(filename):
+    f = wave.open(filename, "wb")
+    try:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(44100)
+        f.writeframes("\0" * 4 * 4410)
+    finally:
+        f.close()
+
+
+def _write_header(header):
+    def write(filename):
+        f = open(filename, "wb")
+        try:
+            f.write(header)
+        finally:
+            f.close()
+    return write
+
+
+# Formats whose stream header is simple enough to be written directly,
+# mutagen only reads the header to get the length
+WRITERS = {
+    "wav": _write_wav,
+    "tta": _write_header(
+        "TTA1" + struct.pack("<HHHII", 1, 2, 16, 44100, 44100) + "\0" * 4),
+    "ape": _write_header(
+        "MAC " + struct.pack("<H", 3990) + "\0" * 50 +
+        struct.pack("<IIIHHI", 73728, 44100, 1, 16, 2, 44100)),
+}
+
+
+def corpus_formats():
+    """Returns ``(extension, name)`` for every registered format, and
+    whether files in that format can be generated."""
+    formats = []
+    for extensions, name in picard.formats.supported_formats():
+        ext = extensions[0][1:]
+        formats.append((ext, name, ext in SAMPLES or ext in WRITERS))
+    return formats
+
+
+def make_id(rng):
+    return "%08x-%04x-%04x-%04x-%012x" % (
+        rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16),
+        rng.getrandbits(16), rng.getrandbits(48))
+
+
+def make_title(rng, words=3):
+    return u" ".join([rng.choice(WORDS) for i in xrange(words)]).title()
+
+
+def make_albums(rng, count, tracks=12):
+    """Returns ``count`` albums as ``(artist, album, titles)``."""
+    albums = []
+    for i in xrange(count):
+        artist = u"The %s" % make_title(rng, 2)
+        album = make_title(rng, rng.randint(1, 4))
+        titles = [make_title(rng, rng.randint(1, 5)) for j in xrange(tracks)]
+        albums.append((artist, album, titles))
+    return albums
+
+
+def _misspell(rng, text):
+    if len(text) < 4 or rng.random() > 0.2:
+        return text
+    i = rng.randrange(len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def make_metadata(rng, count, tracks=12):
+    """Returns ``count`` metadata objects as found in a music collection.
+
+    Tracks are spread over albums of ``tracks`` tracks, with the usual
+    variations between files of the same album (case, typos, featured
+    artists)."""
+    albums = make_albums(rng, max(1, count / tracks), tracks)
+    result = []
+    for i in xrange(count):
+        artist, album, titles = albums[i % len(albums)]
+        number = i / len(albums) % tracks
+        metadata = Metadata()
+        metadata["album"] = _misspell(rng, album)
+        metadata["albumartist"] = artist
+        metadata["artist"] = _misspell(rng, artist)
+        if rng.random() < 0.1:
+            metadata["artist"] += u" feat. %s" % make_title(rng, 1)
+        if rng.random() < 0.1:
+            metadata["album"] = metadata["album"].lower()
+        metadata["title"] = titles[number]
+        metadata["tracknumber"] = unicode(number + 1)
+        metadata["totaltracks"] = unicode(tracks)
+        metadata["date"] = unicode(rng.randint(1960, 2012))
+        metadata["genre"] = rng.choice(WORDS).title()
+        metadata["musicbrainz_albumid"] = unicode(make_id(rng))
+        metadata["musicbrainz_trackid"] = unicode(make_id(rng))
+        metadata.length = rng.randint(120, 420) * 1000
+        result.append(metadata)
+    return result
+
+
+def make_files(directory, ext, metadata_list, config):
+    """Writes one file with extension ``ext`` per metadata object and
+    returns the file names."""
+    filenames = []
+    for i, metadata in enumerate(metadata_list):
+        filename = os.path.join(directory, "%05d.%s" % (i, ext))
+        if ext in SAMPLES:
+            shutil.copy(data_path(SAMPLES[ext]), filename)
+        else:
+            WRITERS[ext](filename)
+        file = picard.formats.open(filename)
+        file._save(filename, metadata, config.setting)
+        filenames.append(filename)
+    return filenames
+
+
+def _element(name, text, **attribs):
+    attrs = "".join([" %s=%s" % (key, quoteattr(value))
+                     for key, value in sorted(attribs.items())])
+    return u"<%s%s>%s</%s>" % (name, attrs, text, name)
+
+
+def _text(name, text):
+    return _element(name, escape(text))
+
+
+def _artist_credit(rng, name):
+    return _element("artist-credit", _element("name-credit", _element(
+        "artist", _text("name", name) + _text("sort-name", name),
+        id=make_id(rng))))
+
+
+def _document(body):
+    return (u'<?xml version="1.0" encoding="UTF-8"?>'
+            u'<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#" '
+            u'xmlns:ext="http://musicbrainz.org/ns/ext#-2.0">%s</metadata>'
+            % body).encode("utf-8")
+
+
+def _short_release(rng, album, title, track_count):
+    position = rng.randint(1, track_count)
+    track = _element("track", _text("number", unicode(position)) +
+                     _text("title", title) +
+                     _text("length", unicode(rng.randint(120, 420) * 1000)))
+    medium = _element("medium",
+                      _text("position", u"1") +
+                      _text("format", rng.choice(FORMATS)) +
+                      _element("track-list", track, count=str(track_count),
+                               offset="0"))
+    return _element(
+        "release",
+        _text("title", album) +
+        _text("status", u"Official") +
+        _element("release-group", u"", id=make_id(rng),
+                 type=rng.choice(TYPES)) +
+        _text("country", rng.choice(COUNTRIES)) +
+        _element("medium-list", _text("track-count", unicode(track_count)) +
+                 medium, count="1"),
+        id=make_id(rng))
+
+
+def release_xml(rng, tracks=12, media=1):
+    """A release lookup response with ``media`` media of ``tracks`` tracks."""
+    artist, album, titles = make_albums(rng, 1, tracks)[0]
+    mediums = []
+    for m in xrange(media):
+        track_list = []
+        for i, title in enumerate(titles):
+            length = unicode(rng.randint(120, 420) * 1000)
+            recording = _element("recording",
+                                 _text("title", title) +
+                                 _text("length", length) +
+                                 _artist_credit(rng, artist),
+                                 id=make_id(rng))
+            track_list.append(_element("track",
+                                       _text("position", unicode(i + 1)) +
+                                       _text("number", unicode(i + 1)) +
+                                       _text("length", length) + recording,
+                                       id=make_id(rng)))
+        mediums.append(_element("medium",
+                                _text("position", unicode(m + 1)) +
+                                _text("format", rng.choice(FORMATS)) +
+                                _element("track-list", u"".join(track_list),
+                                         count=str(tracks), offset="0")))
+    release = _element(
+        "release",
+        _text("title", album) +
+        _text("status", u"Official") +
+        _text("date", unicode(rng.randint(1960, 2012))) +
+        _text("country", rng.choice(COUNTRIES)) +
+        _artist_credit(rng, artist) +
+        _element("release-group", _text("title", album), id=make_id(rng),
+                 type=rng.choice(TYPES)) +
+        _element("medium-list", u"".join(mediums), count=str(media)),
+        id=make_id(rng))
+    return _document(release)
+
+
+def recording_search_xml(rng, recordings=25, releases=10):
+    """A recording search response, ``releases`` releases per recording."""
+    albums = make_albums(rng, releases, 1)
+    title = make_title(rng)
+    items = []
+    for i in xrange(recordings):
+        artist = albums[i % len(albums)][0]
+        release_list = u"".join([
+            _short_release(rng, album, title, rng.randint(8, 20))
+            for a, album, t in albums])
+        items.append(_element(
+            "recording",
+            _text("title", _misspell(rng, title)) +
+            _text("length", unicode(rng.randint(120, 420) * 1000)) +
+            _artist_credit(rng, artist) +
+            _element("release-list", release_list, count=str(releases)),
+            id=make_id(rng), **{"ext:score": str(100 - i)}))
+    return _document(_element("recording-list", u"".join(items),
+                              count=str(recordings), offset="0"))
+
+
+def acoustid_xml(rng, recordings=5, releases=5):
+    """An AcoustID lookup response with ``meta=recordings releasegroups
+    releases tracks``."""
+    albums = make_albums(rng, releases, 1)
+    items = []
+    for i in xrange(recordings):
+        artist = albums[i % len(albums)][0]
+        groups = []
+        for a, album, t in albums:
+            track_count = rng.randint(8, 20)
+            track = _element("track",
+                             _text("position", unicode(rng.randint(1, track_count))))
+            medium = _element("medium",
+                              _text("position", u"1") +
+                              _text("track_count", unicode(track_count)) +
+                              _text("format", rng.choice(FORMATS)) +
+                              _element("tracks", track))
+            release = _element("release",
+                               _text("id", make_id(rng)) +
+                               _text("title", album) +
+                               _text("country", rng.choice(COUNTRIES)) +
+                               _text("medium_count", u"1") +
+                               _element("mediums", medium))
+            groups.append(_element("releasegroup",
+                                   _text("id", make_id(rng)) +
+                                   _text("title", album) +
+                                   _text("type", rng.choice(TYPES)) +
+                                   _element("releases", release)))
+        artists = _element("artists", _element(
+            "artist", _text("id", make_id(rng)) + _text("name", artist)))
+        items.append(_element("recording",
+                              _text("id", make_id(rng)) +
+                              _text("title", make_title(rng)) +
+                              _text("duration", unicode(rng.randint(120, 420))) +
+                              artists +
+                              _element("releasegroups", u"".join(groups))))
+    result = _element("result",
+                      _text("id", make_id(rng)) +
+                      _text("score", u"0.98") +
+                      _element("recordings", u"".join(items)))
+    response = _element("response",
+                        _text("status", u"ok") +
+                        _element("results", result))
+    return (u'<?xml version="1.0" encoding="UTF-8"?>%s' % response).encode("utf-8")
@@ -0,0 +1,65 @@
+"""Replays a saved recording search (25 recordings, 40 releases each)
+through the release scoring done by ``File._lookup_finished``."""
+
+from PyQt4 import QtCore
+from picard.config import SettingsSnapshot
+from picard.file import File
+from picard.metadata import ReleaseScoringProfile
+from test.benchmark import load_xml, measure, report
+
+
+class FakeConfig(object):
+
+    def __init__(self):
+        self.setting = {
+            'enabled_plugins': '',
+            'preferred_release_countries': u'GB  US  XE',
+            'preferred_release_formats': u'CD  Digital Media',
+            'release_type_scores': u'Album 1.0 Single 0.2 EP 0.4 Compilation 0.5 Live 0.1 Other 0.3',
+            'standardize_artists': False,
+            'translate_artist_names': False,
+        }
+        self._snapshot = SettingsSnapshot(self.setting, 1)
+
+    def snapshot(self):
+        return self._snapshot
+
+
+def main():
+    QtCore.QObject.config = FakeConfig()
+    document = load_xml("recording_search.xml.gz")
+    tracks = document.metadata[0].recording_list[0].recording
+    file = File("/tmp/Come Together.mp3")
+    file.metadata['title'] = u'Come Together'
+    file.metadata['artist'] = u'The Beatles'
+    file.metadata['album'] = u'Abbey Road'
+    file.metadata['totaltracks'] = u'17'
+    file.metadata.length = 259000
+
+    def uncached():
+        # What every release comparison used to do: parse the preferences
+        get = ReleaseScoringProfile.__dict__['get']
+        ReleaseScoringProfile.get = classmethod(
+            lambda cls, config: cls(*get.__get__(None, cls)(config).key))
+        try:
+            for track in tracks:
+                file._compare_to_track(track)
+        finally:
+            ReleaseScoringProfile.get = get
+
+    def per_track():
+        for track in tracks:
+            file._compare_to_track(track)
+
+    def per_lookup():
+        profile = ReleaseScoringProfile.get(file.config).for_lookup()
+        for track in tracks:
+            file._compare_to_track(track, profile)
+
+    report("release scoring, profile per release", measure(uncached))
+    report("release scoring, profile per track", measure(per_track))
+    report("release scoring, profile per lookup", measure(per_lookup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Evaluates a typical file naming script with the interpreter, with the
+compiled script and with the compiled script while profiling.
+
+Every run uses a new title, so results cached from earlier runs are not
+reused."""
+
+import itertools
+from PyQt4 import QtCore
+from picard.config import SettingsSnapshot
+from picard.metadata import Metadata
+from picard.script import ScriptParser
+from test.benchmark import measure, report
+
+
+NAMING_SCRIPT = (
+    "$if2(%albumartist%,%artist%)/%album%/"
+    "$if($gt(%totaldiscs%,1),$num(%discnumber%,2)-,)"
+    r"$num(%tracknumber%,2) $rreplace(%title%,\\s+\\\(.*\\\),) "
+    "$left($upper(%artist%),10)")
+
+
+class FakeConfig(object):
+
+    def __init__(self):
+        self.setting = {
+            'enabled_plugins': '',
+        }
+        self._snapshot = SettingsSnapshot(self.setting, 1)
+
+    def snapshot(self):
+        return self._snapshot
+
+
+def main():
+    QtCore.QObject.config = FakeConfig()
+    metadata = Metadata()
+    metadata['albumartist'] = u'The Beatles'
+    metadata['artist'] = u'The Beatles'
+    metadata['album'] = u'Abbey Road'
+    metadata['title'] = u'Come Together (Remastered)'
+    metadata['tracknumber'] = u'1'
+    metadata['discnumber'] = u'1'
+    metadata['totaldiscs'] = u'1'
+
+    titles = (u'Come Together (Remastered %d)' % i for i in itertools.count())
+    for interpret, profile, name in ((True, False, "interpreted"),
+                                     (False, False, "compiled"),
+                                     (False, True, "compiled, profiled")):
+        if profile:
+            ScriptParser.start_profiling()
+        parser = ScriptParser(interpret=interpret)
+        def run():
+            for i in xrange(100):
+                metadata['title'] = titles.next()
+                parser.eval(NAMING_SCRIPT, metadata)
+        report("naming script x100, %s" % name, measure(run))
+        ScriptParser.stop_profiling()
+
+
+if __name__ == "__main__":
+    main()
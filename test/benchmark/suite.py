@@ -0,0 +1,311 @@
+"""Times the hot paths on a synthetic corpus at several scales.
+
+The results are saved as JSON, so that two runs can be compared:
+
+    python -m test.benchmark.suite --output before.json
+    python -m test.benchmark.suite --output after.json --compare before.json
+
+The scale is the number of files, metadata objects, string pairs or
+recordings the timed function goes through.
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from PyQt4 import QtCore, QtXml
+import picard.formats
+from picard import log, similarity
+from picard.acoustid import AcoustIDClient
+from picard.cluster import Cluster
+from picard.config import SettingsSnapshot
+from picard.file import File
+from picard.formats.padding import save_stats
+from picard.metadata import Metadata, ReleaseScoringProfile
+from picard.script import ScriptParser
+from picard.util.metrics import registry
+from picard.webservice import XmlHandler
+from test.benchmark import measure, parse_xml
+from test.benchmark import corpus
+from test.benchmark.script import NAMING_SCRIPT
+
+
+SCALES = (10, 100, 1000)
+
+# Calls per measurement are chosen so that every measurement goes through
+# about this many items
+ITEMS_PER_MEASUREMENT = 1000
+
+
+class FakeTagger(object):
+
+    def __init__(self):
+        self.log = log.Log()
+        QtCore.QObject.log = self.log
+
+    def emit(self, *args):
+        pass
+
+
+class FakeConfig(object):
+
+    def __init__(self):
+        self.setting = {
+            'enabled_plugins': '',
+            'clear_existing_tags': False,
+            'remove_images_from_tags': False,
+            'write_id3v1': True,
+            'id3v2_encoding': 'utf-8',
+            'save_images_to_tags': True,
+            'write_id3v23': False,
+            'remove_ape_from_mp3': False,
+            'remove_id3_from_flac': False,
+            'rating_steps': 6,
+            'rating_user_email': 'users@musicbrainz.org',
+            'tag_padding_percent': 10,
+            'preferred_release_countries': u'GB  US  XE',
+            'preferred_release_formats': u'CD  Digital Media',
+            'release_type_scores': u'Album 1.0 Single 0.2 EP 0.4 Compilation 0.5 Live 0.1 Other 0.3',
+            'standardize_artists': False,
+            'translate_artist_names': False,
+        }
+        self._snapshot = SettingsSnapshot(self.setting, 1)
+
+    def snapshot(self):
+        return self._snapshot
+
+
+class _File(object):
+    """What ``Cluster.cluster`` needs from a file."""
+
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+
+def parse_with_handler(data):
+    """Parse a response like ``XmlWebService._process_reply`` does."""
+    handler = XmlHandler()
+    handler.init()
+    reader = QtXml.QXmlSimpleReader()
+    reader.setContentHandler(handler)
+    source = QtXml.QXmlInputSource()
+    source.setData(QtCore.QByteArray(data))
+    reader.parse(source)
+    return handler.document
+
+
+def bench_similarity2(rng, scale):
+    metadata = corpus.make_metadata(rng, scale)
+    pairs = [(m["title"], rng.choice(metadata)["title"]) for m in metadata]
+    def run():
+        for a, b in pairs:
+            similarity.similarity2(a, b)
+    return run
+
+
+def bench_cluster(rng, scale):
+    files = [_File(m) for m in corpus.make_metadata(rng, scale)]
+    def run():
+        for album, artist, clustered in Cluster.cluster(files, 0.5):
+            list(clustered)
+    return run
+
+
+def bench_metadata_copy(rng, scale):
+    metadata = corpus.make_metadata(rng, scale)
+    for m in metadata:
+        m.add_image("image/jpeg", "\xff\xd8" + "\0" * 1024)
+    copy = Metadata()
+    def run():
+        for m in metadata:
+            copy.copy(m)
+    return run
+
+
+def bench_script(rng, scale):
+    metadata = corpus.make_metadata(rng, scale)
+    parser = ScriptParser()
+    def run():
+        for m in metadata:
+            parser.eval(NAMING_SCRIPT, m)
+    return run
+
+
+def _xml_benchmark(make_xml):
+    def bench(rng, scale):
+        data = make_xml(rng, scale)
+        return lambda: parse_with_handler(data)
+    return bench
+
+
+def bench_release_scoring(rng, scale):
+    document = parse_xml(corpus.recording_search_xml(rng, 25, scale / 25 or 1))
+    tracks = document.metadata[0].recording_list[0].recording
+    file = File(u"/tmp/benchmark.mp3")
+    file.metadata.copy(corpus.make_metadata(rng, 1)[0])
+    def run():
+        profile = ReleaseScoringProfile.get(file.config).for_lookup()
+        for track in tracks:
+            file._compare_to_track(track, profile)
+    return run
+
+
+def bench_acoustid(rng, scale):
+    document = parse_xml(corpus.acoustid_xml(rng, 5, scale / 5 or 1))
+    client = AcoustIDClient()
+    file = File(u"/tmp/benchmark.mp3")
+    def done(doc, http, error):
+        pass
+    return lambda: client._on_lookup_finished(done, file, document, None, None)
+
+
+BENCHMARKS = [
+    ("similarity2", bench_similarity2),
+    ("Cluster.cluster", bench_cluster),
+    ("Metadata.copy", bench_metadata_copy),
+    ("ScriptParser.eval", bench_script),
+    # Scale is the number of tracks of a single medium
+    ("XmlHandler, release", _xml_benchmark(
+        lambda rng, scale: corpus.release_xml(rng, scale))),
+    # Scale is the number of releases over 25 recordings
+    ("XmlHandler, recording search", _xml_benchmark(
+        lambda rng, scale: corpus.recording_search_xml(rng, 25, scale / 25 or 1))),
+    ("XmlHandler, AcoustID", _xml_benchmark(
+        lambda rng, scale: corpus.acoustid_xml(rng, 5, scale / 5 or 1))),
+    ("release scoring", bench_release_scoring),
+    ("AcoustID to recordings", bench_acoustid),
+]
+
+
+def _format_benchmarks(files, metadata, config):
+    def load():
+        for file in files:
+            file._load(file.filename)
+    def save():
+        for file, m in zip(files, metadata):
+            file._save(file.filename, m, config.setting)
+    return load, save
+
+
+def _selected(name, names):
+    return not names or [n for n in names if n in name]
+
+
+def run_formats(rng, scale, directory, config, names=None):
+    """Time ``_load`` and ``_save`` of every format that can be generated."""
+    results = []
+    metadata = corpus.make_metadata(rng, scale)
+    for ext, name, supported in corpus.corpus_formats():
+        if not supported or not (_selected("%s._load" % name, names) or
+                                 _selected("%s._save" % name, names)):
+            continue
+        path = os.path.join(directory, "%s-%d" % (ext, scale))
+        os.mkdir(path)
+        filenames = corpus.make_files(path, ext, metadata, config)
+        files = [picard.formats.open(f) for f in filenames]
+        load, save = _format_benchmarks(files, metadata, config)
+        results.append(("%s._load" % name, load))
+        results.append(("%s._save" % name, save))
+    return results
+
+
+def run(scales=SCALES, seed=0, repeat=3, names=None):
+    """Run the benchmarks and return the results as a JSON compatible
+    dictionary."""
+    QtCore.QObject.tagger = FakeTagger()
+    QtCore.QObject.config = config = FakeConfig()
+    registry.clear()
+    results = []
+    def add(name, scale, func):
+        if not _selected(name, names):
+            return
+        number = max(1, ITEMS_PER_MEASUREMENT / scale)
+        seconds = measure(func, number, repeat)
+        results.append({"name": name, "scale": scale, "seconds": seconds})
+        print "%-50s %6d %10.3f ms" % (name, scale, seconds * 1000)
+    directory = tempfile.mkdtemp()
+    try:
+        for scale in scales:
+            for name, bench in BENCHMARKS:
+                add(name, scale, bench(random.Random(seed), scale))
+            for name, func in run_formats(random.Random(seed), scale,
+                                          directory, config, names):
+                add(name, scale, func)
+    finally:
+        shutil.rmtree(directory)
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "seed": seed,
+        "scales": list(scales),
+        "results": results,
+        "skipped_formats": [name for ext, name, supported
+                            in corpus.corpus_formats() if not supported],
+        "similarity_cache": similarity.cache_stats(),
+        "padding": save_stats(),
+        "metrics": registry.dump(),
+    }
+
+
+def compare(old, new):
+    """Return ``(name, scale, old seconds, new seconds)`` for every result
+    of ``new`` that is also in ``old``."""
+    previous = {}
+    for result in old["results"]:
+        previous[(result["name"], result["scale"])] = result["seconds"]
+    changes = []
+    for result in new["results"]:
+        key = (result["name"], result["scale"])
+        if key in previous:
+            changes.append(key + (previous[key], result["seconds"]))
+    return changes
+
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-o", "--output", metavar="FILE",
+                      help="save the results as JSON to FILE")
+    parser.add_option("-c", "--compare", metavar="FILE",
+                      help="compare with the results saved in FILE")
+    parser.add_option("-s", "--scales", default=",".join(map(str, SCALES)),
+                      help="comma separated scales [default: %default]")
+    parser.add_option("-r", "--repeat", type="int", default=3,
+                      help="keep the best of N runs [default: %default]")
+    parser.add_option("--seed", type="int", default=0,
+                      help="seed of the corpus generator [default: %default]")
+    parser.add_option("-k", "--filter", action="append", dest="names",
+                      help="only run benchmarks whose name contains NAME")
+    options, args = parser.parse_args()
+    scales = [int(s) for s in options.scales.split(",")]
+    results = run(scales, options.seed, options.repeat, options.names)
+    if options.output:
+        f = open(options.output, "w")
+        try:
+            json.dump(results, f, indent=2, sort_keys=True)
+        finally:
+            f.close()
+    if options.compare:
+        f = open(options.compare)
+        try:
+            old = json.load(f)
+        finally:
+            f.close()
+        print
+        for name, scale, before, after in compare(old, results):
+            print "%-50s %6d %10.3f ms %10.3f ms %+7.1f%%" % (
+                name, scale, before * 1000, after * 1000,
+                (after - before) * 100 / before if before else 0.0)
+
+
+if __name__ == "__main__":
+    main()
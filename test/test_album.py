@@ -0,0 +1,185 @@
+import __builtin__
+import unittest
+from PyQt4 import QtCore
+from picard.album import Album, NatAlbum
+from picard.file import File
+from picard.track import Track
+
+__builtin__.__dict__.setdefault('_', lambda a: a)
+
+
+class FakeConfig(object):
+    def __init__(self):
+        self.setting = {
+            'preserved_tags': '',
+            'track_matching_threshold': 0.4,
+            'nat_name': u'[non-album tracks]',
+            }
+
+    def snapshot(self):
+        return self.setting
+
+
+class FakeItem(object):
+    def __init__(self):
+        self.updates = []
+
+    def update(self, update_tracks=True):
+        self.updates.append(update_tracks)
+
+
+class FakeProgress(object):
+    def finish(self, obj):
+        pass
+
+
+class FakeTagger(object):
+    def __init__(self):
+        self.identify_progress = FakeProgress()
+
+    def emit(self, *args):
+        pass
+
+
+class FakeLog(object):
+    def _message(self, message, *args):
+        pass
+
+    debug = info = warning = error = _message
+
+
+class AlbumCountsTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        QtCore.QObject.tagger = FakeTagger()
+        QtCore.QObject.log = FakeLog()
+        self.album = Album("album")
+        self.album.metadata["album"] = u"Album"
+        self.tracks = [Track("track%d" % i, self.album) for i in range(2)]
+        self.album.tracks = self.tracks
+
+    def create_file(self, name):
+        file = File(u"/music/%s.mp3" % name)
+        file.state = File.NORMAL
+        return file
+
+    def link(self, track, file):
+        file.parent = track
+        track.add_file(file)
+
+    def assertCounts(self, linked, unsaved):
+        album = self.album
+        self.assertEqual(album.get_num_matched_tracks(), linked)
+        self.assertEqual(album.get_num_unsaved_files(), unsaved)
+        complete = all(track.num_linked_files == 1 for track in album.tracks)
+        self.assertEqual(album.is_complete(), complete)
+
+    def test_linking(self):
+        file1 = self.create_file("1")
+        file1.state = File.PENDING
+        self.link(self.tracks[0], file1)
+        self.assertCounts(1, 1)
+        file1.state = File.NORMAL
+        self.assertCounts(1, 0)
+        self.link(self.tracks[1], self.create_file("2"))
+        self.assertCounts(2, 0)
+        self.assertEqual(self.album.column("title"), u"Album\u200E (2/2)")
+        file3 = self.create_file("3")
+        self.link(self.tracks[1], file3)
+        self.link(self.tracks[1], file3)
+        self.assertCounts(2, 0)
+        self.tracks[1].remove_file(file3)
+        self.assertCounts(2, 0)
+        self.tracks[0].remove_file(file1)
+        self.assertCounts(1, 0)
+
+    def test_unsaved(self):
+        file1 = self.create_file("1")
+        self.link(self.tracks[0], file1)
+        file1.metadata["title"] = u"Changed"
+        file1.update(signal=False)
+        self.assertCounts(1, 1)
+        self.assertEqual(self.album.column("title"), u"Album\u200E (1/2; 1*)")
+        self.tracks[0].remove_file(file1)
+        self.assertCounts(0, 0)
+
+    def test_collapsed_album_saved(self):
+        # The album of a saved file is refreshed when it is collapsed too
+        self.album.item = FakeItem()
+        file1 = self.create_file("1")
+        self.link(self.tracks[0], file1)
+        file1.metadata["title"] = u"Changed"
+        file1.update(signal=False)
+        self.assertEqual(self.album.column("title"), u"Album\u200E (1/2; 1*)")
+        file1.state = File.PENDING
+        self.album.item.updates = []
+        file1._saving_finished(lambda result=None, error=None: None,
+                               result=file1.filename)
+        self.assertCounts(1, 0)
+        self.assertEqual(self.album.column("title"), u"Album\u200E (1/2)")
+        self.failUnless(False in self.album.item.updates)
+
+    def test_collapsed_track_update(self):
+        # Tracks of a collapsed album have no items, the album row is
+        # refreshed instead
+        self.album.item = FakeItem()
+        self.tracks[0].update()
+        self.assertEqual(self.album.item.updates, [False])
+
+
+class AlbumMatchFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.album = Album("album")
+        titles = [u"Come Together", u"Something", u"Let It Be", u"Hey Jude"]
+        self.album.tracks = []
+        for i, title in enumerate(titles):
+            track = Track("track%d" % i, self.album)
+            track.metadata["title"] = title
+            track.metadata["album"] = u"Past Masters"
+            track.metadata["artist"] = u"The Beatles"
+            track.metadata["tracknumber"] = unicode(i + 1)
+            track.metadata["totaltracks"] = unicode(len(titles))
+            self.album.tracks.append(track)
+        self.album._build_match_index()
+
+    def match(self, title, tracknumber):
+        file = File(u"/music/%s.mp3" % title)
+        file.orig_metadata["title"] = title
+        file.orig_metadata["album"] = u"Past Masters"
+        file.orig_metadata["artist"] = u"The Beatles"
+        file.orig_metadata["tracknumber"] = tracknumber
+        file.orig_metadata["totaltracks"] = u"4"
+        moved = []
+        file.move = moved.append
+        self.album.match_files([file])
+        return moved[0]
+
+    def test_shifted_track_number(self):
+        track = self.match(u"Hey Jude (Remastered 2009)", u"3")
+        self.assertEqual(track.metadata["title"], u"Hey Jude")
+
+    def test_same_position(self):
+        track = self.match(u"Let It Be (Remastered 2009)", u"3")
+        self.assertEqual(track.metadata["title"], u"Let It Be")
+        track = self.match(u"Hey Jude", u"1")
+        self.assertEqual(track.metadata["title"], u"Hey Jude")
+
+
+class NatAlbumTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.nats = NatAlbum()
+
+    def test_match_index(self):
+        track = Track("track", self.nats)
+        track.metadata["musicbrainz_trackid"] = u"track"
+        self.nats.add_track(track)
+        self.assertEqual(self.nats._trackid_index, {u"track": [track]})
+        # Updates don't change the tracks, the index is kept
+        index = self.nats._trackid_index
+        self.nats.update()
+        self.failUnless(self.nats._trackid_index is index)
@@ -0,0 +1,411 @@
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from PyQt4 import QtCore
+import picard.formats
+from picard.batch import BatchTagger, Report, StatusLog, find_files
+from picard.cluster import ClusterList, UnmatchedFiles
+from picard.config import SettingsSnapshot
+from picard.metadata import Metadata
+from picard.util.progress import Progress
+from test.benchmark import parse_xml
+
+
+class FindFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "b", "c"))
+        for name in ("b/c/2.mp3", "b/1.flac", "a.ogg"):
+            open(os.path.join(self.root, name), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_walk(self):
+        single = os.path.join(self.root, "a.ogg")
+        files = find_files([os.path.join(self.root, "b"), single])
+        self.assertEqual(files, [
+            os.path.join(self.root, "b", "1.flac"),
+            os.path.join(self.root, "b", "c", "2.mp3"),
+            single,
+        ])
+
+
+class ReportTest(unittest.TestCase):
+
+    def test_json_lines(self):
+        report = Report(StringIO())
+        report.write("load", file=u"/music/a.mp3")
+        report.write("load", file=u"/music/b.mp3")
+        report.write("save_error", file=u"/music/b.mp3", error="Disk full")
+        lines = report.stream.getvalue().splitlines()
+        self.assertEqual(lines[0], '{"event": "load", "file": "/music/a.mp3"}')
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(report.counts, {"load": 2, "save_error": 1})
+
+
+ARTIST_ID = "b10bbbfc-cf9e-42e0-be17-e2c3e1d2600d"
+RELEASE_ID = "93f0f40e-0b69-4ee7-bc08-d53c1b1e1bbc"
+RECORDING_IDS = ["3da29e02-a88e-4b83-a7f8-3fe16da37e1d",
+                 "d6f1d8bd-0a1f-4d5c-9e2b-0b49a4f1d2a2"]
+TITLES = [u"Come Together", u"Something"]
+
+SEARCH_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#" xmlns:ext="http://musicbrainz.org/ns/ext#-2.0">
+<release-list count="%(count)d" offset="0">%(releases)s</release-list>
+</metadata>"""
+
+SEARCH_RELEASE = """<release id="%s" ext:score="100">
+<title>Abbey Road</title><status>Official</status>
+<artist-credit><name-credit><artist id="%s"><name>The Beatles</name>
+<sort-name>Beatles, The</sort-name></artist></name-credit></artist-credit>
+<release-group type="Album" id="9162580e-5df4-32de-80cc-f45a8d8a9b1d"/>
+<country>GB</country>
+<medium-list count="1"><track-count>2</track-count>
+<medium><format>CD</format><track-list count="2"/></medium></medium-list>
+</release>""" % (RELEASE_ID, ARTIST_ID)
+
+RECORDING_SEARCH_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#" xmlns:ext="http://musicbrainz.org/ns/ext#-2.0">
+<recording-list count="0" offset="0"/>
+</metadata>"""
+
+RELEASE_TRACK = """<track><position>%(position)d</position><number>%(position)d</number>
+<length>259000</length><recording id="%(id)s"><title>%(title)s</title>
+<length>259000</length>
+<artist-credit><name-credit><artist id="%(artist)s"><name>The Beatles</name>
+<sort-name>Beatles, The</sort-name></artist></name-credit></artist-credit>
+</recording></track>"""
+
+RELEASE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#">
+<release id="%s"><title>Abbey Road</title><status>Official</status>
+<date>1969-09-26</date><country>GB</country>
+<artist-credit><name-credit><artist id="%s"><name>The Beatles</name>
+<sort-name>Beatles, The</sort-name></artist></name-credit></artist-credit>
+<release-group type="Album" id="9162580e-5df4-32de-80cc-f45a8d8a9b1d">
+<title>Abbey Road</title></release-group>
+<medium-list count="1"><medium><position>1</position><format>CD</format>
+<track-list count="2" offset="0">%s</track-list></medium></medium-list>
+</release></metadata>""" % (RELEASE_ID, ARTIST_ID, "".join([
+    RELEASE_TRACK % {"position": i + 1, "id": id, "title": title,
+                     "artist": ARTIST_ID}
+    for i, (id, title) in enumerate(zip(RECORDING_IDS, TITLES))]))
+
+
+class FakeConfig(object):
+    def __init__(self):
+        self.setting = {
+            'enabled_plugins': '',
+            'ignore_file_mbids': False,
+            'analyze_new_files': False,
+            'cluster_lookup_threshold': 0.7,
+            'file_lookup_threshold': 0.7,
+            'track_matching_threshold': 0.4,
+            'preserved_tags': '',
+            'rename_files': False,
+            'move_files': False,
+            'delete_empty_dirs': False,
+            'dont_write_tags': False,
+            'clear_existing_tags': False,
+            'remove_images_from_tags': False,
+            'save_images_to_tags': True,
+            'save_images_to_files': False,
+            'write_id3v1': True,
+            'write_id3v23': False,
+            'id3v2_encoding': 'utf-8',
+            'remove_ape_from_mp3': False,
+            'remove_id3_from_flac': False,
+            'tpe2_albumartist': False,
+            'tag_padding_percent': 10,
+            'rating_steps': 6,
+            'rating_user_email': 'users@musicbrainz.org',
+            'release_ars': False,
+            'track_ars': False,
+            'folksonomy_tags': False,
+            'only_my_tags': False,
+            'enable_ratings': False,
+            'enable_tagger_script': False,
+            'tagger_script': '',
+            'convert_punctuation': False,
+            'standardize_artists': False,
+            'translate_artist_names': False,
+            'artist_locale': 'en',
+            'va_name': u'Various Artists',
+            'nat_name': u'[non-album tracks]',
+            'preferred_release_countries': u'',
+            'preferred_release_formats': u'',
+            'release_type_scores': u'Album 1.0 Other 0.5',
+            }
+        self._snapshot = SettingsSnapshot(self.setting, 1)
+
+    def snapshot(self):
+        return self._snapshot
+
+
+class FakeSignal(object):
+    def emit(self, *args):
+        pass
+
+    def connect(self, slot):
+        pass
+
+
+class FakeTimer(object):
+    def __init__(self):
+        self.active = False
+
+    def start(self, interval):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+
+class FakeQueue(object):
+    """Runs the jobs when the test says so, like a worker thread would."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def put(self, job, devices=None):
+        self.jobs.append(job)
+
+    def run(self):
+        func, callback, priority = self.jobs.pop(0)
+        try:
+            result = func()
+        except Exception, e:
+            callback(error=e)
+        else:
+            callback(result=result)
+
+
+class FakeXmlWebService(object):
+    """Answers the searches and lookups with canned responses."""
+
+    def __init__(self):
+        self.requests = []
+
+    def _request(self, handler, data):
+        task = (handler, data)
+        self.requests.append(task)
+        return task
+
+    def find_releases(self, handler, **kwargs):
+        if kwargs["release"] == u"Abbey Road":
+            return self._request(handler, SEARCH_XML % {
+                "count": 1, "releases": SEARCH_RELEASE})
+        return self._request(handler, SEARCH_XML % {
+            "count": 0, "releases": ""})
+
+    def find_tracks(self, handler, **kwargs):
+        return self._request(handler, RECORDING_SEARCH_XML)
+
+    def get_release_by_id(self, releaseid, handler, **kwargs):
+        return self._request(handler, RELEASE_XML)
+
+    def remove_task(self, task):
+        if task in self.requests:
+            self.requests.remove(task)
+
+    def num_pending_tasks(self):
+        return len(self.requests)
+
+    def respond(self):
+        handler, data = self.requests.pop(0)
+        handler(parse_xml(data), None, None)
+
+
+class FakeLog(object):
+    def _message(self, message, *args):
+        pass
+
+    debug = info = warning = error = _message
+
+
+class FakeManager(object):
+    def _call(self, *args):
+        pass
+
+    add = update = remove = _call
+
+    def stop_analyze(self, file):
+        pass
+
+
+class TestBatchTagger(BatchTagger):
+    """A batch tagger with fake queues and web service, set up without the
+    threads, plugins and settings ``setup`` would start or load."""
+
+    file_state_changed = FakeSignal()
+    cluster_added = FakeSignal()
+    cluster_removed = FakeSignal()
+    album_added = FakeSignal()
+    album_removed = FakeSignal()
+
+    def __init__(self, report):
+        self.tagger = self
+        self.config = FakeConfig()
+        self.log = FakeLog()
+        QtCore.QObject.tagger = self
+        QtCore.QObject.config = self.config
+        QtCore.QObject.log = self.log
+        self.window = StatusLog(self.log)
+        self.report = Report(report)
+        self.step = self.SCANNING
+        self._idle_checks = 0
+        self._idle_timer = FakeTimer()
+        self.load_queue = FakeQueue()
+        self.save_queue = FakeQueue()
+        self.other_queue = FakeQueue()
+        self.xmlws = FakeXmlWebService()
+        self.puidmanager = FakeManager()
+        self.acoustidmanager = FakeManager()
+        self._ofa = FakeManager()
+        self._acoustid = FakeManager()
+        self.files = {}
+        self.clusters = ClusterList()
+        self.albums = {}
+        self.mbid_redirects = {}
+        self.unmatched_files = UnmatchedFiles()
+        self.nats = None
+        self.identify_progress = Progress(u"%(done)s / %(total)s")
+        self.exit_code = None
+
+    def _exit(self, code=0):
+        self.exit_code = code
+
+
+class ReportStream(StringIO):
+
+    def close(self):
+        self.lines = self.getvalue().splitlines()
+        StringIO.close(self)
+
+
+class BatchTaggerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.stream = ReportStream()
+        self.tagger = TestBatchTagger(self.stream)
+        self._exit = QtCore.QCoreApplication.exit
+        QtCore.QCoreApplication.exit = staticmethod(self.tagger._exit)
+        self.filenames = []
+        for i, title in enumerate(TITLES):
+            self.add_file(u"%d.mp3" % (i + 1), artist=u"The Beatles",
+                          albumartist=u"The Beatles", album=u"Abbey Road",
+                          title=title, tracknumber=unicode(i + 1))
+        self.add_file(u"3.mp3", artist=u"Nobody", albumartist=u"Nobody",
+                      album=u"Unreleased", title=u"Demo", tracknumber=u"1")
+
+    def tearDown(self):
+        QtCore.QCoreApplication.exit = self._exit
+        shutil.rmtree(self.root)
+
+    def add_file(self, name, **tags):
+        filename = os.path.join(self.root, name)
+        shutil.copy(os.path.join('test', 'data', 'test.mp3'), filename)
+        metadata = Metadata()
+        for key, value in tags.items():
+            metadata[key] = value
+        file = picard.formats.open(filename)
+        file._save(filename, metadata, self.tagger.config.setting)
+        self.filenames.append(filename)
+
+    def events(self, event):
+        return [json.loads(line) for line in self.stream.lines
+                if json.loads(line)["event"] == event]
+
+    def run_until_idle(self):
+        """Run the queued jobs and requests one at a time, checking for
+        idleness after each of them like the idle timer would."""
+        tagger = self.tagger
+        steps = [tagger.step]
+        for i in xrange(100):
+            if tagger.exit_code is not None:
+                return steps
+            if tagger.load_queue.jobs:
+                tagger.load_queue.run()
+            elif tagger.save_queue.jobs:
+                tagger.save_queue.run()
+            elif tagger.xmlws.requests:
+                self.failUnless(tagger._busy())
+                tagger.xmlws.respond()
+            tagger._check_idle()
+            if tagger.step != steps[-1]:
+                steps.append(tagger.step)
+        self.fail("The batch did not finish")
+
+    def test_batch(self):
+        tagger = self.tagger
+        tagger._files_found(result=self.filenames)
+        self.assertEqual(tagger.step, BatchTagger.LOADING)
+        self.failUnless(tagger._idle_timer.active)
+        # Files are pending until they are loaded
+        self.failUnless(tagger._busy())
+        steps = self.run_until_idle()
+        self.assertEqual(steps, [BatchTagger.LOADING,
+                                 BatchTagger.CLUSTER_LOOKUP,
+                                 BatchTagger.FILE_LOOKUP,
+                                 BatchTagger.SAVING])
+        self.assertEqual(tagger.exit_code, 0)
+        self.failIf(tagger._idle_timer.active)
+        self.failUnless(self.stream.closed)
+
+        self.assertEqual(len(self.events("load")), 3)
+        self.assertEqual(sorted([e["file"] for e in self.events("cluster")]),
+                         self.filenames[:2])
+        self.assertEqual(sorted([e["file"] for e in self.events("album")]),
+                         self.filenames[:2])
+        matches = self.events("match")
+        self.assertEqual([(e["file"], e["release"], e["recording"])
+                          for e in matches],
+                         [(self.filenames[0], RELEASE_ID, RECORDING_IDS[0]),
+                          (self.filenames[1], RELEASE_ID, RECORDING_IDS[1])])
+        self.assertEqual([e["file"] for e in self.events("unmatched")],
+                         [self.filenames[2]])
+        self.assertEqual(sorted([e["file"] for e in self.events("save")]),
+                         self.filenames[:2])
+        summary = self.events("summary")[0]
+        self.assertEqual(summary["counts"]["save"], 2)
+
+        saved = picard.formats.open(self.filenames[0])
+        metadata = saved._load(self.filenames[0])
+        self.assertEqual(metadata["musicbrainz_albumid"], RELEASE_ID)
+        self.assertEqual(metadata["musicbrainz_trackid"], RECORDING_IDS[0])
+
+    def test_busy_until_callbacks_finish(self):
+        tagger = self.tagger
+        tagger._files_found(result=self.filenames[:2])
+        tagger.load_queue.run()
+        tagger._check_idle()
+        tagger._check_idle()
+        self.assertEqual(tagger.step, BatchTagger.LOADING)
+        tagger.load_queue.run()
+        tagger._check_idle()
+        self.assertEqual(tagger.step, BatchTagger.LOADING)
+        tagger._check_idle()
+        self.assertEqual(tagger.step, BatchTagger.CLUSTER_LOOKUP)
+        self.failUnless(tagger._busy())
+        # The finished search starts the release lookup, so the step is not
+        # over before the album has been loaded
+        tagger.xmlws.respond()
+        self.failUnless(tagger._busy())
+        tagger._check_idle()
+        tagger.xmlws.respond()
+        self.failIf(tagger._busy())
+        tagger._check_idle()
+        self.assertEqual(tagger.step, BatchTagger.CLUSTER_LOOKUP)
+        tagger._check_idle()
+        self.assertEqual(tagger.step, BatchTagger.FILE_LOOKUP)
@@ -0,0 +1,73 @@
+import random
+import shutil
+import tempfile
+import unittest
+from PyQt4 import QtCore
+import picard.formats
+from picard.acoustid import AcoustIDClient
+from picard.file import File
+from test.benchmark import corpus, parse_xml
+from test.benchmark.suite import FakeConfig, FakeTagger, compare
+
+
+class CorpusTest(unittest.TestCase):
+
+    def test_metadata(self):
+        metadata = corpus.make_metadata(random.Random(1), 24, tracks=12)
+        self.assertEqual(len(metadata), 24)
+        albums = set([m["albumartist"] for m in metadata])
+        self.assertEqual(len(albums), 2)
+        again = corpus.make_metadata(random.Random(1), 24, tracks=12)
+        self.assertEqual([m["title"] for m in metadata],
+                         [m["title"] for m in again])
+
+    def test_release(self):
+        document = parse_xml(corpus.release_xml(random.Random(1), 5, media=2))
+        release = document.metadata[0].release[0]
+        self.assertEqual(len(release.medium_list[0].medium), 2)
+        tracks = release.medium_list[0].medium[0].track_list[0].track
+        self.assertEqual(len(tracks), 5)
+        self.assertTrue(tracks[0].recording[0].title[0].text)
+
+    def test_recording_search(self):
+        document = parse_xml(corpus.recording_search_xml(random.Random(1), 3, 4))
+        recordings = document.metadata[0].recording_list[0].recording
+        self.assertEqual(len(recordings), 3)
+        self.assertEqual(len(recordings[0].release_list[0].release), 4)
+        self.assertEqual(recordings[0].score, u"100")
+
+    def test_acoustid(self):
+        QtCore.QObject.config = FakeConfig()
+        document = parse_xml(corpus.acoustid_xml(random.Random(1), 2, 3))
+        result = []
+        def done(doc, http, error):
+            result.append(doc)
+        AcoustIDClient()._on_lookup_finished(
+            done, File(u"/tmp/a.mp3"), document, None, None)
+        recordings = result[0].metadata[0].puid[0].recording_list[0].recording
+        self.assertEqual(len(recordings), 2)
+        self.assertEqual(len(recordings[0].release_list[0].release), 3)
+
+    def test_files(self):
+        QtCore.QObject.tagger = FakeTagger()
+        config = FakeConfig()
+        metadata = corpus.make_metadata(random.Random(1), 1)
+        directory = tempfile.mkdtemp()
+        try:
+            for ext in ("flac", "tta", "ape", "wav"):
+                filename = corpus.make_files(directory, ext, metadata, config)[0]
+                loaded = picard.formats.open(filename)._load(filename)
+                if ext != "wav":
+                    self.assertEqual(loaded["title"], metadata[0]["title"])
+        finally:
+            shutil.rmtree(directory)
+
+
+class CompareTest(unittest.TestCase):
+
+    def test_compare(self):
+        old = {"results": [{"name": "a", "scale": 10, "seconds": 1.0},
+                           {"name": "b", "scale": 10, "seconds": 1.0}]}
+        new = {"results": [{"name": "a", "scale": 10, "seconds": 0.5},
+                           {"name": "a", "scale": 100, "seconds": 2.0}]}
+        self.assertEqual(compare(old, new), [("a", 10, 1.0, 0.5)])
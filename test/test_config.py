@@ -0,0 +1,58 @@
+import unittest
+from picard.config import ConfigSection, Option
+
+
+class FakeSettings(object):
+
+    def __init__(self, values):
+        self.values = values
+
+    def contains(self, key):
+        return key in self.values
+
+    def value(self, key):
+        return self.values[key]
+
+    def setValue(self, key, value):
+        self.values[key] = value
+
+
+def _identity(value):
+    return value
+
+
+class SettingsSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        Option("test_snapshot", "a", 0, _identity)
+        Option("test_snapshot", "b", 2, _identity)
+        self.section = ConfigSection(FakeSettings({"test_snapshot/a": 1}),
+                                     "test_snapshot")
+
+    def tearDown(self):
+        for key in Option.registry.keys():
+            if key[0] == "test_snapshot":
+                del Option.registry[key]
+
+    def test_values(self):
+        snapshot = self.section.snapshot()
+        self.assertEqual(snapshot, {"a": 1, "b": 2})
+        self.assertTrue(self.section.snapshot() is snapshot)
+
+    def test_read_only(self):
+        snapshot = self.section.snapshot()
+        self.assertRaises(TypeError, snapshot.__setitem__, "a", 3)
+        self.assertRaises(TypeError, snapshot.update, {"a": 3})
+        self.assertRaises(TypeError, snapshot.pop, "a")
+
+    def test_refresh_on_change(self):
+        snapshot = self.section.snapshot()
+        self.section["a"] = 3
+        new_snapshot = self.section.snapshot()
+        self.assertFalse(new_snapshot is snapshot)
+        self.assertTrue(new_snapshot.version > snapshot.version)
+
+    def test_refresh_on_new_option(self):
+        snapshot = self.section.snapshot()
+        Option("test_snapshot", "c", u"x", _identity)
+        self.assertEqual(self.section.snapshot(), {"a": 1, "b": 2, "c": u"x"})
@@ -0,0 +1,131 @@
+import __builtin__
+import unittest
+from PyQt4 import QtCore
+from picard.album import Album
+from picard.cluster import Cluster
+from picard.file import File
+from picard.track import Track
+from picard.metadata import Metadata
+from picard.ui.coverartbox import CoverArtBox, _adjacent_objects, _image_key
+
+__builtin__.__dict__.setdefault('_', lambda a: a)
+
+
+class FakeConfig(object):
+    def __init__(self):
+        self.setting = {
+            'preserved_tags': '',
+            }
+
+    def snapshot(self):
+        return self.setting
+
+
+class FakeQueue(object):
+
+    def __init__(self):
+        self.jobs = []
+
+    def put(self, job):
+        self.jobs.append(job)
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for func, callback, priority in jobs:
+            callback(result=func())
+
+
+class FakeTagger(object):
+
+    def __init__(self):
+        self.other_queue = FakeQueue()
+
+
+class AdjacentObjectsTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.album = Album("album")
+        self.tracks = [Track("track%d" % i, self.album) for i in range(5)]
+        self.album.tracks = self.tracks
+
+    def create_file(self, name, parent):
+        file = File(u"/music/%s.mp3" % name)
+        file.parent = parent
+        return file
+
+    def test_tracks(self):
+        tracks = self.tracks
+        self.assertEqual(_adjacent_objects(tracks[2]),
+                         [tracks[3], tracks[4], tracks[0], tracks[1]])
+        self.assertEqual(_adjacent_objects(tracks[0], 1), [tracks[1]])
+        self.assertEqual(_adjacent_objects(self.album), [])
+
+    def test_files(self):
+        cluster = Cluster("cluster")
+        cluster.files = [self.create_file(str(i), cluster) for i in range(3)]
+        self.assertEqual(_adjacent_objects(cluster.files[2], 1), [cluster.files[1]])
+        file1 = self.create_file("a", self.tracks[1])
+        file3 = self.create_file("b", self.tracks[3])
+        self.tracks[1].linked_files.append(file1)
+        self.tracks[3].linked_files.append(file3)
+        self.assertEqual(_adjacent_objects(file1), [file3])
+
+    def test_image_key(self):
+        data = "\x89PNG" * 10
+        self.assertEqual(_image_key(data), _image_key("".join(["\x89PNG"] * 10)))
+        self.assertNotEqual(_image_key(data), _image_key(data[:-1]))
+
+
+class ThumbnailCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.box = CoverArtBox(None)
+        self.box.tagger = FakeTagger()
+        self.box.isHidden = lambda: False
+        self.box.isVisible = lambda: True
+        self.box._compose = lambda image: ("cover", image)
+        self.shown = []
+        self.box.coverArt.setPixmap = self.shown.append
+        self.queue = self.box.tagger.other_queue
+
+    def show(self, data):
+        metadata = Metadata()
+        metadata.add_image("image/jpeg", data)
+        self.box.set_metadata(metadata, None)
+
+    def test_miss_and_hit(self):
+        self.show("a" * 10)
+        self.assertEqual(len(self.queue.jobs), 1)
+        self.assertTrue(self.shown[-1] is self.box.shadow)
+        self.queue.run()
+        cover = self.shown[-1]
+        self.assertEqual(cover[0], "cover")
+        self.show("b")
+        self.queue.run()
+        # Equal data in another string object is a cache hit
+        self.show("".join(["a"] * 10))
+        self.assertEqual(self.queue.jobs, [])
+        self.assertTrue(self.shown[-1] is cover)
+
+    def test_pending(self):
+        self.box._load_thumbnail("a")
+        self.box._load_thumbnail("a")
+        self.assertEqual(len(self.queue.jobs), 1)
+        # Shown while queued, the result of the queued job is shown
+        self.show("a")
+        self.assertEqual(len(self.queue.jobs), 1)
+        self.queue.run()
+        self.assertEqual(self.shown[-1][0], "cover")
+
+    def test_evicted(self):
+        self.box.thumbnails.maxsize = 1
+        self.box._load_thumbnail("a")
+        self.box._load_thumbnail("b")
+        self.queue.run()
+        self.assertFalse(_image_key("a") in self.box.thumbnails)
+        self.show("a")
+        self.assertEqual(len(self.queue.jobs), 1)
+        self.queue.run()
+        self.assertEqual(self.shown[-1][0], "cover")
+        self.assertTrue(_image_key("a") in self.box.thumbnails)
@@ -0,0 +1,68 @@
+import unittest
+from picard import file
+from picard.file import File, tag_format
+
+
+class SavePlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = {
+            'dont_write_tags': False,
+            'clear_existing_tags': False,
+            'save_images_to_tags': True,
+            'write_id3v1': True,
+            'write_id3v23': True,
+            'id3v2_encoding': 'utf-16',
+            'remove_ape_from_mp3': False,
+            'remove_id3_from_flac': False,
+            'tpe2_albumartist': False,
+        }
+        self.file = File(u"/music/test.mp3")
+        self.file.orig_metadata["title"] = u"Title"
+        self.file.orig_metadata["~format"] = u"MPEG-1 Layer 3"
+        self.file.metadata["title"] = u"Title"
+        self.file.tag_format = tag_format(self.settings)
+
+    def test_unchanged(self):
+        plan = self.file._plan_save(self.file.metadata, self.settings)
+        self.assertFalse(plan.write_tags)
+
+    def test_changed(self):
+        self.file.metadata["title"] = u"Other"
+        plan = self.file._plan_save(self.file.metadata, self.settings)
+        self.assertTrue(plan.write_tags)
+        self.assertEqual(plan.diff.changed, {"title": [u"Other"]})
+
+    def test_images(self):
+        self.file.metadata.add_image("image/jpeg", "data")
+        self.assertTrue(self.file._plan_save(self.file.metadata, self.settings).write_tags)
+        self.settings['save_images_to_tags'] = False
+        self.assertFalse(self.file._plan_save(self.file.metadata, self.settings).write_tags)
+
+    def test_settings(self):
+        self.settings['clear_existing_tags'] = True
+        self.assertTrue(self.file._plan_save(self.file.metadata, self.settings).write_tags)
+        self.file.metadata["title"] = u"Other"
+        self.settings['dont_write_tags'] = True
+        self.assertFalse(self.file._plan_save(self.file.metadata, self.settings).write_tags)
+
+    def test_tag_format(self):
+        self.settings['write_id3v23'] = False
+        plan = self.file._plan_save(self.file.metadata, self.settings)
+        self.assertTrue(plan.write_tags)
+        self.file.tag_format = plan.tag_format
+        self.assertFalse(self.file._plan_save(self.file.metadata, self.settings).write_tags)
+        self.file.tag_format = None
+        self.assertTrue(self.file._plan_save(self.file.metadata, self.settings).write_tags)
+
+
+class DirectoryLockTest(unittest.TestCase):
+
+    def test_unused_locks_dropped(self):
+        file._lock_directory(u"/music/a")
+        file._lock_directory(u"/music/b")
+        self.assertEqual(sorted(file._directory_locks), [u"/music/a", u"/music/b"])
+        file._unlock_directory(u"/music/a")
+        self.assertEqual(file._directory_locks.keys(), [u"/music/b"])
+        file._unlock_directory(u"/music/b")
+        self.assertEqual(file._directory_locks, {})
@@ -5,6 +5,7 @@ from tempfile import mkstemp
 from picard import log
 from picard.metadata import Metadata
 import picard.formats
+from picard.formats.padding import save_stats
 from PyQt4 import QtCore
 
 
@@ -33,7 +34,8 @@ class FakeConfig():
             'remove_ape_from_mp3': False,
             'remove_id3_from_flac': False,
             'rating_steps': 6,
-            'rating_user_email': 'users@musicbrainz.org'
+            'rating_user_email': 'users@musicbrainz.org',
+            'tag_padding_percent': 10,
         }
 
 
@@ -52,6 +54,7 @@ class FormatsTest(unittest.TestCase):
 
     original = None
     tags = []
+    supports_padding = False
 
     def setUp(self):
         if not self.original:
@@ -89,10 +92,26 @@ class FormatsTest(unittest.TestCase):
             loaded_metadata = save_and_load_metadata(self.filename, metadata)
             self.assertEqual(int(loaded_metadata['~rating']), rating, '~rating: %r != %r' % (loaded_metadata['~rating'], rating))
 
+    def test_padding(self):
+        if not self.original or not self.supports_padding:
+            return
+        metadata = Metadata()
+        metadata['title'] = u'x' * 5000
+        save_and_load_metadata(self.filename, metadata)
+        rewrites = save_stats()['rewrites']
+        # The padding reserved by the first save is large enough
+        metadata['title'] = u'x' * 6000
+        save_and_load_metadata(self.filename, metadata)
+        self.assertEqual(save_stats()['rewrites'], rewrites)
+        metadata['title'] = u'x' * 20000
+        save_and_load_metadata(self.filename, metadata)
+        self.assertEqual(save_stats()['rewrites'], rewrites + 1)
+
 
 class FLACTest(FormatsTest):
     original = os.path.join('test', 'data', 'test.flac')
     supports_ratings = True
+    supports_padding = True
     tags = {
         'album' : 'Foo Bar',
         'album' : '1',
@@ -228,6 +247,7 @@ class WMATest(FormatsTest):
 class MP3Test(FormatsTest):
     original = os.path.join('test', 'data', 'test.mp3')
     supports_ratings = True
+    supports_padding = True
     tags = {
         'album' : 'Foo Bar',
         'album' : '1',
@@ -0,0 +1,81 @@
+import unittest
+from picard import log
+from picard.util import thread
+from picard.util.ringbuffer import RingBuffer
+
+
+class FakeThreadPool(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def call_from_thread(self, handler, *args, **kwargs):
+        self.calls.append(handler)
+
+
+class LogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = thread.ThreadPool.instance = FakeThreadPool()
+        self.log = log.Log()
+        self.log.receivers = [self.receive]
+        self.received = []
+
+    def tearDown(self):
+        thread.ThreadPool.instance = None
+
+    def receive(self, entries):
+        self.received.append([log.format_entry(e) for e in entries])
+
+    def deliver(self):
+        calls, self.pool.calls = self.pool.calls, []
+        for handler in calls:
+            handler()
+
+    def assertReceived(self, lines, messages):
+        self.assertEqual(len(lines), len(messages))
+        for line, (prefix, message) in zip(lines, messages):
+            self.assertTrue(line.startswith(prefix + " "), line)
+            self.assertTrue(line.endswith(" " + message), line)
+
+    def test_batched_delivery(self):
+        self.log.info("a %d", 1)
+        self.log.warning(u"b")
+        self.log.error("c %s", "d")
+        self.assertEqual(len(self.pool.calls), 1)
+        self.deliver()
+        self.assertReceived(self.received[0], [("I:", u"a 1"), ("W:", u"b"), ("E:", u"c d")])
+        self.log.info("e")
+        self.deliver()
+        self.assertReceived(self.received[1], [("I:", u"e")])
+
+    def test_level(self):
+        self.log.debug("hidden")
+        self.assertEqual(self.pool.calls, [])
+        self.assertEqual(len(self.log.entries), 0)
+        self.log.level = log.ERROR
+        self.log.warning("hidden")
+        self.assertEqual(self.pool.calls, [])
+
+    def test_capacity(self):
+        self.log.entries = RingBuffer(2)
+        for i in range(5):
+            self.log.info("%d", i)
+        self.deliver()
+        self.assertReceived(self.received[0], [("I:", u"3"), ("I:", u"4")])
+
+    def test_delivered_entries(self):
+        self.log.info("a")
+        self.deliver()
+        self.log.info("b")
+        self.assertReceived([log.format_entry(e) for e in self.log.delivered_entries()],
+                            [("I:", u"a")])
+        self.log.receivers.append(self.receive)
+        self.deliver()
+        self.assertReceived(self.received[1], [("I:", u"b")])
+        self.assertEqual(len(self.log.delivered_entries()), 2)
+
+    def test_bad_format(self):
+        self.log.info("%d", "x")
+        self.deliver()
+        self.assertReceived(self.received[0], [("I:", u"%d ('x',)")])
@@ -0,0 +1,96 @@
+import unittest
+from picard.metadata import Metadata, ReleaseScoringProfile
+from picard.webservice import XmlNode
+
+
+class FakeConfig(object):
+    def __init__(self):
+        self.setting = {
+            'enabled_plugins': '',
+            'preferred_release_countries': u'GB  US',
+            'preferred_release_formats': u'CD',
+            'release_type_scores': u'Album 1.0 Single 0.2',
+            }
+
+    def snapshot(self):
+        return self.setting
+
+
+class ReleaseScoringProfileTest(unittest.TestCase):
+
+    def test_reuse(self):
+        config = FakeConfig()
+        profile = ReleaseScoringProfile.get(config)
+        self.assertTrue(ReleaseScoringProfile.get(config) is profile)
+        config.setting['preferred_release_countries'] = u'US'
+        self.assertFalse(ReleaseScoringProfile.get(config) is profile)
+
+    def test_scores(self):
+        profile = ReleaseScoringProfile(u'GB  US  GB', u'CD', u'Album 1.0 Other 0.1')
+        self.assertEqual(profile.total_countries, 3)
+        self.assertEqual(profile.country_scores, {u'GB': 1.0, u'US': 2.0 / 3.0})
+        self.assertEqual(profile.format_scores, {u'CD': 1.0})
+        self.assertEqual(profile.other_type_score, 0.1)
+
+    def release(self, type=None):
+        release = XmlNode()
+        release.attribs['id'] = u'id'
+        release.append_child('country').text = u'US'
+        if type is not None:
+            release.append_child('release_group').attribs['type'] = type
+        return release
+
+    def test_release_cache(self):
+        profile = ReleaseScoringProfile(u'GB  US', u'CD', u'Album 1.0 Single 0.2')
+        self.assertEqual(profile.release_scores(self.release(u'Album')), (0.5, 1.0))
+        # The shared profile doesn't cache, every lookup has its own cache
+        self.assertEqual(profile.release_scores(self.release(u'Single')), (0.5, 0.2))
+        lookup = profile.for_lookup()
+        self.assertEqual(lookup.release_scores(self.release(u'Album')), (0.5, 1.0))
+        self.assertEqual(lookup.release_scores(self.release(u'Single')), (0.5, 1.0))
+        self.assertEqual(profile.for_lookup().release_scores(self.release(u'Single')), (0.5, 0.2))
+
+    def test_missing_type_not_cached(self):
+        lookup = ReleaseScoringProfile(u'GB  US', u'CD', u'Album 1.0').for_lookup()
+        self.assertEqual(lookup.release_scores(self.release()), (0.5, 0.0))
+        self.assertEqual(lookup.release_scores(self.release(u'Album')), (0.5, 1.0))
+
+
+class MetadataDiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.orig = Metadata()
+        self.orig["title"] = u"Title"
+        self.orig["artist"] = u"Artist"
+        self.orig["~format"] = u"MPEG-1 Layer 3"
+        self.orig["~rating"] = u"3"
+
+    def test_unchanged(self):
+        metadata = Metadata()
+        metadata.copy(self.orig)
+        # Hidden tags which are not saved don't count
+        del metadata["~format"]
+        metadata["~length"] = u"3:00"
+        self.assertFalse(metadata.diff(self.orig))
+
+    def test_changed(self):
+        metadata = Metadata()
+        metadata.copy(self.orig)
+        metadata["title"] = u"Other"
+        metadata["album"] = u"Album"
+        metadata["~rating"] = u"5"
+        del metadata["artist"]
+        diff = metadata.diff(self.orig)
+        self.assertTrue(diff)
+        self.assertEqual(diff.changed, {"title": [u"Other"], "album": [u"Album"],
+                                        "~rating": [u"5"]})
+        self.assertEqual(diff.removed, set(["artist"]))
+        self.assertFalse(diff.images_changed)
+
+    def test_images(self):
+        metadata = Metadata()
+        metadata.copy(self.orig)
+        metadata.add_image("image/jpeg", "data")
+        diff = metadata.diff(self.orig)
+        self.assertTrue(diff)
+        self.assertTrue(diff.images_changed)
@@ -0,0 +1,54 @@
+import unittest
+from picard.ui.metadatabox import TagCounter, _object_tags
+
+
+class TagCounterTest(unittest.TestCase):
+
+    def test_add_remove(self):
+        tags = TagCounter()
+        tags.add("title", [u"A"])
+        tags.add("title", [u"A"])
+        self.assertEqual(tags["title"], [u"A"])
+        tags.add("title", [u"B"])
+        self.assertTrue("title" in tags.different)
+        self.assertEqual(tags.counts["title"], 3)
+        tags.remove("title", [u"B"])
+        self.assertFalse("title" in tags.different)
+        self.assertEqual(tags["title"], [u"A"])
+        tags.remove("title", [u"A"])
+        tags.remove("title", [u"A"])
+        self.assertFalse("title" in tags)
+        self.assertEqual(tags.counts, {})
+
+    def test_value_order(self):
+        tags = TagCounter()
+        tags.add("genre", [u"Rock", u"Pop"])
+        tags.add("genre", [u"Pop", u"Rock"])
+        self.assertEqual(tags["genre"], [u"Pop", u"Rock"])
+
+    def test_capped(self):
+        tags = TagCounter()
+        tags.max_values = 2
+        for value in (u"A", u"B", u"C"):
+            tags.add("title", [value])
+        self.assertTrue("title" in tags.capped)
+        self.assertFalse("title" in tags.values)
+        tags.remove("title", [u"C"])
+        self.assertTrue("title" in tags.stale)
+        tags.rebuild("title", [[u"A"], [u"A"]])
+        self.assertEqual(tags["title"], [u"A"])
+        self.assertEqual(tags.counts["title"], 2)
+        self.assertFalse(tags.stale or tags.capped or tags.different)
+
+
+class ObjectTagsTest(unittest.TestCase):
+
+    def test_existing_tags(self):
+        items = {"title": [u"New"], "~extension": [u"mp3"]}
+        orig_items = {"title": [u"Old"], "comment": [u"Kept"]}
+        orig_tags, new_tags = _object_tags(items, orig_items, False)
+        self.assertEqual(orig_tags, orig_items)
+        self.assertEqual(new_tags, {"title": [u"New"], "comment": [u"Kept"]})
+        orig_tags, new_tags = _object_tags(items, orig_items, True)
+        self.assertEqual(new_tags, {"title": [u"New"]})
+        self.assertEqual(_object_tags(items, None, False), ({}, {"title": [u"New"]}))
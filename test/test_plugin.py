@@ -0,0 +1,51 @@
+import unittest
+from PyQt4 import QtCore
+from picard.config import SettingsSnapshot
+from picard.plugin import ExtensionPoint
+
+
+class FakeConfig(object):
+    def __init__(self):
+        self.setting = {
+            'enabled_plugins': '',
+            }
+        self.version = 0
+        self._snapshot = None
+
+    def snapshot(self):
+        # Like ConfigSection, a new snapshot after every change
+        if self._snapshot != self.setting:
+            self.version += 1
+            self._snapshot = SettingsSnapshot(self.setting, self.version)
+        return self._snapshot
+
+
+class ExtensionPointTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.ep = ExtensionPoint()
+        self.ep.register("picard.formats", "builtin")
+        self.ep.register("picard.plugins.test", "plugin")
+
+    def test_enabled_plugins(self):
+        self.assertEqual(list(self.ep), ["builtin"])
+        QtCore.QObject.config.setting["enabled_plugins"] = "other test"
+        self.assertEqual(list(self.ep), ["builtin", "plugin"])
+        QtCore.QObject.config.setting["enabled_plugins"] = ""
+        self.assertEqual(list(self.ep), ["builtin"])
+
+    def test_version(self):
+        version = self.ep.version
+        QtCore.QObject.config.setting["other"] = 1
+        self.assertEqual(self.ep.version, version)
+        QtCore.QObject.config.setting["enabled_plugins"] = "test"
+        self.assertNotEqual(self.ep.version, version)
+
+    def test_register_and_unregister(self):
+        QtCore.QObject.config.setting["enabled_plugins"] = "test"
+        self.assertEqual(list(self.ep), ["builtin", "plugin"])
+        self.ep.register("picard.plugins.test", "plugin2")
+        self.assertEqual(list(self.ep), ["builtin", "plugin", "plugin2"])
+        self.ep.unregister_module("test")
+        self.assertEqual(list(self.ep), ["builtin"])
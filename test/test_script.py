@@ -1,6 +1,8 @@
+import re
 import unittest
 from PyQt4 import QtCore
-from picard.script import ScriptParser
+from picard.script import ScriptParser, UnknownFunction, _regex_cache
+from picard.config import SettingsSnapshot
 from picard.metadata import Metadata
 
 class FakeConfig(object):
@@ -8,6 +10,14 @@ class FakeConfig(object):
         self.setting = {
             'enabled_plugins': '',
             }
+        self.version = 0
+        self._snapshot = None
+
+    def snapshot(self):
+        if self._snapshot != self.setting:
+            self.version += 1
+            self._snapshot = SettingsSnapshot(self.setting, self.version)
+        return self._snapshot
 
 
 class ScriptParserTest(unittest.TestCase):
@@ -255,3 +265,149 @@ class ScriptParserTest(unittest.TestCase):
         context["target"] = "targetval"
         context["source"] = "sourceval"
         self._eval_and_check_copymerge(context, ["targetval", "sourceval"])
+
+
+class InterpretedScriptParserTest(ScriptParserTest):
+    """Runs all script tests without compiling the scripts."""
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.parser = ScriptParser(interpret=True)
+
+
+class ScriptCompilerTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.parser = ScriptParser()
+
+    def test_constant_folding(self):
+        compiled = self.parser.compile("$upper(abc)$num(3,2)")
+        self.assertEqual(compiled.eval(self.parser), "ABC03")
+        self.assertEqual(compiled.eval(None), "ABC03")
+
+    def test_variables_not_folded(self):
+        context = Metadata()
+        context["title"] = "abc"
+        self.assertEqual(self.parser.eval("$upper(%title%)", context), "ABC")
+        context["title"] = "def"
+        self.assertEqual(self.parser.eval("$upper(%title%)", context), "DEF")
+
+    def test_unevaluated_arguments(self):
+        compiled = self.parser.compile("$if(%a%,$set(b,1),$set(c,1))")
+        self.parser.context = Metadata()
+        self.parser.context["a"] = "x"
+        compiled.eval(self.parser)
+        self.assertEqual(self.parser.context["b"], "1")
+        self.assertEqual(self.parser.context["c"], "")
+
+    def test_errors_at_runtime(self):
+        self.assertRaises(ValueError, self.parser.eval, "$left(abc,x)")
+
+    def test_literal_regex(self):
+        context = Metadata()
+        context["title"] = "abc (live)"
+        self.assertEqual(self.parser.eval(r"$rreplace(%title%,\\s\\\(.*\\\),)", context), "abc")
+        self.assertEqual(self.parser.eval(r"$rsearch(%title%,\\\(\(.*\)\\\))", context), "live")
+
+    def test_invalid_regex(self):
+        context = Metadata()
+        context["title"] = "abc"
+        for i in range(2):
+            self.assertRaises(re.error, self.parser.eval, r"$rreplace(%title%,\(,)", context)
+        self.assertTrue(isinstance(_regex_cache.get("("), re.error))
+
+
+class ScriptFunctionRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.parser = ScriptParser()
+
+    def tearDown(self):
+        ScriptParser._function_registry.unregister_module("test_registry")
+
+    def test_function_table_reused(self):
+        self.parser.eval("$noop()")
+        functions = self.parser.functions
+        ScriptParser().eval("$noop()")
+        self.assertTrue(ScriptParser._functions is functions)
+
+    def test_plugin_function_registered(self):
+        self.assertRaises(UnknownFunction, self.parser.eval, "$hello()")
+        ScriptParser._function_registry.register(
+            "picard.plugins.test_registry",
+            ("hello", lambda parser, *args: "hello", True, False))
+        QtCore.QObject.config.setting["enabled_plugins"] = "test_registry"
+        self.assertEqual(self.parser.eval("$hello()"), "hello")
+        QtCore.QObject.config.setting["enabled_plugins"] = ""
+        self.assertRaises(UnknownFunction, self.parser.eval, "$hello()")
+
+
+class ScriptDependenciesTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+        self.parser = ScriptParser()
+
+    def test_dependencies(self):
+        compiled = self.parser.compile("%artist% - $get(_album)$copy(a,b)")
+        self.assertEqual(compiled.dependencies, ("a", "artist", "b", "~album"))
+
+    def test_unknown_dependencies(self):
+        self.assertEqual(self.parser.compile("$get(%name%)").dependencies, None)
+        self.assertEqual(self.parser.compile("$performer()").dependencies, None)
+
+    def test_skipped_evaluation(self):
+        script = "$set(x,$upper(%title%))%x%"
+        m1 = Metadata()
+        m1["title"] = "abc"
+        skipped = ScriptParser.result_cache_stats()["skipped"]
+        self.assertEqual(self.parser.eval(script, m1), "ABC")
+        m2 = Metadata()
+        m2["title"] = "abc"
+        self.assertEqual(self.parser.eval(script, m2), "ABC")
+        self.assertEqual(m2["x"], "ABC")
+        self.assertEqual(ScriptParser.result_cache_stats()["skipped"], skipped + 1)
+        m2["title"] = "def"
+        self.assertEqual(self.parser.eval(script, m2), "DEF")
+        self.assertEqual(ScriptParser.result_cache_stats()["skipped"], skipped + 1)
+
+    def test_skipped_unset(self):
+        script = "$unset(x)"
+        for i in range(2):
+            m = Metadata()
+            m["x"] = "abc"
+            self.parser.eval(script, m)
+            self.assertFalse("x" in m)
+
+
+class ScriptProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        QtCore.QObject.config = FakeConfig()
+
+    def tearDown(self):
+        ScriptParser.stop_profiling()
+
+    def test_not_profiled(self):
+        self.assertEqual(ScriptParser().profiler, None)
+
+    def test_profile(self):
+        profiler = ScriptParser.start_profiling()
+        parser = ScriptParser()
+        script = "$upper(%a%)\n $if($lower(%a%),x,y)$upper(b)"
+        for value in ("a", "b", "c"):
+            m = Metadata()
+            m["a"] = value
+            self.assertEqual(parser.eval(script, m), value.upper() + "\n xB")
+        dump = profiler.dump()
+        functions = dict([(f["function"], f["calls"]) for f in dump["functions"]])
+        # $upper(b) is evaluated when the script is compiled
+        self.assertEqual(functions, {"upper": 3, "if": 3, "lower": 3})
+        positions = dict([((p["function"], p["line"], p["column"]), p["calls"])
+                          for p in dump["positions"]])
+        self.assertEqual(positions, {("upper", 1, 1): 3, ("if", 2, 2): 3,
+                                     ("lower", 2, 6): 3})
+        profiler.clear()
+        self.assertEqual(profiler.dump()["functions"], [])
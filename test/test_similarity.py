@@ -1,5 +1,5 @@
 import unittest
-from picard.similarity import similarity
+from picard.similarity import similarity, similarity2, tokenize, cache_stats
 
 class SimilarityTest(unittest.TestCase):
 
@@ -8,3 +8,25 @@ class SimilarityTest(unittest.TestCase):
         self.failUnlessEqual(similarity(u"BBB", u"AAA"), 0.0)
         self.failUnlessAlmostEqual(similarity(u"ABC", u"ABB"), 0.7, 1)
 
+
+    def test_threshold(self):
+        self.failUnlessEqual(similarity(u"K!", u"K!", 1.0), 1.0)
+        self.failUnlessEqual(similarity(u"ABC", u"ABD", 1.0), 0.0)
+        self.failUnlessEqual(similarity(u"ABC", u"ABCDEF", 0.9), 0.0)
+        self.failUnlessAlmostEqual(similarity(u"ABC", u"ABB", 0.5), 0.7, 1)
+        self.failUnlessEqual(similarity(u"ABC", u"ABB", 0.5),
+                             similarity(u"ABC", u"ABB"))
+        self.failUnlessEqual(similarity(u"Abbey Road", u"Abbey Raod", 0.5),
+                             similarity(u"Abbey Road", u"Abbey Raod"))
+
+    def test_similarity2(self):
+        self.failUnlessEqual(similarity2(u"Abbey Road", u"abbey road"), 1.0)
+        self.failUnlessEqual(similarity2(u"Abbey Road", u""), 0.0)
+        self.failUnless(similarity2(u"Abbey Road", u"Abbey Road (Remastered)") > 0.5)
+        self.failUnless(similarity2(u"Abbey Road (Remastered)", u"Abbey Road") > 0.5)
+
+    def test_tokenize_cache(self):
+        self.failUnlessEqual(tokenize(u"Let It Be... Naked"), (u"let", u"it", u"be", u"naked"))
+        hits = cache_stats()['tokenize']['hits']
+        self.failUnlessEqual(tokenize(u"Let It Be... Naked"), (u"let", u"it", u"be", u"naked"))
+        self.failUnlessEqual(cache_stats()['tokenize']['hits'], hits + 1)
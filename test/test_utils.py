@@ -3,6 +3,12 @@
 import os.path
 import unittest
 from picard import util
+from picard.util.lrucache import LRUCache
+from picard.util.queue import PartitionedQueue
+from picard.util.ringbuffer import RingBuffer
+from picard.util.metrics import Histogram, Registry, registry
+from picard.util.progress import Progress
+from picard.util.assignment import optimal_assignment, greedy_assignment, best_assignment
 
 
 class UnaccentTest(unittest.TestCase):
@@ -142,3 +148,200 @@ class SaveReleaseTypeScoresTest(unittest.TestCase):
         self.assertTrue("Other 0.00" in saved_scores)
         self.assertEqual(6, len(saved_scores.split()))
 
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache["a"], 1)
+        cache["c"] = 3
+        self.assertEqual(len(cache), 2)
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertTrue("c" in cache)
+
+    def test_stats(self):
+        cache = LRUCache(10)
+        cache["a"] = 1
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+
+class AssignmentTest(unittest.TestCase):
+
+    def test_optimal(self):
+        # Greedily, row 0 would take column 0 and leave row 1 without a match
+        scores = [[0.9, 0.8],
+                  [0.85, None]]
+        self.assertEqual(optimal_assignment(scores), {0: 1, 1: 0})
+
+    def test_optimal_rectangular(self):
+        scores = [[0.1, 0.9, 0.2],
+                  [0.8, 0.7, None]]
+        self.assertEqual(optimal_assignment(scores), {0: 1, 1: 0})
+        scores = [[0.9], [None], [0.8]]
+        self.assertEqual(optimal_assignment(scores), {0: 0})
+
+    def test_optimal_forbidden(self):
+        self.assertEqual(optimal_assignment([[None, None]]), {})
+        self.assertEqual(optimal_assignment([]), {})
+
+    def test_greedy(self):
+        scores = [[0.9, 0.8],
+                  [0.95, None]]
+        self.assertEqual(greedy_assignment(scores), {1: 0, 0: 1})
+
+    def test_greedy_ties(self):
+        scores = [[0.9, 0.9],
+                  [0.9, 0.9]]
+        self.assertEqual(greedy_assignment(scores), {0: 0, 1: 1})
+        # The same rows in the other order get the same columns
+        self.assertEqual(greedy_assignment(scores, ["b", "a"]), {1: 0, 0: 1})
+        self.assertEqual(greedy_assignment(scores, ["a", "b"]), {0: 0, 1: 1})
+
+    def test_best(self):
+        scores = [[0.9, 0.8],
+                  [0.85, None]]
+        self.assertEqual(best_assignment(scores), {0: 1, 1: 0})
+        self.assertEqual(best_assignment(scores, max_optimal_size=1), {0: 0})
+
+
+class PartitionedQueueTest(unittest.TestCase):
+
+    def test_exclusive_resources(self):
+        queue = PartitionedQueue()
+        queue.put("a1", ["A"])
+        queue.put("a2", ["A"])
+        queue.put("b1", ["B"])
+        queue.put("ab", ["A", "B"])
+        queue.put("c1", ["C"])
+        self.assertEqual(queue.get(), "a1")
+        self.assertEqual(queue.get(), "b1")
+        # "ab" has to wait for "a1", "a2" and "b1"
+        self.assertEqual(queue.get(), "c1")
+        queue.task_done("a1")
+        self.assertEqual(queue.get(), "a2")
+        queue.task_done("a2")
+        queue.task_done("b1")
+        self.assertEqual(queue.get(), "ab")
+        queue.task_done("ab")
+        queue.task_done("c1")
+        stats = queue.stats()
+        self.assertEqual(stats["A"]["finished"], 3)
+        self.assertEqual(stats["B"]["finished"], 2)
+        self.assertEqual(stats["C"]["queued"], 0)
+
+    def test_items_without_resources(self):
+        queue = PartitionedQueue()
+        queue.put("a1", ["A"])
+        queue.put("a2", ["A"])
+        queue.put(None)
+        self.assertEqual(queue.get(), "a1")
+        self.assertEqual(queue.get(), None)
+
+
+class RingBufferTest(unittest.TestCase):
+
+    def test_overwrite(self):
+        buf = RingBuffer(3)
+        for i in range(5):
+            buf.append(i)
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(list(buf), [2, 3, 4])
+        self.assertEqual(buf.total, 5)
+
+    def test_since(self):
+        buf = RingBuffer(3)
+        buf.append(0)
+        buf.append(1)
+        self.assertEqual(buf.since(1), [1])
+        self.assertEqual(buf.since(2), [])
+        for i in range(2, 7):
+            buf.append(i)
+        self.assertEqual(buf.since(5), [5, 6])
+        self.assertEqual(buf.since(0), [4, 5, 6])
+
+
+class ProgressTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.changes = 0
+        self.progress = Progress("%(done)s / %(total)s (%(rate)d/s)",
+                                 self.changed, lambda: self.now)
+
+    def changed(self):
+        self.changes += 1
+
+    def test_counts(self):
+        progress = self.progress
+        for item in "abc":
+            progress.start(item)
+        progress.start("a")
+        self.assertEqual((progress.done, progress.total), (0, 3))
+        self.now += 2.0
+        progress.finish("a")
+        progress.finish("a")
+        progress.finish("b")
+        self.assertTrue(progress.active)
+        self.assertEqual(progress.rate(), 1.0)
+        self.assertEqual(self.changes, 5)
+        progress.finish("c")
+        self.assertFalse(progress.active)
+        self.assertEqual((progress.done, progress.total), (3, 3))
+
+    def test_new_batch(self):
+        progress = self.progress
+        progress.start("a")
+        progress.finish("a")
+        self.now += 10.0
+        progress.start("b")
+        self.assertEqual((progress.done, progress.total), (0, 1))
+        self.assertEqual(progress.started, self.now)
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for ms in [0.5] * 90 + [15] * 9 + [70000]:
+            histogram.add(ms / 1000.0)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.percentile(0.5), 1.0)
+        self.assertEqual(histogram.percentile(0.95), 20.0)
+        self.assertAlmostEqual(histogram.percentile(1.0), 70000.0)
+        dump = histogram.dump()
+        self.assertEqual(dump["buckets"][-1], {"le_ms": None, "count": 1})
+
+    def test_registry(self):
+        metrics = Registry()
+        metrics.count("errors")
+        metrics.count("errors", 2)
+        metrics.observe("load", 0.004)
+        metrics.register_collector("queue", lambda: {"queued": 1})
+        metrics.register_collector("broken", lambda: 1 / 0)
+        dump = metrics.dump()
+        self.assertEqual(dump["counters"], {"errors": 3})
+        self.assertEqual(dump["histograms"]["load"]["count"], 1)
+        self.assertEqual(dump["collected"]["queue"], {"queued": 1})
+        self.assertTrue("error" in dump["collected"]["broken"])
+        self.assertEqual(metrics.summary(), "load 1 x 4.0 ms (p95 4 ms)")
+        metrics.clear()
+        self.assertEqual(metrics.dump()["histograms"], {})
+
+    def test_queue_wait(self):
+        queue = PartitionedQueue(name="test")
+        queue.put("a1", ["A"])
+        queue.put("a2", ["A"])
+        queue.remove("a2")
+        self.assertEqual(queue.get(), "a1")
+        self.assertEqual(queue.put_times, {})
+        waits = registry.dump()["histograms"]["queue.test.wait"]
+        self.assertEqual(waits["count"], 1)